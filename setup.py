@@ -47,6 +47,10 @@ setup(
     install_requires=["numpy", "scipy", "scikit-learn"],
     extras_require={
         "tests": ["coverage", "pytest"],
+        "workers": ["JPype1"],
+        "arrow": ["pyarrow"],
+        "zstd": ["zstandard"],
+        "progress": ["tqdm"],
         "docs": ["sphinx", "sphinx_rtd_theme", "sphinx_gallery", "numpydoc", "matplotlib"],
     },
 )
@@ -0,0 +1,563 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Pure-Python inference with boosted relational regression trees.
+
+The trees learned by BoostSRL / SRLBoost are stored in ``estimators_`` as
+ordered lists of Prolog clauses:
+
+.. code-block:: prolog
+
+    (cancer(A, 0.8581489350995121) :-  /* #pos=3 */ smokes(A)).
+    cancer(_, 0.19148226843284552) /* #neg=2 #pos=1 */ .
+
+Each tree behaves like a decision list: the value of the first clause whose
+body can be proven for an example is that tree's contribution. The
+contributions of all trees are weighted, summed with a prior, and (for
+classification) passed through the logistic function.
+
+This module evaluates those clauses directly against the facts in a
+:class:`srlearn.database.Database`, which avoids writing files and starting
+a Java Virtual Machine at prediction time.
+"""
+
+from collections import defaultdict
+import json
+import re
+
+import numpy as np
+from scipy.special import expit
+
+from .parser import parse_terms as _parse_literal
+from .parser import read_lines as _read_lines
+from .parser import split_arguments as _split_arguments
+
+_COMMENT = re.compile(r"/\*.*?\*/")
+
+
+def _is_variable(term):
+    return term[:1] == "_" or term[:1].isupper()
+
+
+def parse_examples(_object, target):
+    """Read examples for ``target`` from a Database attribute.
+
+    Returns
+    -------
+    examples : list of tuple
+        Argument tuples for each example, in file order.
+    values : list of float or None
+        Regression values (``regressionExample(medv(id1),33.2).``) or
+        ``None`` for classification examples.
+    """
+    _examples = []
+    _values = []
+    for _line in _read_lines(_object):
+        _pred, _args = _parse_literal(_line)
+        _value = None
+        if _pred == "regressionExample":
+            _pred, _inner = _parse_literal(_args[0])
+            _value = float(_args[1])
+            _args = _inner
+        if _pred != target:
+            continue
+        _examples.append(_args)
+        _values.append(_value)
+    return _examples, _values
+
+
+class FactIndex:
+    """Facts grouped by predicate and indexed by argument position.
+
+    Indexes for a ``(predicate, position)`` pair are built the first time a
+    query binds that position, so only the access paths used by the learned
+    clauses are materialized.
+    """
+
+    def __init__(self, facts=()):
+        self._facts = defaultdict(list)
+        self._indexes = {}
+        for _line in facts:
+            _pred, _args = _parse_literal(_line)
+            self._facts[_pred].append(_args)
+
+    @classmethod
+    def from_database(cls, database):
+        """Build an index from the ``facts`` of a Database."""
+        return cls(_read_lines(database.facts))
+
+    def _index(self, predicate, position):
+        _key = (predicate, position)
+        if _key not in self._indexes:
+            _index = defaultdict(list)
+            for _args in self._facts.get(predicate, ()):
+                if position < len(_args):
+                    _index[_args[position]].append(_args)
+            self._indexes[_key] = _index
+        return self._indexes[_key]
+
+    def candidates(self, predicate, pattern):
+        """Return facts which may match ``pattern``.
+
+        ``pattern`` is a tuple with a constant at bound positions and ``None``
+        elsewhere. The most selective available index is used.
+        """
+        _best = None
+        for _position, _term in enumerate(pattern):
+            if _term is None:
+                continue
+            _found = self._index(predicate, _position).get(_term, ())
+            if _best is None or len(_found) < len(_best):
+                _best = _found
+            if not _best:
+                break
+        if _best is None:
+            return self._facts.get(predicate, ())
+        return _best
+
+
+class _Clause:
+    """A single ``head :- body`` clause from a learned tree."""
+
+    __slots__ = ("head", "value", "body")
+
+    def __init__(self, head, value, body):
+        self.head = head
+        self.value = value
+        self.body = body
+
+
+def parse_tree_clauses(tree, target):
+    """Parse a tree from ``estimators_`` into a list of clauses.
+
+    Parameters
+    ----------
+    tree : str
+        A tree written with Prolog variables (``usePrologVariables: true``).
+    target : str
+        Name of the target predicate.
+
+    Returns
+    -------
+    clauses : list of _Clause
+        Clauses in the order they should be tried.
+    """
+    _clauses = []
+    for _line in tree.splitlines():
+        _line = _COMMENT.sub("", _line).strip()
+        if not _line or ":" in _line.split("(")[0]:
+            # Skip blank lines and directives like ``setParam:``
+            continue
+        if _line.endswith("."):
+            _line = _line[:-1].rstrip()
+        if not _line:
+            continue
+        if _line.startswith("(") and _line.endswith(")"):
+            _line = _line[1:-1].strip()
+
+        if ":-" in _line:
+            _head, _body = _line.split(":-", 1)
+        else:
+            _head, _body = _line, ""
+
+        _pred, _args = _parse_literal(_head)
+        if _pred != target:
+            raise ValueError(
+                "Expected a clause for '{0}', found: {1}".format(target, _line)
+            )
+
+        _literals = []
+        for _literal in _split_arguments(_body):
+            if _literal in ("", "!", "true"):
+                continue
+            if _literal.startswith("\\+") or _literal.startswith("not("):
+                raise ValueError(
+                    "Negated literals are not supported: {0}".format(_literal)
+                )
+            _literals.append(_parse_literal(_literal))
+
+        _clauses.append(_Clause(_args[:-1], float(_args[-1]), tuple(_literals)))
+    return _clauses
+
+
+def _prove(body, facts, bindings, start=0):
+    """Depth-first search for one proof of ``body[start:]`` under ``bindings``."""
+    if start == len(body):
+        return True
+    _pred, _args = body[start]
+    _pattern = tuple(bindings.get(_a) if _is_variable(_a) else _a for _a in _args)
+    for _fact in facts.candidates(_pred, _pattern):
+        if len(_fact) != len(_args):
+            continue
+        _new = bindings
+        for _term, _const in zip(_args, _fact):
+            if _term == "_":
+                continue
+            if _is_variable(_term):
+                _bound = _new.get(_term)
+                if _bound is None:
+                    if _new is bindings:
+                        _new = dict(bindings)
+                    _new[_term] = _const
+                elif _bound != _const:
+                    break
+            elif _term != _const:
+                break
+        else:
+            if _prove(body, facts, _new, start + 1):
+                return True
+    return False
+
+
+def _bind_head(head, example):
+    """Unify a clause head with a ground example, or return None."""
+    if len(head) != len(example):
+        return None
+    _bindings = {}
+    for _term, _const in zip(head, example):
+        if _term == "_":
+            continue
+        if _is_variable(_term):
+            if _bindings.setdefault(_term, _const) != _const:
+                return None
+        elif _term != _const:
+            return None
+    return _bindings
+
+
+def read_model_file(path):
+    """Read the prior and per-tree step lengths from a ``.model`` file.
+
+    The file written by BoostSRL / SRLBoost contains the number of trees, the
+    target, a list of step lengths, and the prior, one per line.
+
+    Returns
+    -------
+    prior : float
+    weights : list of float
+    """
+    with open(path, "r") as _fh:
+        _lines = _fh.read().splitlines()
+    return float(_lines[3]), [float(_w) for _w in json.loads(_lines[2])]
+
+
+class TreeEnsemble:
+    """Boosted relational regression trees evaluated in Python.
+
+    Parameters
+    ----------
+    estimators : list of str
+        Trees from a fitted model's ``estimators_``.
+    target : str
+        Target predicate.
+    prior : float
+        Initial value of the sum before any trees are added.
+    weights : list of float (default: None)
+        Step length for each tree, defaults to ``1.0``.
+    """
+
+    def __init__(self, estimators, target, prior=0.0, weights=None):
+        self.target = target
+        self.prior = prior
+        self.trees = [parse_tree_clauses(_tree, target) for _tree in estimators]
+        if weights is None:
+            weights = [1.0] * len(self.trees)
+        self.weights = weights
+
+    def tree_value(self, tree, example, facts):
+        """Value of the first clause of ``tree`` which proves ``example``."""
+        for _clause in tree:
+            _bindings = _bind_head(_clause.head, example)
+            if _bindings is not None and _prove(_clause.body, facts, _bindings):
+                return _clause.value
+        return 0.0
+
+    def decision_function(self, examples, facts):
+        """Sum of weighted tree values (plus the prior) for each example."""
+        return np.array(
+            [
+                self.prior
+                + sum(
+                    _w * self.tree_value(_tree, _example, facts)
+                    for _w, _tree in zip(self.weights, self.trees)
+                )
+                for _example in examples
+            ],
+            dtype=float,
+        )
+
+
+class _Step:
+    """One literal of a compiled clause body."""
+
+    __slots__ = ("predicate", "arity", "constants", "equal", "bound", "new", "keep")
+
+    def __init__(self, predicate, arity, constants, equal, bound, new, keep):
+        self.predicate = predicate
+        self.arity = arity
+        self.constants = constants
+        self.equal = equal
+        self.bound = bound
+        self.new = new
+        self.keep = keep
+
+
+def _compile_clause(clause):
+    """Compile a clause into a head binding and a plan of join steps.
+
+    Variables are bound left-to-right. Each step records which argument
+    positions are compared against constants, which join on variables that
+    are already bound, which introduce new variables, and which variables are
+    still needed by later literals (everything else is projected away).
+    """
+    _head_vars = []
+    _head_constants = []
+    _head_equal = []
+    _seen = {}
+    for _position, _term in enumerate(clause.head):
+        if _term == "_":
+            continue
+        if not _is_variable(_term):
+            _head_constants.append((_position, _term))
+        elif _term in _seen:
+            _head_equal.append((_seen[_term], _position))
+        else:
+            _seen[_term] = _position
+            _head_vars.append((_position, _term))
+
+    _bound = set(_seen)
+    _steps = []
+    for i, (_pred, _args) in enumerate(clause.body):
+        _later = set(
+            _a for _, _rest in clause.body[i + 1 :] for _a in _rest if _is_variable(_a)
+        )
+        _constants = []
+        _equal = []
+        _on = []
+        _new = []
+        _first = {}
+        for _position, _term in enumerate(_args):
+            if _term == "_":
+                continue
+            if not _is_variable(_term):
+                _constants.append((_position, _term))
+            elif _term in _bound:
+                _on.append((_position, _term))
+            elif _term in _first:
+                _equal.append((_first[_term], _position))
+            else:
+                _first[_term] = _position
+                if _term in _later:
+                    _new.append((_position, _term))
+        _bound |= set(_first)
+        _keep = tuple(sorted(_v for _v in _bound if _v in _later))
+        _steps.append(_Step(_pred, len(_args), _constants, _equal, _on, _new, _keep))
+    return (_head_vars, _head_constants, _head_equal), _steps
+
+
+def _pack_rows(rows, base):
+    """Pack each row of non-negative integers into a single int64 key.
+
+    Rows are treated as numbers in base ``base``. When the packed value could
+    overflow, fall back to ranking the distinct rows.
+    """
+    if rows.shape[1] == 0:
+        return np.zeros(len(rows), dtype=np.int64)
+    if rows.shape[1] == 1:
+        return rows[:, 0].astype(np.int64)
+    if base ** rows.shape[1] < 2**63:
+        _keys = rows[:, 0].astype(np.int64)
+        for i in range(1, rows.shape[1]):
+            _keys *= base
+            _keys += rows[:, i]
+        return _keys
+    _, _inverse = np.unique(rows, axis=0, return_inverse=True)
+    return _inverse.reshape(-1)
+
+
+def _sorted_fact_keys(step, facts, base, on, cache):
+    """Facts for a step, filtered by constants, and sorted by their join key.
+
+    Returns the sorted facts, their sorted keys, and the keys of ``on`` (the
+    bound columns of the current bindings) in the same key space. Literals
+    recur across clauses and trees, so the sorted facts are kept in ``cache``.
+    """
+    _packable = on.shape[1] <= 1 or base ** on.shape[1] < 2**63
+    _signature = (
+        step.predicate,
+        step.arity,
+        tuple(step.constants),
+        tuple(step.equal),
+        tuple(_p for _p, _ in step.bound),
+    )
+    if _packable and _signature in cache:
+        _table, _right = cache[_signature]
+        return _table, _right, _pack_rows(on, base)
+
+    _table = facts.table(step.predicate, step.arity)
+    _keep = np.ones(len(_table), dtype=bool)
+    for _position, _term in step.constants:
+        _keep &= _table[:, _position] == facts.symbols.get(_term)
+    for _a, _b in step.equal:
+        _keep &= _table[:, _a] == _table[:, _b]
+    _table = _table[_keep]
+    _columns = _table[:, [_p for _p, _ in step.bound]]
+
+    if not _packable:
+        _keys = _pack_rows(np.concatenate((on, _columns)), base)
+        _order = np.argsort(_keys[len(on) :], kind="stable")
+        return _table[_order], _keys[len(on) :][_order], _keys[: len(on)]
+
+    _order = np.argsort(_pack_rows(_columns, base), kind="stable")
+    _table = _table[_order]
+    cache[_signature] = (
+        _table,
+        _pack_rows(_table[:, [_p for _p, _ in step.bound]], base),
+    )
+    return _table, cache[_signature][1], _pack_rows(on, base)
+
+
+def _join_indices(left, right):
+    """Row indices of the equi-join between keys and *sorted* keys."""
+    _lo = np.searchsorted(right, left, side="left")
+    _counts = np.searchsorted(right, left, side="right") - _lo
+    _left = np.repeat(np.arange(len(left)), _counts)
+    _offsets = np.arange(len(_left)) - np.repeat(np.cumsum(_counts) - _counts, _counts)
+    return _left, np.repeat(_lo, _counts) + _offsets
+
+
+def _semi_join(left, right):
+    """Mask of ``left`` keys found in the *sorted* ``right`` keys."""
+    if not len(right):
+        return np.zeros(len(left), dtype=bool)
+    _index = np.minimum(np.searchsorted(right, left), len(right) - 1)
+    return right[_index] == left
+
+
+class VectorizedTreeEnsemble(TreeEnsemble):
+    """Boosted relational regression trees evaluated as NumPy join plans.
+
+    Instead of proving one example at a time, every clause body is compiled
+    into a sequence of semi-joins and joins over the integer arrays in a
+    :class:`srlearn.columnar.ColumnarFacts`, and evaluated for all remaining
+    examples at once.
+    Results are the same as :class:`TreeEnsemble`.
+    """
+
+    def __init__(self, estimators, target, prior=0.0, weights=None):
+        super().__init__(estimators, target, prior, weights)
+        self.plans = [[_compile_clause(_c) for _c in _tree] for _tree in self.trees]
+
+    @staticmethod
+    def _satisfied(plan, encoded, rows, facts, cache):
+        """Boolean mask over ``rows`` of examples which satisfy a clause."""
+        (_head_vars, _head_constants, _head_equal), _steps = plan
+        _examples = encoded[rows]
+
+        _mask = np.ones(len(rows), dtype=bool)
+        for _position, _term in _head_constants:
+            _mask &= _examples[:, _position] == facts.symbols.get(_term)
+        for _a, _b in _head_equal:
+            _mask &= _examples[:, _a] == _examples[:, _b]
+
+        # Example row numbers and symbol ids share one radix for packing keys.
+        # Constants only in the examples have ids from len(facts.symbols) up.
+        _base = max(len(facts.symbols), len(encoded), int(encoded.max(initial=0)) + 1)
+        _columns = {"": np.flatnonzero(_mask)}
+        for _position, _var in _head_vars:
+            _columns[_var] = _examples[_columns[""], _position]
+
+        for _step in _steps:
+            _on = np.empty((len(_columns[""]), len(_step.bound)), dtype=np.int64)
+            for i, (_, _v) in enumerate(_step.bound):
+                _on[:, i] = _columns[_v]
+            _table, _right, _left = _sorted_fact_keys(_step, facts, _base, _on, cache)
+
+            if not _step.new:
+                # Semi-join: no variables introduced here are used later.
+                _hit = _semi_join(_left, _right)
+                _columns = {_v: _columns[_v][_hit] for _v in ("",) + _step.keep}
+            else:
+                _li, _ri = _join_indices(_left, _right)
+                _joined = {"": _columns[""][_li]}
+                for _v in _step.keep:
+                    if _v in _columns:
+                        _joined[_v] = _columns[_v][_li]
+                for _position, _v in _step.new:
+                    _joined[_v] = _table[_ri, _position]
+                _columns = _joined
+
+            # Project onto the example row and live variables, then dedupe.
+            if _step.keep and len(_columns[""]):
+                _names = ("",) + _step.keep
+                _stacked = np.stack([_columns[_v] for _v in _names], axis=1)
+                _, _first = np.unique(_pack_rows(_stacked, _base), return_index=True)
+                _columns = {_v: _stacked[_first, i] for i, _v in enumerate(_names)}
+            elif not _step.keep:
+                _columns = {"": np.unique(_columns[""])}
+
+            if not len(_columns[""]):
+                break
+
+        _result = np.zeros(len(rows), dtype=bool)
+        _result[_columns[""]] = True
+        return _result
+
+    def tree_values(self, tree, plans, encoded, facts, cache=None):
+        """Value of one tree for every encoded example."""
+        cache = {} if cache is None else cache
+        _values = np.zeros(len(encoded), dtype=float)
+        _remaining = np.arange(len(encoded))
+        for _clause, _plan in zip(tree, plans):
+            if not len(_remaining):
+                break
+            if len(_clause.head) != encoded.shape[1]:
+                continue
+            _hit = self._satisfied(_plan, encoded, _remaining, facts, cache)
+            _values[_remaining[_hit]] = _clause.value
+            _remaining = _remaining[~_hit]
+        return _values
+
+    def decision_function(self, examples, facts):
+        """Sum of weighted tree values (plus the prior) for each example."""
+        _encoded = facts.encode(examples)
+        _total = np.full(len(examples), self.prior, dtype=float)
+        _cache = {}
+        for _w, _tree, _plans in zip(self.weights, self.trees, self.plans):
+            _total += _w * self.tree_values(_tree, _plans, _encoded, facts, _cache)
+        return _total
+
+
+def sigmoid(values):
+    """Convert summed tree values into probabilities."""
+    return expit(np.asarray(values, dtype=float))
+
+
+def best_f1_threshold(probabilities, labels):
+    """Choose the decision threshold the same way BoostSRL does.
+
+    Examples are visited in the order they were given (positives, then
+    negatives). Each time the probability changes, the point halfway between
+    the previous and current probability is a candidate threshold, and the
+    candidate with the greatest F1 is kept.
+    """
+    _tp = 0.0
+    _fp = 0.0
+    _fn = float(np.sum(labels))
+
+    _threshold = 0.0
+    _best_f1 = 0.0
+    _last = 1.0
+    for _prob, _label in zip(probabilities, labels):
+        if _prob != _last:
+            _f1 = 2 * _tp / (2 * _tp + _fp + _fn) if _tp else 0.0
+            if _f1 > _best_f1:
+                _threshold = (_last + _prob) / 2.0
+                _best_f1 = _f1
+            _last = _prob
+        if _label:
+            _tp += 1
+            _fn -= 1
+        else:
+            _fp += 1
+    return _threshold
@@ -0,0 +1,111 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Drop facts which no learned clause could use.
+
+A clause for ``target`` starts with the constants of an example bound to the
+head's variables. A body literal may only be added when the variables at its
+``+`` positions are already bound (to a constant of the same type); its
+``-`` positions then bind new variables. Walking these chains from the
+examples for at most ``max_length`` literals finds every fact a clause could
+match, and the rest can be removed before they are written for the jar.
+"""
+
+import numpy as np
+
+from ._inference import parse_examples
+from .columnar import ColumnarFacts
+from .parser import parse_mode
+
+
+def _parse_modes(modes):
+    _parsed = []
+    for _mode in modes:
+        try:
+            _parsed.append(parse_mode(_mode))
+        except ValueError:
+            continue
+    return _parsed
+
+
+def reachable_facts(facts, examples, modes, target, max_length):
+    """Facts reachable from the examples through chains of mode arguments.
+
+    Parameters
+    ----------
+    facts : ColumnarFacts
+        Facts to prune.
+    examples : list of tuple
+        Argument tuples of the examples.
+    modes : list of str
+        Modes, e.g. ``Background.modes``.
+    target : str
+        Target predicate. Its mode gives the types of the examples'
+        arguments; without one, they may be used as any type.
+    max_length : int
+        Maximum number of literals in the body of a clause.
+
+    Returns
+    -------
+    facts : ColumnarFacts
+        The reachable facts, sharing the symbol table of ``facts``. Facts of
+        predicates without a mode are not reachable.
+    """
+    _modes = [_m for _m in _parse_modes(modes) if _m.predicate != target]
+    _target_modes = [_m for _m in _parse_modes(modes) if _m.predicate == target]
+    _types = set(_t for _m in _modes for _t in _m.types)
+    _types.update(_t for _m in _target_modes for _t in _m.types)
+
+    _encoded = facts.encode(examples)
+    _n = len(facts.symbols)
+    _reached = {_type: np.zeros(_n, dtype=bool) for _type in _types}
+
+    # Constants of the examples bind the head's variables.
+    for i in range(_encoded.shape[1]):
+        _head_types = set(
+            _m.types[i] for _m in _target_modes if _m.arity == _encoded.shape[1]
+        )
+        # Constants which are not in the facts cannot reach any fact.
+        _known = _encoded[:, i][_encoded[:, i] < _n]
+        for _type in _head_types or _types:
+            _reached[_type][_known] = True
+
+    _keep = {}
+    for _ in range(max_length):
+        _changed = False
+        for _mode in _modes:
+            _table = facts.table(_mode.predicate, _mode.arity)
+            if len(_table) == 0:
+                continue
+            _usable = np.ones(len(_table), dtype=bool)
+            for i, (_marker, _type) in enumerate(zip(_mode.markers, _mode.types)):
+                if "+" in _marker:
+                    _usable &= _reached[_type][_table[:, i]]
+
+            _key = (_mode.predicate, _mode.arity)
+            _before = _keep.get(_key)
+            if _before is None:
+                _keep[_key] = _usable
+            else:
+                _keep[_key] = _before | _usable
+            if _before is None or (_keep[_key] != _before).any():
+                _changed = True
+
+            _rows = _table[_usable]
+            for i, (_marker, _type) in enumerate(zip(_mode.markers, _mode.types)):
+                if "-" in _marker:
+                    _reached[_type][_rows[:, i]] = True
+        if not _changed:
+            break
+
+    return facts.select(_keep)
+
+
+def prune_database(database, modes, target, max_length):
+    """Facts of a Database which a clause could use. See :func:`reachable_facts`"""
+    _examples = []
+    for _attribute in (database.pos, database.neg):
+        _examples += parse_examples(_attribute, target)[0]
+    return reachable_facts(
+        ColumnarFacts.from_database(database), _examples, modes, target, max_length
+    )
@@ -0,0 +1,442 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Run the jar files in a subprocess without a shell.
+"""
+
+import asyncio
+import codecs
+import collections
+import io
+import locale
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+
+
+class JVMOutOfMemoryError(MemoryError, RuntimeError):
+    """A command exited after the JVM ran out of memory.
+
+    This is a RuntimeError like other failed commands, and a MemoryError so
+    it can be handled separately, e.g. by retrying with a larger heap
+    (see :class:`srlearn.jvm.ResourceProfile`).
+    """
+
+
+# Printed by the JVM for an uncaught OutOfMemoryError, or by
+# -XX:+ExitOnOutOfMemoryError ("Terminating due to java.lang.OutOfMemoryError").
+_OUT_OF_MEMORY = "java.lang.OutOfMemoryError"
+
+
+class CommandResult:
+    """Output of a finished command.
+
+    Attributes
+    ----------
+    returncode : int
+        Exit status of the process.
+    lines : collections.deque
+        The last lines written to stdout, without line endings.
+    matches : dict
+        For each named pattern, the first group of its first match.
+    out_of_memory : bool
+        Whether the command printed a ``java.lang.OutOfMemoryError``.
+    wall_time : float
+        Seconds from starting the command until it exited.
+    first_output : float or None
+        Seconds until the first line of output, e.g. for the JVM to start.
+    usage : dict or None
+        CPU seconds (``user_time``, ``system_time``) and peak resident memory
+        in bytes (``max_rss``) of the command, where they can be measured.
+    """
+
+    def __init__(self, buffer_lines):
+        self.returncode = None
+        self.lines = collections.deque(maxlen=buffer_lines)
+        self.matches = {}
+        self.out_of_memory = False
+        self.wall_time = None
+        self.first_output = None
+        self.usage = None
+        self._started = time.monotonic()
+        self._parent_rss = _peak_rss()
+
+    def tail(self):
+        return "\n".join(self.lines)
+
+
+def _popen_process_group():
+    """Arguments for ``Popen`` to start a command in a new process group."""
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def _kill_process_group(process):
+    if os.name == "nt":
+        process.kill()
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+    process.wait()
+
+
+def _search(line, patterns, matches):
+    for _name, _pattern in patterns.items():
+        if _name not in matches:
+            _match = _pattern.search(line)
+            if _match:
+                matches[_name] = _match.group(1)
+
+
+def _handle_line(line, result, log, patterns, on_line):
+    if result.first_output is None:
+        result.first_output = time.monotonic() - result._started
+    if log is not None:
+        log.write(line)
+    line = line.rstrip("\r\n")
+    if on_line is not None:
+        on_line(line)
+    result.lines.append(line)
+    _search(line, patterns, result.matches)
+    if _OUT_OF_MEMORY in line:
+        result.out_of_memory = True
+
+
+def _consume(stream, result, log, patterns, on_line):
+    for _line in stream:
+        _handle_line(_line, result, log, patterns, on_line)
+
+
+async def _consume_async(stream, result, log, patterns, on_line):
+    # Decode like ``universal_newlines=True`` in Popen.
+    _decoder = io.IncrementalNewlineDecoder(
+        codecs.getincrementaldecoder(locale.getpreferredencoding(False))(),
+        translate=True,
+    )
+    _partial = ""
+    while True:
+        _chunk = await stream.read(1 << 16)
+        _text = _partial + _decoder.decode(_chunk, final=not _chunk)
+        _lines = _text.split("\n")
+        _partial = _lines.pop()
+        for _line in _lines:
+            _handle_line(_line + "\n", result, log, patterns, on_line)
+        if not _chunk:
+            break
+    if _partial:
+        _handle_line(_partial, result, log, patterns, on_line)
+
+
+def _exit_code(status):
+    """The returncode Popen reports for a status from ``os.wait4``."""
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _peak_rss():
+    """Peak resident memory of this process in bytes, or None."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    # Kilobytes on Linux, bytes on macOS.
+    _scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * _scale
+
+
+def _poll(process, result):
+    """Check whether the process exited, recording its resource usage.
+
+    Where ``os.wait4`` is available the process is reaped with it, which
+    returns the CPU time and peak memory of the process (and of the children
+    it waited for, e.g. the ``auc.jar`` started during inference).
+    """
+    if not hasattr(os, "wait4"):
+        return process.poll()
+    try:
+        _pid, _status, _usage = os.wait4(process.pid, os.WNOHANG)
+    except ChildProcessError:
+        return process.poll()
+    if _pid == 0:
+        _sample_usage(process.pid, result)
+        return None
+    process.returncode = _exit_code(_status)
+
+    _sampled = (result.usage or {}).get("max_rss")
+    _max_rss = _usage.ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+    if result._parent_rss is not None and _max_rss <= result._parent_rss:
+        # Linux reports the peak of the parent (from before ``exec``) for a
+        # child which used less, so use the samples from /proc instead.
+        _max_rss = _sampled
+    result.usage = {"user_time": _usage.ru_utime, "system_time": _usage.ru_stime}
+    if _max_rss is not None:
+        result.usage["max_rss"] = _max_rss
+    return process.returncode
+
+
+def _sample_usage(pid, result):
+    """Record CPU time and peak memory of a running process from ``/proc``.
+
+    Used when the process is reaped by asyncio, and for the peak memory of a
+    process which used less than its parent (see :func:`_poll`). Sampled
+    while the process runs, so the last moments are missed.
+    """
+    try:
+        with open("/proc/{0}/stat".format(pid), "r") as _fh:
+            # Fields after the command name, which may contain spaces.
+            _fields = _fh.read().rsplit(")", 1)[1].split()
+        with open("/proc/{0}/status".format(pid), "r") as _fh:
+            _peak = [_l for _l in _fh if _l.startswith("VmHWM:")]
+    except (OSError, IndexError):
+        return
+    _ticks = os.sysconf("SC_CLK_TCK")
+    _usage = {
+        "user_time": int(_fields[11]) / _ticks,
+        "system_time": int(_fields[12]) / _ticks,
+    }
+    # Exiting processes have no VmHWM, keep the peak of earlier samples.
+    _max_rss = [(result.usage or {}).get("max_rss", 0)]
+    if _peak:
+        _max_rss.append(int(_peak[0].split()[1]) * 1024)
+    if max(_max_rss):
+        _usage["max_rss"] = max(_max_rss)
+    result.usage = _usage
+
+
+async def _kill_process_group_async(process):
+    if os.name == "nt":
+        process.kill()
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+    await process.wait()
+
+
+def _pin_to(cpus):
+    """A ``preexec_fn`` restricting the child (and its threads) to ``cpus``."""
+    _cpus = set(cpus)
+
+    def _pin():
+        os.sched_setaffinity(0, _cpus)
+
+    return _pin
+
+
+def search_file(path, patterns):
+    """Match named patterns against a file one line at a time.
+
+    Returns a dict with the first group of the first match of each pattern.
+    """
+    _matches = {}
+    with open(path, "r") as _fh:
+        for _line in _fh:
+            _search(_line, patterns, _matches)
+    return _matches
+
+
+def run_command(
+    argv,
+    log=None,
+    timeout=None,
+    cancel=None,
+    patterns=None,
+    buffer_lines=1000,
+    cpus=None,
+    on_line=None,
+):
+    """Run a command and stream its output, without starting a shell.
+
+    Parameters
+    ----------
+    argv : list of str
+        Program and arguments, e.g. ``["java", "-jar", "SRLBoost.jar", "-l"]``
+    log : str (or pathlike), optional
+        Also write everything the command prints (to stdout or stderr) to
+        this file.
+    timeout : float, optional
+        Wall-clock seconds before the command is killed.
+    cancel : threading.Event, optional
+        Setting this event from another thread kills the command.
+    patterns : dict, optional
+        Compiled regular expressions (with one group) by name, matched
+        against each line as it arrives.
+    buffer_lines : int (Default: 1000)
+        Number of output lines kept in memory.
+    cpus : iterable of int, optional
+        Run the command on these CPUs only (Linux).
+    on_line : callable, optional
+        Called with each line of output (without the line ending) as it
+        arrives, e.g. a :class:`srlearn.progress.TrainingLog`.
+
+    Returns
+    -------
+    result : CommandResult
+
+    Raises
+    ------
+    subprocess.TimeoutExpired
+        If the command ran longer than ``timeout``.
+    JVMOutOfMemoryError
+        If the command exited with a non-zero status after printing a
+        ``java.lang.OutOfMemoryError``.
+    RuntimeError
+        If the command was cancelled or exited with a non-zero status.
+    """
+    argv = [str(_a) for _a in argv]
+    _result = CommandResult(buffer_lines)
+    _deadline = None if timeout is None else time.monotonic() + timeout
+    # Line buffered, so the log can be followed while the command runs.
+    _log = None if log is None else open(log, "w", buffering=1)
+    _options = _popen_process_group()
+    if cpus is not None:
+        _options["preexec_fn"] = _pin_to(cpus)
+
+    try:
+        _process = subprocess.Popen(
+            argv,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+            **_options
+        )
+    except OSError:
+        if _log is not None:
+            _log.close()
+        raise
+
+    _reader = threading.Thread(
+        target=_consume,
+        args=(_process.stdout, _result, _log, patterns or {}, on_line),
+        daemon=True,
+    )
+    _reader.start()
+
+    try:
+        while True:
+            if _poll(_process, _result) is not None:
+                break
+            # The output ends when the process exits, so wake up then.
+            if _reader.is_alive():
+                _reader.join(timeout=0.05)
+            else:
+                time.sleep(0.001)
+            if cancel is not None and cancel.is_set():
+                raise RuntimeError(
+                    "Cancelled when running command: {0}".format(" ".join(argv))
+                )
+            if _deadline is not None and time.monotonic() > _deadline:
+                raise subprocess.TimeoutExpired(argv, timeout, _result.tail())
+    except BaseException:
+        # Including KeyboardInterrupt: do not leave the JVM running.
+        _kill_process_group(_process)
+        raise
+    finally:
+        _reader.join()
+        _process.stdout.close()
+        if _log is not None:
+            _log.close()
+
+    _result.returncode = _process.returncode
+    _result.wall_time = time.monotonic() - _result._started
+    return _check_result(argv, _result)
+
+
+async def run_command_async(
+    argv,
+    log=None,
+    timeout=None,
+    cancel=None,
+    patterns=None,
+    buffer_lines=1000,
+    cpus=None,
+    on_line=None,
+):
+    """Run a command like :func:`run_command`, without blocking the event loop.
+
+    The command is started with ``asyncio.create_subprocess_exec``, and its
+    output is read by the event loop. Cancelling the task awaiting this
+    coroutine kills the command (and the processes it started) before the
+    ``asyncio.CancelledError`` propagates.
+
+    Parameters and exceptions are the same as for :func:`run_command`.
+
+    Returns
+    -------
+    result : CommandResult
+    """
+    argv = [str(_a) for _a in argv]
+    _result = CommandResult(buffer_lines)
+    _deadline = None if timeout is None else time.monotonic() + timeout
+    _log = None if log is None else open(log, "w", buffering=1)
+    _options = _popen_process_group()
+    if cpus is not None:
+        _options["preexec_fn"] = _pin_to(cpus)
+
+    try:
+        _process = await asyncio.create_subprocess_exec(
+            *argv,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            **_options
+        )
+    except BaseException:
+        if _log is not None:
+            _log.close()
+        raise
+
+    _reader = asyncio.ensure_future(
+        _consume_async(_process.stdout, _result, _log, patterns or {}, on_line)
+    )
+    _wait = asyncio.ensure_future(_process.wait())
+
+    try:
+        while True:
+            _sample_usage(_process.pid, _result)
+            _done, _ = await asyncio.wait({_wait}, timeout=0.05)
+            if _done:
+                break
+            if cancel is not None and cancel.is_set():
+                raise RuntimeError(
+                    "Cancelled when running command: {0}".format(" ".join(argv))
+                )
+            if _deadline is not None and time.monotonic() > _deadline:
+                raise subprocess.TimeoutExpired(argv, timeout, _result.tail())
+    except BaseException:
+        # Including asyncio.CancelledError: do not leave the JVM running.
+        await _kill_process_group_async(_process)
+        raise
+    finally:
+        try:
+            await _reader
+        finally:
+            if _log is not None:
+                _log.close()
+
+    _result.returncode = _process.returncode
+    _result.wall_time = time.monotonic() - _result._started
+    return _check_result(argv, _result)
+
+
+def _check_result(argv, result):
+    if result.returncode != 0 and result.out_of_memory:
+        raise JVMOutOfMemoryError(
+            "The JVM ran out of memory when running command: {0}\n{1}".format(
+                " ".join(argv), result.tail()
+            )
+        )
+    if result.returncode != 0:
+        raise RuntimeError(
+            "Error when running command: {0}\n{1}".format(
+                " ".join(argv), result.tail()
+            )
+        )
+    return result
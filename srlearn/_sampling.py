@@ -0,0 +1,187 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Sample negative examples under the closed world assumption.
+
+Every tuple of constants with the types of the target's mode, which is not a
+positive example, is a negative example. Writing all of them only for
+``-negPosRatio`` to keep a sample is often most of the I/O of a fit. Here the
+domain of each type is read from the facts, and tuples are drawn from the
+cross product of the domains in batches, so it is never built.
+"""
+
+import numpy as np
+from sklearn.utils import check_random_state
+
+from ._inference import _pack_rows
+from ._inference import parse_examples
+from .columnar import ColumnarFacts
+from .parser import parse_mode
+
+_BATCH_SIZE = 1 << 20
+
+
+def type_domains(facts, modes):
+    """Constants appearing at each type's argument positions in the facts.
+
+    Parameters
+    ----------
+    facts : ColumnarFacts
+        Facts to read the constants from.
+    modes : list of str
+        Modes, e.g. ``Background.modes``.
+
+    Returns
+    -------
+    domains : dict
+        Each type mapped to a sorted array of symbol ids.
+    """
+    _columns = {}
+    for _string in modes:
+        try:
+            _mode = parse_mode(_string)
+        except ValueError:
+            continue
+        _table = facts.table(_mode.predicate, _mode.arity)
+        for i, _type in enumerate(_mode.types):
+            _columns.setdefault(_type, []).append(_table[:, i])
+    return {
+        _type: np.unique(np.concatenate(_arrays)) for _type, _arrays in _columns.items()
+    }
+
+
+def _target_mode(modes, target, arity):
+    for _string in modes:
+        try:
+            _mode = parse_mode(_string)
+        except ValueError:
+            continue
+        if _mode.predicate == target and _mode.arity == arity:
+            return _mode
+    raise ValueError(
+        "Sampling negatives needs a mode for '{0}/{1}'".format(target, arity)
+    )
+
+
+def _domain_indices(rows, domains):
+    """Positions of symbol ids in their domains, dropping rows outside them."""
+    _indices = np.empty(rows.shape, dtype=np.int64)
+    _inside = np.ones(len(rows), dtype=bool)
+    for i, _domain in enumerate(domains):
+        _position = np.searchsorted(_domain, rows[:, i])
+        _position[_position == len(_domain)] = 0
+        _inside &= _domain[_position] == rows[:, i]
+        _indices[:, i] = _position
+    return _indices[_inside]
+
+
+def _new_rows(known, candidates, base):
+    """Candidates which are not known, nor repeated, in the order drawn."""
+    _keys = _pack_rows(np.concatenate([known, candidates]), base)
+    _, _first = np.unique(_keys, return_index=True)
+    _first = np.sort(_first[_first >= len(known)])
+    return candidates[_first - len(known)]
+
+
+def sample_negatives(facts, examples, modes, target, n_samples, random_state=None):
+    """Draw tuples of constants which are not positive examples.
+
+    Parameters
+    ----------
+    facts : ColumnarFacts
+        Facts giving the constants of each type.
+    examples : list of tuple
+        Argument tuples of the positive examples.
+    modes : list of str
+        Modes, including one for ``target``.
+    target : str
+        Target predicate.
+    n_samples : int
+        Number of negatives to draw. When fewer tuples are left, all of them
+        are returned.
+    random_state : int, RandomState instance or None (default: None)
+        Seed or random number generator.
+
+    Returns
+    -------
+    negatives : numpy.ndarray
+        Symbol ids of the negatives, shape ``(n, arity)``.
+    n_closed_world : int
+        Number of negatives under the closed world assumption.
+    unknown : list of str
+        Constants of the examples which are not in the facts, numbered after
+        the symbols of ``facts`` (see :meth:`ColumnarFacts.encode`).
+    """
+    if not examples:
+        raise ValueError("Sampling negatives needs positive examples")
+    _random = check_random_state(random_state)
+    _arity = len(examples[0])
+    _mode = _target_mode(modes, target, _arity)
+
+    _domains = type_domains(facts, modes)
+    _positives, _unknown = facts.encode(examples, return_unknown=True)
+    for i, _type in enumerate(_mode.types):
+        _domains[_type] = np.union1d(_domains[_type], _positives[:, i])
+    _domains = [_domains[_type] for _type in _mode.types]
+    _sizes = [len(_domain) for _domain in _domains]
+    _base = max(_sizes)
+
+    _known = _new_rows(
+        np.empty((0, _arity), dtype=np.int64),
+        _domain_indices(_positives, _domains),
+        _base,
+    )
+    _total = 1
+    for _size in _sizes:
+        _total *= _size
+    _available = _total - len(_known)
+
+    if n_samples >= _available:
+        # Every negative is needed: enumerate the (small) cross product.
+        _grid = np.indices(_sizes).reshape(_arity, -1).T
+        _chosen = _new_rows(_known, _grid, _base)
+        _chosen = _chosen[_random.permutation(len(_chosen))]
+    else:
+        _chosen = np.empty((0, _arity), dtype=np.int64)
+        while len(_chosen) < n_samples:
+            _needed = n_samples - len(_chosen)
+            # Draw enough that, after rejecting positives and repeats, one
+            # batch is usually sufficient.
+            _draw = min(int(_needed * _total / _available * 1.1) + 16, _BATCH_SIZE)
+            _candidates = np.column_stack(
+                [_random.randint(0, _size, size=_draw) for _size in _sizes]
+            )
+            _fresh = _new_rows(np.concatenate([_known, _chosen]), _candidates, _base)
+            _chosen = np.concatenate([_chosen, _fresh[:_needed]])
+
+    _negatives = np.column_stack(
+        [_domains[i][_chosen[:, i]] for i in range(_arity)]
+    ).reshape(len(_chosen), _arity)
+    return _negatives, _available, _unknown
+
+
+def sample_database_negatives(database, modes, target, ratio, random_state=None):
+    """Negatives for a Database. See :meth:`srlearn.Database.sample_negatives`"""
+    _facts = ColumnarFacts.from_database(database)
+    _examples = parse_examples(database.pos, target)[0]
+    _n = int(round(ratio * len(_examples)))
+    _negatives, _available, _unknown = sample_negatives(
+        _facts, _examples, modes, target, _n, random_state
+    )
+
+    _symbols = _facts.symbols.symbols + _unknown
+    _names = np.array(_symbols, dtype=object)
+    _columns = [_names[_negatives[:, i]] for i in range(_negatives.shape[1])]
+
+    # Bytes of "target(a,b).\n", without formatting the lines.
+    _lengths = np.fromiter(map(len, _symbols), dtype=np.int64)
+    _fixed = len(target) + _negatives.shape[1] + 3
+    _written = int(_lengths[_negatives].sum()) + _fixed * len(_negatives)
+    _per_line = _written / len(_negatives) if len(_negatives) else 0.0
+    _stats = {
+        "negatives": len(_negatives),
+        "closed_world": _available,
+        "bytes_written": _written,
+        "bytes_saved": int(round((_available - len(_negatives)) * _per_line)),
+    }
+    return _columns, _stats
@@ -0,0 +1,228 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Stream facts and examples from CSV, Parquet, and Arrow files.
+
+Files are read in batches of rows and each batch is formatted into lines
+before the next is read, so memory is bounded by the batch size rather than
+the size of the file. With `pyarrow <https://arrow.apache.org/docs/python/>`_
+available, lines are assembled with Arrow compute functions; otherwise CSV
+files are read with the standard library :mod:`csv` module. Values are
+formatted as with :func:`srlearn._triples.format_constant`.
+"""
+
+import csv
+import itertools
+import os
+
+from ._triples import CONSTANT_PATTERN
+from ._triples import format_constant
+
+_ENGINES = ("auto", "pyarrow", "csv")
+_PARQUET = (".parquet", ".pq")
+_ARROW = (".arrow", ".feather", ".ipc")
+
+
+def _pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError as excep:
+        raise ImportError(
+            "pyarrow needs to be available to read Parquet or Arrow files"
+        ) from excep
+    return pyarrow
+
+
+def _has_pyarrow():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def _read_header(path, delimiter):
+    with open(path, "r", newline="") as _fh:
+        return next(csv.reader(_fh, delimiter=delimiter), [])
+
+
+def _select(header, columns, path):
+    if columns is None:
+        return list(header)
+    _missing = [_c for _c in columns if _c not in header]
+    if _missing:
+        raise ValueError("Columns {0} are not in {1}".format(_missing, path))
+    return list(columns)
+
+
+def _arrow_batches(path, columns, batch_size, delimiter):
+    """Record batches from a CSV, Parquet, or Arrow file with pyarrow."""
+    pyarrow = _pyarrow()
+    _extension = os.path.splitext(str(path))[1].lower()
+
+    if _extension in _PARQUET:
+        import pyarrow.parquet
+
+        _file = pyarrow.parquet.ParquetFile(path)
+        _names = _select(_file.schema_arrow.names, columns, path)
+        yield from _file.iter_batches(batch_size=batch_size, columns=_names)
+
+    elif _extension in _ARROW:
+        with pyarrow.memory_map(str(path), "r") as _source:
+            try:
+                _reader = pyarrow.ipc.open_file(_source)
+                _batches = (
+                    _reader.get_batch(i) for i in range(_reader.num_record_batches)
+                )
+            except pyarrow.ArrowInvalid:
+                _reader = pyarrow.ipc.open_stream(_source)
+                _batches = iter(_reader)
+            _names = _select(_reader.schema.names, columns, path)
+            for _batch in _batches:
+                yield pyarrow.RecordBatch.from_arrays(
+                    [_batch.column(_name) for _name in _names], names=_names
+                )
+
+    else:
+        import pyarrow.csv
+
+        # Read every column as text, so values are written as they appear.
+        _header = _read_header(path, delimiter)
+        _names = _select(_header, columns, path)
+        _reader = pyarrow.csv.open_csv(
+            path,
+            read_options=pyarrow.csv.ReadOptions(block_size=1 << 20),
+            parse_options=pyarrow.csv.ParseOptions(delimiter=delimiter),
+            convert_options=pyarrow.csv.ConvertOptions(
+                include_columns=_names,
+                column_types={_name: pyarrow.string() for _name in _names},
+                strings_can_be_null=True,
+            ),
+        )
+        yield from _reader
+
+
+def _arrow_blocks(predicate, path, columns, batch_size, delimiter):
+    """Blocks of lines assembled from record batches with Arrow compute."""
+    pyarrow = _pyarrow()
+    import pyarrow.compute as pc
+
+    for _batch in _arrow_batches(path, columns, batch_size, delimiter):
+        _parts = [predicate + "("]
+        for i in range(_batch.num_columns):
+            if i > 0:
+                _parts.append(",")
+            _column = _batch.column(i)
+            if _column.type != pyarrow.string():
+                _column = pc.cast(_column, pyarrow.string())
+            # Treat empty strings like missing values.
+            _column = pc.if_else(pc.equal(_column, ""), None, _column)
+            _valid = pc.match_substring_regex(_column, CONSTANT_PATTERN)
+            if not pc.all(_valid).as_py():
+                # Only columns with values which are not constants or numbers
+                # are formatted in Python.
+                _column = pyarrow.array(
+                    [
+                        None if _value is None else format_constant(_value)
+                        for _value in _column.to_pylist()
+                    ],
+                    type=pyarrow.string(),
+                )
+            _parts.append(_column)
+        _parts.append(").")
+        # Null in any column makes the line null, and it is dropped.
+        _lines = pc.drop_null(pc.binary_join_element_wise(*_parts, ""))
+        yield _lines.to_numpy(zero_copy_only=False).tolist()
+
+
+def _csv_blocks(predicate, path, columns, batch_size, delimiter):
+    """Blocks of lines from a CSV file with the :mod:`csv` module.
+
+    Rows with a different number of fields than the header are skipped.
+    """
+    with open(path, "r", newline="") as _fh:
+        _reader = csv.reader(_fh, delimiter=delimiter)
+        _header = next(_reader, None)
+        if _header is None:
+            return
+        _positions = [_header.index(_c) for _c in _select(_header, columns, path)]
+        _all = _positions == list(range(len(_header)))
+        _prefix = predicate + "("
+        while True:
+            _rows = list(itertools.islice(_reader, batch_size))
+            if not _rows:
+                return
+            if not _all:
+                _rows = [
+                    [_row[i] for i in _positions]
+                    for _row in _rows
+                    if len(_row) == len(_header)
+                ]
+            yield [
+                _prefix + ",".join(map(format_constant, _row)) + ")."
+                for _row in _rows
+                if "" not in _row and len(_row) == len(_positions)
+            ]
+
+
+class TableFileLines:
+    """Lines read from CSV, Parquet, or Arrow files each time they are iterated.
+
+    Parameters
+    ----------
+    sources : dict
+        Predicate names mapped to a path, or to a ``(path, columns)`` tuple
+        naming the columns to use as arguments, in order.
+    batch_size : int
+        Rows read at a time. CSV files read with pyarrow are read in blocks
+        of 1 MB instead.
+    engine : str
+        ``"pyarrow"``, ``"csv"``, or ``"auto"`` for pyarrow when it is
+        installed. Parquet and Arrow files always need pyarrow.
+    delimiter : str
+        Field delimiter for CSV files.
+    """
+
+    def __init__(self, sources, batch_size=65536, engine="auto", delimiter=","):
+        if engine not in _ENGINES:
+            raise ValueError("'engine' must be one of {0}".format(_ENGINES))
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("'batch_size' must be an 'int' >= 1")
+        if engine == "pyarrow":
+            _pyarrow()
+        self.sources = {}
+        for _predicate, _source in sources.items():
+            if isinstance(_source, tuple):
+                _path, _columns = _source
+                _columns = list(_columns)
+            else:
+                _path, _columns = _source, None
+            self.sources[_predicate] = (_path, _columns)
+        self.batch_size = batch_size
+        self.engine = engine
+        self.delimiter = delimiter
+
+    def _use_pyarrow(self, path):
+        if os.path.splitext(str(path))[1].lower() in _PARQUET + _ARROW:
+            return True
+        if self.engine == "auto":
+            return _has_pyarrow()
+        return self.engine == "pyarrow"
+
+    def blocks(self):
+        """Iterate over lists of lines, one list per batch of rows."""
+        for _predicate, (_path, _columns) in self.sources.items():
+            if self._use_pyarrow(_path):
+                _blocks = _arrow_blocks
+            else:
+                _blocks = _csv_blocks
+            yield from _blocks(
+                _predicate, _path, _columns, self.batch_size, self.delimiter
+            )
+
+    def __iter__(self):
+        for _block in self.blocks():
+            yield from _block
+
+    def __repr__(self):
+        return "<lines from files for {0}>".format(", ".join(self.sources))
@@ -0,0 +1,203 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Stream facts from subject/predicate/object triples.
+
+Each triple ``(subject, predicate, object)`` becomes the fact
+``predicate(subject,object).`` Triples are read from tab-separated files, or
+from N-Triples files such as
+``<http://ex.org/alice> <http://ex.org/knows> <http://ex.org/bob> .``
+"""
+
+import itertools
+import os
+import re
+
+from .system_manager import compression
+from .system_manager import open_file
+
+_FORMATS = ("auto", "tsv", "ntriples")
+_INVALID = re.compile(r"[^A-Za-z0-9_]+")
+_LITERAL = re.compile(r'^"((?:[^"\\]|\\.)*)"(?:@[A-Za-z0-9-]+|\^\^<[^>]*>)?$')
+# Values written as they are by format_constant: constants, or numbers.
+CONSTANT_PATTERN = (
+    r"^(?:[a-z0-9][A-Za-z0-9_]*|-?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?)$"
+)
+_CONSTANT = re.compile(CONSTANT_PATTERN)
+
+
+def _local_name(term):
+    """The part of a URI after the last ``/`` or ``#``, or the lexical value
+    of a literal, without the N-Triples brackets and quotes."""
+    if term[:1] == "<" and term[-1:] == ">":
+        term = term[1:-1]
+        return term[max(term.rfind("/"), term.rfind("#")) + 1 :] or term
+    if term[:1] == '"':
+        _match = _LITERAL.match(term)
+        if _match:
+            return _match.group(1)
+    return term
+
+
+def _is_valid(term):
+    """True for ASCII letters, digits and ``_``, starting lower case or a digit."""
+    _first = term[:1]
+    return (
+        (_first.islower() or _first.isdigit())
+        and term.isascii()
+        and term.replace("_", "a").isalnum()
+    )
+
+
+def normalize_constant(term):
+    """Make a term into a valid BoostSRL constant.
+
+    URIs are shortened to their local name and literals to their value. Runs
+    of characters other than letters, digits and ``_`` become ``_``, and a
+    constant which would not start with a lower case letter or a digit (and
+    so would be read as a variable) is prefixed with ``c_``.
+
+    >>> normalize_constant("<http://dbpedia.org/resource/Ada_Lovelace>")
+    'c_Ada_Lovelace'
+    >>> normalize_constant('"1815-12-10"^^<http://www.w3.org/2001/XMLSchema#date>')
+    '1815_12_10'
+    """
+    if _is_valid(term):
+        return term
+    _name = _INVALID.sub("_", _local_name(term)).strip("_")
+    if not _name:
+        return "c_"
+    if _is_valid(_name):
+        return _name
+    return "c_" + _name
+
+
+def format_constant(value):
+    """Format a value read from a table (or array) as a BoostSRL constant.
+
+    Numbers, and text which is already a valid constant or a number, are
+    written as they are. Booleans become ``true`` or ``false``, and other text
+    is normalized with :func:`normalize_constant`, so values such as
+    ``"Alice"`` or ``"New York, NY"`` cannot become variables or change the
+    arity of a fact.
+
+    >>> format_constant("New York, NY"), format_constant(-1.5)
+    ('c_New_York_NY', '-1.5')
+    """
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    value = str(value)
+    if _CONSTANT.fullmatch(value):
+        return value
+    return normalize_constant(value)
+
+
+def normalize_predicate(term):
+    """Make a term into a valid BoostSRL predicate name.
+
+    Like :func:`normalize_constant`, but the first letter is made lower case
+    instead of adding a prefix.
+
+    >>> normalize_predicate("<http://xmlns.com/foaf/0.1/knows>")
+    'knows'
+    >>> normalize_predicate("<http://dbpedia.org/ontology/birthPlace>")
+    'birthPlace'
+    """
+    _name = _INVALID.sub("_", _local_name(term)).strip("_")
+    if _name[:1].isalpha():
+        return _name[:1].lower() + _name[1:]
+    return "p_" + _name
+
+
+def _split_tsv(line):
+    _fields = line.split("\t", 3)
+    if len(_fields) < 3:
+        return None
+    return _fields[0], _fields[1], _fields[2].rstrip("\r\n")
+
+
+def _split_ntriples(line):
+    line = line.strip()
+    if not line or line[0] == "#":
+        return None
+    if line[-1:] == ".":
+        line = line[:-1].rstrip()
+    _fields = line.split(None, 2)
+    if len(_fields) < 3:
+        return None
+    return _fields[0], _fields[1], _fields[2]
+
+
+class TripleLines:
+    """Facts read from a file of triples each time they are iterated.
+
+    Parameters
+    ----------
+    path : str (or pathlike)
+        File of triples, which may be compressed (e.g. ``.nt.gz``).
+    predicates : set of str, optional
+        Only keep triples whose (normalized) predicate is in this set.
+    file_format : str
+        ``"tsv"``, ``"ntriples"``, or ``"auto"`` for ``ntriples`` when the
+        file name ends with ``.nt`` (before any compression extension).
+    batch_size : int
+        Lines read at a time.
+    """
+
+    def __init__(self, path, predicates=None, file_format="auto", batch_size=65536):
+        if file_format not in _FORMATS:
+            raise ValueError("'file_format' must be one of {0}".format(_FORMATS))
+        if file_format == "auto":
+            _name = str(path)
+            if compression(_name):
+                _name = os.path.splitext(_name)[0]
+            file_format = "ntriples" if _name.endswith(".nt") else "tsv"
+        self.path = path
+        self.predicates = None if predicates is None else set(predicates)
+        self.file_format = file_format
+        self.batch_size = batch_size
+
+    def blocks(self):
+        """Iterate over lists of facts, one list per batch of lines."""
+        _split = _split_ntriples if self.file_format == "ntriples" else _split_tsv
+        _predicates = self.predicates
+        # Predicate names as written in the file, mapped to their normalized
+        # name (or None when they are filtered out).
+        _names = {}
+
+        with open_file(self.path, "r") as _fh:
+            while True:
+                _lines = list(itertools.islice(_fh, self.batch_size))
+                if not _lines:
+                    return
+                _block = []
+                for _line in _lines:
+                    _triple = _split(_line)
+                    if _triple is None:
+                        continue
+                    _subject, _predicate, _object = _triple
+                    try:
+                        _name = _names[_predicate]
+                    except KeyError:
+                        _name = normalize_predicate(_predicate)
+                        if _predicates is not None and _name not in _predicates:
+                            _name = None
+                        _names[_predicate] = _name
+                    if _name is None:
+                        continue
+                    _block.append(
+                        _name
+                        + "("
+                        + normalize_constant(_subject)
+                        + ","
+                        + normalize_constant(_object)
+                        + ")."
+                    )
+                yield _block
+
+    def __iter__(self):
+        for _block in self.blocks():
+            yield from _block
+
+    def __repr__(self):
+        return "<facts from triples in {0}>".format(self.path)
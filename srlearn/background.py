@@ -6,6 +6,8 @@ background.py
 
 import pathlib
 
+from .system_manager import remove_file
+
 
 class Background:
     """Background Knowledge for a database.
@@ -165,7 +167,9 @@ class Background:
                 if not c(param):
                     raise ValueError(message)
 
-    def write(self, filename="train", location=pathlib.Path("train")) -> None:
+    def write(
+        self, filename="train", location=pathlib.Path("train"), cache=None
+    ) -> None:
         """Write the background to disk for learning.
 
         Parameters
@@ -174,8 +178,18 @@ class Background:
             Name of the file to write to: 'train_bk.txt' or 'test_bk.txt'
         location : :class:`pathlib.Path`
             This should be handled by a manager to ensure locations do not overlap.
+        cache : :class:`srlearn.system_manager.DataCache`, optional
+            Store the background once in a cache, and link it into ``location``.
         """
 
+        if cache is not None:
+            cache.link(
+                str(self).splitlines(),
+                location.joinpath("{0}_bk.txt".format(filename)),
+            )
+            return
+
+        remove_file(location.joinpath("{0}_bk.txt".format(filename)))
         with open(location.joinpath("{0}_bk.txt".format(filename)), "w") as _fh:
             _fh.write(str(self))
 
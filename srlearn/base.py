@@ -4,19 +4,103 @@
 Base class for Boosted Relational Models
 """
 
+import asyncio
 from collections import Counter
+from collections import namedtuple
+import contextlib
+import functools
 import inspect
 import json
 import logging
+import threading
 import warnings
+import weakref
 
 from sklearn.utils.validation import check_is_fitted
 import subprocess
 
 from .background import Background
+from .database import Database
+from . import stats
+from .stats import StageTimer
 from .system_manager import FileSystem
 from .utils._parse_trees import parse_tree
+from .columnar import ColumnarFacts
+from ._inference import FactIndex
+from ._inference import TreeEnsemble
+from ._inference import VectorizedTreeEnsemble
+from ._inference import read_model_file
+from .progress import FollowThread
+from .progress import TrainingLog
+from .progress import progress_bar
+from .jvm import ResourceProfile
+from .jvm import input_size
+from .jvm import java_command
+from .jvm import java_command_async
+from .jvm import resource_profile
 from ._meta import __version__
+from ._runner import run_command
+from ._runner import run_command_async
+from ._runner import search_file
+from .worker import get_worker_pool
+
+# Arguments of ``_call_jar`` for one run of a jar.
+_JarCall = namedtuple("_JarCall", ["jar", "args", "log", "patterns", "inputs"])
+
+
+def _as_database(database):
+    """A Database from a Database or a (pos, neg, facts) named tuple."""
+    if isinstance(database, tuple):
+        _db = Database()
+        _db.pos = database.pos
+        _db.neg = database.neg
+        _db.facts = database.facts
+        return _db
+    return database
+
+
+def _following(log, on_line):
+    """Follow a log written by another process, when there is ``on_line``."""
+    if on_line is None:
+        return contextlib.nullcontext()
+    return FollowThread(log, on_line)
+
+
+def _check_cancelled(cancel, jar, args):
+    """Raise a RuntimeError if the call was cancelled before the jar started."""
+    if cancel.is_set():
+        raise RuntimeError(
+            "Cancelled before running {0} {1}".format(jar, " ".join(args))
+        )
+
+
+# One prediction at a time uses the test directory of a FileSystem.
+_test_locks = weakref.WeakKeyDictionary()
+_test_locks_lock = threading.Lock()
+
+
+def _test_lock(file_system):
+    """Lock held while a prediction writes, runs, and reads the test files."""
+    with _test_locks_lock:
+        return _test_locks.setdefault(file_system, threading.Lock())
+
+
+@contextlib.asynccontextmanager
+async def _holding_async(lock):
+    """Hold a threading lock without blocking the event loop."""
+    while not lock.acquire(blocking=False):
+        await asyncio.sleep(0.01)
+    try:
+        yield
+    finally:
+        lock.release()
+
+
+def _in_thread(function, *args):
+    """Run a blocking function in the default executor of the running loop."""
+    return asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(function, *args)
+    )
 
 
 warnings.simplefilter("default")
@@ -57,12 +141,20 @@ class BaseBoostedRelationalModel:
         max_tree_depth=3,
         neg_pos_ratio=2,
         solver = None,
+        inference="jar",
+        jvm_workers=0,
+        jvm_options=None,
+        timeout=None,
     ):
         """Initialize a BaseEstimator"""
         self.background = background
         self.target = target
         self.n_estimators = n_estimators
         self.neg_pos_ratio = neg_pos_ratio
+        self.inference = inference
+        self.jvm_workers = jvm_workers
+        self.jvm_options = jvm_options
+        self.timeout = timeout
 
         if solver is None:
             warnings.warn(
@@ -147,6 +239,34 @@ class BaseBoostedRelationalModel:
                 (lambda x: not isinstance(x, bool), lambda x: x >= 1.0),
                 "'neg_pos_ratio' must be 'int' or 'float'",
             ),
+            (
+                self.inference,
+                (str,),
+                (lambda x: x in ("jar", "python", "numpy"),),
+                "'inference' must be 'jar', 'python', or 'numpy'",
+            ),
+            (
+                self.jvm_workers,
+                (int,),
+                (
+                    lambda x: not isinstance(x, bool),
+                    lambda x: x >= 0,
+                ),
+                "'jvm_workers' must be an 'int' >= 0",
+            ),
+            (
+                self.jvm_options,
+                (type(None), str, list, tuple, dict, ResourceProfile),
+                (lambda x: not isinstance(x, str) or x == "auto",),
+                "'jvm_options' must be None, 'auto', a list of str, "
+                "or a ResourceProfile",
+            ),
+            (
+                self.timeout,
+                (type(None), int, float),
+                (lambda x: x is None or (not isinstance(x, bool) and x > 0),),
+                "'timeout' must be None or a number of seconds > 0",
+            ),
         )
 
         for param, types, constraints, message in checks:
@@ -156,6 +276,12 @@ class BaseBoostedRelationalModel:
                 if not c(param):
                     raise ValueError(message)
 
+        # Raises a ValueError for invalid lists and profile parameters.
+        resource_profile(self.jvm_options)
+        if self.jvm_workers and self.jvm_options is not None:
+            # Workers are shared, and started without per-call options.
+            raise ValueError("'jvm_options' cannot be used with 'jvm_workers' > 0")
+
         # If all params are valid, allocate a FileSystem:
         self.file_system = FileSystem()
 
@@ -194,6 +320,14 @@ class BaseBoostedRelationalModel:
             "max_tree_depth": self.max_tree_depth,
             "neg_pos_ratio": self.neg_pos_ratio,
             "solver": self.solver,
+            "inference": self.inference,
+            "jvm_workers": self.jvm_workers,
+            "jvm_options": (
+                self.jvm_options.to_dict()
+                if isinstance(self.jvm_options, ResourceProfile)
+                else self.jvm_options
+            ),
+            "timeout": self.timeout,
         }
 
         with open(file_name, "w") as _fh:
@@ -320,8 +454,192 @@ class BaseBoostedRelationalModel:
             )
         return Counter(features)
 
+    def _read_trees(self):
+        """Read the trees written by the jar after learning, return the bytes read."""
+        _estimators = []
+        _bytes = 0
+        for _tree_number in range(self.n_estimators):
+            with open(
+                self.file_system.files.TREES_DIR.joinpath(
+                    "{0}Tree{1}.tree".format(self.target, _tree_number)
+                )
+            ) as _fh:
+                _estimators.append(_fh.read())
+                _bytes += _fh.tell()
+
+        self.estimators_ = _estimators
+        return _bytes
+
+    def _fit(self, database, progress=None):
+        """Learn from a database with the jar, recording ``fit_stats_``."""
+        self._check_params()
+        _timer = StageTimer()
+        with self._cancellable() as _cancel:
+            _stored = self.file_system.cache.stored()
+            with _timer.stage("write"):
+                _call = self._train_call(database)
+            _timer.add("bytes_written", self._written_bytes("train", _stored))
+            with self._training_log(progress) as _on_line:
+                self._call_jar(*_call, timer=_timer, on_line=_on_line, cancel=_cancel)
+        with _timer.stage("read_trees"):
+            _timer.add("bytes_read", self._read_trees())
+        with _timer.stage("read_dotfiles"):
+            _timer.add("bytes_read", self._get_dotfiles())
+        self.fit_stats_ = _timer.finish()
+        stats.emit(self, "fit", self.fit_stats_)
+        return self
+
+    @contextlib.contextmanager
+    def _training_log(self, progress):
+        """A :class:`srlearn.progress.TrainingLog` for ``fit(progress=...)``."""
+        if progress is None or progress is False:
+            yield None
+            return
+        if progress is not True and not callable(progress):
+            raise ValueError("'progress' must be None, True, or a callable")
+        _bar = None
+        if progress is True:
+            _bar, progress = progress_bar(self.n_estimators)
+        _log = TrainingLog(
+            progress,
+            self.n_estimators,
+            self.file_system.files.TREES_DIR,
+            self.target,
+        )
+        try:
+            yield _log
+            _log.finish()
+        finally:
+            if _bar is not None:
+                _bar.close()
+
+    async def fit_async(self, database, progress=None):
+        """Learn structure and parameters, without blocking the event loop.
+
+        The same as ``fit``, as a coroutine: the files are written and read in
+        a thread, and the jar is run with ``asyncio.create_subprocess_exec``.
+        Cancelling the task kills the JVM.
+
+        >>> dn = await BoostedRDNClassifier(...).fit_async(train)    # doctest: +SKIP
+
+        Parameters
+        ----------
+        database : :class:`srlearn.database.Database`
+            Database containing examples and facts.
+        progress : callable or bool, optional
+            Called with a :class:`srlearn.progress.TreeProgress` (in the
+            event loop) for each tree as it is learned, or True for a tqdm
+            progress bar.
+
+        Returns
+        -------
+        self : object
+            Returns self.
+        """
+        self._check_params()
+        _timer = StageTimer()
+        with self._cancellable() as _cancel:
+            _stored = self.file_system.cache.stored()
+            with _timer.stage("write"):
+                _call = await _in_thread(self._train_call, database)
+            _timer.add("bytes_written", self._written_bytes("train", _stored))
+            with self._training_log(progress) as _on_line:
+                await self._call_jar_async(
+                    *_call, timer=_timer, on_line=_on_line, cancel=_cancel
+                )
+        with _timer.stage("read_trees"):
+            _timer.add("bytes_read", await _in_thread(self._read_trees))
+        with _timer.stage("read_dotfiles"):
+            _timer.add("bytes_read", await _in_thread(self._get_dotfiles))
+        self.fit_stats_ = _timer.finish()
+        stats.emit(self, "fit", self.fit_stats_)
+        return self
+
+    def _run_inference(self, database):
+        """Run inference with the jar (or in Python), recording ``predict_stats_``.
+
+        This is a helper method for ``predict`` and ``predict_proba``, which
+        returns the arrays of ``_read_results`` or ``_run_python_inference``.
+        """
+        self._check_initialized()
+        _timer = StageTimer()
+        database = _as_database(database)
+
+        if self.inference in ("python", "numpy"):
+            with _timer.stage("inference"):
+                _results = self._run_python_inference(database)
+        else:
+            with self._cancellable() as _cancel, _test_lock(self.file_system):
+                _stored = self.file_system.cache.stored()
+                with _timer.stage("write"):
+                    _call = self._test_call(database)
+                _timer.add("bytes_written", self._written_bytes("test", _stored))
+                _matches = self._call_jar(*_call, timer=_timer, cancel=_cancel)
+                with _timer.stage("read_results"):
+                    _results = self._read_results(_matches)
+                _timer.add("bytes_read", self._results_bytes())
+
+        self.predict_stats_ = _timer.finish()
+        stats.emit(self, "predict", self.predict_stats_)
+        return _results
+
+    async def _run_inference_async(self, database):
+        """Like :meth:`_run_inference`, without blocking the event loop."""
+        self._check_initialized()
+        _timer = StageTimer()
+        database = _as_database(database)
+
+        if self.inference in ("python", "numpy"):
+            with _timer.stage("inference"):
+                _results = await _in_thread(self._run_python_inference, database)
+        else:
+            with self._cancellable() as _cancel:
+                async with _holding_async(_test_lock(self.file_system)):
+                    _stored = self.file_system.cache.stored()
+                    with _timer.stage("write"):
+                        _call = await _in_thread(self._test_call, database)
+                    _timer.add(
+                        "bytes_written", self._written_bytes("test", _stored)
+                    )
+                    _matches = await self._call_jar_async(
+                        *_call, timer=_timer, cancel=_cancel
+                    )
+                    with _timer.stage("read_results"):
+                        _results = await _in_thread(self._read_results, _matches)
+                    _timer.add("bytes_read", self._results_bytes())
+
+        self.predict_stats_ = _timer.finish()
+        stats.emit(self, "predict", self.predict_stats_)
+        return _results
+
+    def _written_bytes(self, filename, stored):
+        """Bytes of the background and data files written for the jar.
+
+        Data linked from the cache is only counted when it was stored by this
+        write, that is when the cache's files were ``stored`` before it.
+        """
+        if filename == "train":
+            _location = self.file_system.files.TRAIN_DIR
+        else:
+            _location = self.file_system.files.TEST_DIR
+        return stats.written_size(
+            [
+                _location.joinpath("{0}_{1}.txt".format(filename, _type))
+                for _type in ("bk", "pos", "neg", "facts")
+            ],
+            self.file_system.cache.stored() - stored,
+        )
+
+    def _results_bytes(self):
+        return stats.file_size(
+            self.file_system.files.TEST_DIR.joinpath(
+                "results_" + self.target + ".db"
+            )
+        )
+
     def _get_dotfiles(self):
         dotfiles = []
+        _bytes = 0
         for i in range(self.n_estimators):
             with open(
                 self.file_system.files.DOT_DIR.joinpath(
@@ -329,12 +647,202 @@ class BaseBoostedRelationalModel:
                 )
             ) as _fh:
                 dotfiles.append(_fh.read())
+                _bytes += _fh.tell()
         self._dotfiles = dotfiles
+        return _bytes
+
+    def _get_tree_ensemble(self):
+        """Load the learned trees for evaluation without the jar."""
+        if self.background.use_std_logic_variables:
+            raise ValueError(
+                "inference='{0}' requires trees written with Prolog variables".format(
+                    self.inference
+                )
+            )
+        _prior, _weights = read_model_file(
+            self.file_system.files.BRDNS_DIR.joinpath(
+                "{0}.model".format(self.target)
+            )
+        )
+        if self.inference == "numpy":
+            return VectorizedTreeEnsemble(
+                self.estimators_, self.target, _prior, _weights
+            )
+        return TreeEnsemble(self.estimators_, self.target, _prior, _weights)
+
+    def _python_decision_function(self, examples, database):
+        """Sum the learned trees for each example without calling the jar."""
+        if self.inference == "numpy":
+            _facts = ColumnarFacts.from_database(database)
+        else:
+            _facts = FactIndex.from_database(database)
+        return self._get_tree_ensemble().decision_function(examples, _facts)
 
     def _check_initialized(self):
         """Check for the estimator(s), raise an error if not found."""
         check_is_fitted(self, "estimators_")
 
+    def _java_options(self, inputs):
+        """Options for ``java`` and CPUs to run on, from ``self.jvm_options``."""
+        _profile = resource_profile(self.jvm_options)
+        if _profile is None:
+            return [], None
+        _input_bytes = input_size(inputs) if _profile.heap == "auto" else 0
+        return _profile.java_options(_input_bytes), _profile.cpus
+
+    def _call_jar(
+        self,
+        jar,
+        args,
+        log,
+        patterns=None,
+        inputs=(),
+        timer=None,
+        on_line=None,
+        cancel=None,
+    ):
+        """Run a jar file with a list of arguments, writing its output to a log.
+
+        With ``jvm_workers == 0`` a new JVM is started for the call (see
+        :func:`srlearn.jvm.java_command`) with the options and CPUs of
+        ``self.jvm_options``, otherwise the call is handed to a shared
+        :class:`srlearn.worker.WorkerPool`.
+        Calls are stopped after ``self.timeout`` seconds, or by :meth:`cancel`.
+
+        Parameters
+        ----------
+        jar : str
+            Path to the jar file.
+        args : list of str
+            Arguments for the jar.
+        log : str (or pathlike)
+            File the output of the jar is written to.
+        patterns : dict, optional
+            Compiled regular expressions (with one group) by name, which are
+            searched for in the output.
+        inputs : list of str (or pathlike), optional
+            Files and directories read by the jar, which size the heap of an
+            automatic :class:`srlearn.jvm.ResourceProfile`.
+        timer : srlearn.stats.StageTimer, optional
+            Records the time of the ``jar`` stage, and the startup time, CPU
+            time, and peak memory of the JVM.
+        on_line : callable, optional
+            Called with each line of output while the jar runs.
+        cancel : threading.Event, optional
+            Event from :meth:`_cancellable` which stops the call when set.
+            Defaults to a new one for this call.
+
+        Returns
+        -------
+        matches : dict
+            The first group of the first match of each pattern.
+
+        Raises
+        ------
+        srlearn.jvm.JVMOutOfMemoryError
+            If the JVM ran out of memory.
+        """
+        if cancel is None:
+            with self._cancellable() as _cancel:
+                return self._call_jar(
+                    jar, args, log, patterns, inputs, timer, on_line, _cancel
+                )
+        _check_cancelled(cancel, jar, args)
+        patterns = patterns or {}
+        timer = timer or StageTimer()
+        if self.jvm_workers:
+            with timer.stage("jar"), _following(log, on_line):
+                get_worker_pool(jar, self.jvm_workers).run(
+                    args, log, timeout=self.timeout, cancel=cancel
+                )
+            return search_file(log, patterns) if patterns else {}
+        _options, _cpus = self._java_options(inputs)
+        with timer.stage("jar"), java_command(jar, _options) as _java:
+            _result = run_command(
+                _java + list(args),
+                log=log,
+                timeout=self.timeout,
+                cancel=cancel,
+                patterns=patterns,
+                cpus=_cpus,
+                on_line=on_line,
+            )
+        timer.add_command(_result)
+        return _result.matches
+
+    async def _call_jar_async(
+        self,
+        jar,
+        args,
+        log,
+        patterns=None,
+        inputs=(),
+        timer=None,
+        on_line=None,
+        cancel=None,
+    ):
+        """Run a jar file like :meth:`_call_jar`, without blocking the event loop.
+
+        Cancelling the task awaiting this kills the JVM, or stops the call in
+        a :class:`srlearn.worker.WorkerPool`.
+        """
+        if cancel is None:
+            with self._cancellable() as _cancel:
+                return await self._call_jar_async(
+                    jar, args, log, patterns, inputs, timer, on_line, _cancel
+                )
+        _check_cancelled(cancel, jar, args)
+        patterns = patterns or {}
+        timer = timer or StageTimer()
+        if self.jvm_workers:
+            try:
+                with timer.stage("jar"), _following(log, on_line):
+                    await _in_thread(
+                        lambda: get_worker_pool(jar, self.jvm_workers).run(
+                            args, log, timeout=self.timeout, cancel=cancel
+                        )
+                    )
+            except asyncio.CancelledError:
+                cancel.set()
+                raise
+            return search_file(log, patterns) if patterns else {}
+        with timer.stage("jar"):
+            _options, _cpus = await _in_thread(self._java_options, inputs)
+            async with java_command_async(jar, _options) as _java:
+                _result = await run_command_async(
+                    _java + list(args),
+                    log=log,
+                    timeout=self.timeout,
+                    cancel=cancel,
+                    patterns=patterns,
+                    cpus=_cpus,
+                    on_line=on_line,
+                )
+        timer.add_command(_result)
+        return _result.matches
+
+    def cancel(self):
+        """Stop every jar currently running on behalf of this estimator.
+
+        This is meant to be called from another thread (or the event loop)
+        while ``fit``, ``predict``, or ``predict_proba`` (or their ``_async``
+        versions) are running, which then raise a RuntimeError. Calls which
+        are still writing their data stop before the jar is started.
+        """
+        for _event in list(getattr(self, "_cancel_events", ())):
+            _event.set()
+
+    @contextlib.contextmanager
+    def _cancellable(self):
+        """A new event, set by :meth:`cancel` while the block runs."""
+        _event = threading.Event()
+        _events = self.__dict__.setdefault("_cancel_events", set())
+        _events.add(_event)
+        try:
+            yield _event
+        finally:
+            _events.discard(_event)
+
     @staticmethod
     def _call_shell_command(shell_command):
         """Start a new process to execute a shell command.
@@ -0,0 +1,433 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Columnar, interned storage for the facts in a Database.
+
+As a list of strings, each fact like ``"friends(alice,bob)."`` is a separate
+Python object with 60-100 bytes of overhead. :class:`ColumnarFacts` groups
+facts by predicate, interns each constant once in a :class:`SymbolTable`, and
+stores the arguments as one integer NumPy array per predicate, along with the
+line number of each fact.
+
+>>> from srlearn import Database
+>>> from srlearn.columnar import ColumnarFacts
+>>> db = Database()
+>>> db.facts = ColumnarFacts(["friends(alice, bob).", "% note", "smokes(alice)."])
+>>> list(db.facts)
+['friends(alice, bob).', '% note', 'smokes(alice).']
+
+A :class:`srlearn.Database` with columnar facts is written to the same text
+format as a list of strings, and is used directly (without parsing the facts
+again) by ``inference="numpy"``.
+"""
+
+from array import array
+import collections
+import json
+import os
+import pathlib
+
+import numpy as np
+
+from ._inference import _pack_rows
+from .parser import parse_terms
+from .system_manager import SharedLines
+from .system_manager import open_file
+
+__all__ = ["ColumnarFacts", "SymbolTable"]
+
+# Lines formatted at a time while iterating
+_BLOCK_SIZE = 65536
+
+
+def _raw_lines(source):
+    """Lines of a file or an iterable of strings, without line endings."""
+    if isinstance(source, (str, os.PathLike)):
+        with open_file(source, "r") as _fh:
+            for _line in _fh:
+                yield _line.rstrip("\r\n")
+    else:
+        for _line in source:
+            yield _line.rstrip("\r\n")
+
+
+def _format_row(predicate, arguments, separator):
+    if not arguments:
+        return predicate + "."
+    return predicate + "(" + separator.join(arguments) + ")."
+
+
+def _positions_array(positions):
+    _positions = np.frombuffer(positions, dtype=np.int64)
+    if len(_positions) and _positions[-1] >= 2**31:
+        return _positions
+    return _positions.astype(np.int32)
+
+
+class SymbolTable:
+    """Map constants to consecutive integer ids."""
+
+    __slots__ = ("_ids", "_symbols", "_file", "_count")
+
+    def __init__(self):
+        self._ids = {}
+        self._symbols = []
+        self._file = None
+        self._count = 0
+
+    @classmethod
+    def from_file(cls, path, count):
+        """Symbols stored one per line, read the first time they are needed."""
+        _table = cls()
+        _table._file = path
+        _table._count = count
+        return _table
+
+    def _load(self):
+        if self._file is None:
+            return
+        if self._count:
+            with open(self._file, "r", encoding="utf-8", newline="\n") as _fh:
+                self._symbols = _fh.read().split("\n")
+        self._ids = dict(zip(self._symbols, range(len(self._symbols))))
+        self._file = None
+
+    @property
+    def symbols(self):
+        """List of the symbols, indexed by their id."""
+        self._load()
+        return self._symbols
+
+    def __len__(self):
+        if self._file is not None:
+            return self._count
+        return len(self._symbols)
+
+    def intern(self, symbol):
+        """Return the id for ``symbol``, assigning a new one if needed."""
+        self._load()
+        _id = self._ids.get(symbol)
+        if _id is None:
+            _id = len(self._symbols)
+            self._ids[symbol] = _id
+            self._symbols.append(symbol)
+        return _id
+
+    def get(self, symbol, default=-1):
+        """Return the id for ``symbol`` without assigning one."""
+        self._load()
+        return self._ids.get(symbol, default)
+
+    def save(self, path):
+        """Write the symbols to ``path``, one per line."""
+        if any("\n" in _symbol for _symbol in self.symbols):
+            raise ValueError("Symbols cannot contain a line break")
+        with open(path, "w", encoding="utf-8", newline="\n") as _fh:
+            _fh.write("\n".join(self.symbols))
+
+
+class ColumnarFacts:
+    """Facts stored as one integer array per predicate.
+
+    Constants are interned into a :class:`SymbolTable`, and the facts for
+    each ``(predicate, arity)`` become an array of shape ``(n_facts, arity)``.
+    Arrays use 32-bit integers while there are fewer than 2**31 symbols.
+    Next to each table, ``order`` holds the line number of every fact, and
+    lines which are not a literal (comments, blank lines, ...) are kept as
+    they are in ``other``, by line number.
+
+    Iterating yields the lines again in their original order and with their
+    original text: arguments are joined with the separator of the first fact
+    of each predicate (``","`` or ``", "``), and facts written in any other
+    way are kept as they are in ``text``.
+
+    Parameters
+    ----------
+    facts : list of str, or str (or pathlike)
+        Facts, or a file with one fact per line.
+    """
+
+    def __init__(self, facts=()):
+        self.symbols = SymbolTable()
+        self.other = {}
+        self.text = {}
+        self.separators = {}
+        _rows = {}
+        for _position, _line in enumerate(_raw_lines(facts)):
+            _fact = _line.strip()
+            try:
+                _pred, _args = parse_terms(_fact)
+            except ValueError:
+                _pred, _args = "", ()
+            if (
+                not _pred
+                or (not _args and not _pred.isidentifier())
+                or _fact.startswith(("%", "//"))
+            ):
+                self.other[_position] = _line
+                continue
+            _key = (_pred, len(_args))
+            if _key not in _rows:
+                _rows[_key] = [array("q"), array("q")]
+                self.separators[_key] = (
+                    ", " if _fact.rstrip(".") + "." == _format_row(_pred, _args, ", ")
+                    else ","
+                )
+            if _line != _format_row(_pred, _args, self.separators[_key]):
+                self.text[_position] = _line
+            _rows[_key][0].append(_position)
+            _rows[_key][1].extend([self.symbols.intern(_a) for _a in _args])
+
+        _dtype = np.int32 if len(self.symbols) < 2**31 else np.int64
+        self.tables = {}
+        self.order = {}
+        for _key, (_positions, _ids) in _rows.items():
+            self.tables[_key] = (
+                np.frombuffer(_ids, dtype=np.int64)
+                .astype(_dtype)
+                .reshape(len(_positions), _key[1])
+            )
+            self.order[_key] = _positions_array(_positions)
+
+    @classmethod
+    def from_database(cls, database):
+        """Build the columnar store from the ``facts`` of a Database.
+
+        Facts which are already columnar (including the facts shared by the
+        views from :func:`srlearn.Database.subset`) are returned as they are.
+        """
+        _facts = database.facts
+        if isinstance(_facts, SharedLines):
+            _facts = _facts.lines
+        if isinstance(_facts, cls):
+            return _facts
+        return cls(_facts)
+
+    def save(self, directory):
+        """Store the symbols and arrays in ``directory``, see :meth:`load`.
+
+        Each table is stored as ``facts_{i}.npy``, with the line numbers of
+        its facts in ``order_{i}.npy``.
+
+        Returns
+        -------
+        metadata : dict
+            What :meth:`load` needs to read the files back, which is also
+            written to ``columnar.json``.
+        """
+        _directory = pathlib.Path(directory)
+        _directory.mkdir(parents=True, exist_ok=True)
+        self.symbols.save(_directory.joinpath("symbols.txt"))
+        _tables = []
+        for i, (_key, _table) in enumerate(self.tables.items()):
+            _name = "facts_{0}.npy".format(i)
+            _order = "order_{0}.npy".format(i)
+            np.save(_directory.joinpath(_name), np.ascontiguousarray(_table))
+            np.save(_directory.joinpath(_order), np.ascontiguousarray(self.order[_key]))
+            _tables.append(
+                [_key[0], _key[1], _name, _order, self.separators.get(_key, ",")]
+            )
+        _metadata = {
+            "format": 2,
+            "symbols": len(self.symbols),
+            "tables": _tables,
+            "other": sorted(self.other.items()),
+            "text": sorted(self.text.items()),
+        }
+        with open(_directory.joinpath("columnar.json"), "w") as _fh:
+            json.dump(_metadata, _fh)
+        return _metadata
+
+    @classmethod
+    def load(cls, directory, mmap_mode="r"):
+        """Open facts stored with :meth:`save`.
+
+        The arrays are memory-mapped, so opening takes about the same time
+        however many facts there are, and the operating system reads pages
+        of the files as they are used. Symbols are read the first time they
+        are needed, e.g. when the facts are iterated or written.
+
+        Parameters
+        ----------
+        directory : str (or pathlike)
+            Directory written by :meth:`save`.
+        mmap_mode : str or None (default: "r")
+            Passed to :func:`numpy.load`. ``"r"`` maps the arrays read-only,
+            ``"c"`` maps them copy-on-write, and None reads them into memory.
+        """
+        _directory = pathlib.Path(directory)
+        with open(_directory.joinpath("columnar.json"), "r") as _fh:
+            _metadata = json.load(_fh)
+        _format = _metadata.get("format")
+        if _format not in (1, 2):
+            raise ValueError("Unsupported columnar format: {0}".format(_format))
+        _facts = cls()
+        _facts.symbols = SymbolTable.from_file(
+            _directory.joinpath("symbols.txt"), _metadata["symbols"]
+        )
+        if _format == 1:
+            # Facts grouped by predicate, followed by the other lines
+            _start = 0
+            for _pred, _arity, _name in _metadata["tables"]:
+                _table = np.load(_directory.joinpath(_name), mmap_mode=mmap_mode)
+                _facts.tables[(_pred, _arity)] = _table
+                _facts.order[(_pred, _arity)] = np.arange(
+                    _start, _start + len(_table), dtype=np.int64
+                )
+                _start += len(_table)
+            _facts.other = dict(enumerate(_metadata["other"], _start))
+            return _facts
+        for _pred, _arity, _name, _order, _separator in _metadata["tables"]:
+            _key = (_pred, _arity)
+            _facts.tables[_key] = np.load(
+                _directory.joinpath(_name), mmap_mode=mmap_mode
+            )
+            _facts.order[_key] = np.load(
+                _directory.joinpath(_order), mmap_mode=mmap_mode
+            )
+            _facts.separators[_key] = _separator
+        _facts.other = dict(_metadata["other"])
+        _facts.text = dict(_metadata["text"])
+        return _facts
+
+    def __len__(self):
+        return sum(len(_table) for _table in self.tables.values()) + len(self.other)
+
+    def __iter__(self):
+        _names = np.array(self.symbols.symbols, dtype=object)
+        _other = collections.deque(sorted(self.other.items()))
+        _text = collections.deque(sorted(self.text.items()))
+        _end = max(
+            [int(_order[-1]) + 1 for _order in self.order.values() if len(_order)]
+            + [max(self.other) + 1 if self.other else 0],
+        )
+        _done = dict.fromkeys(self.tables, 0)
+        for _start in range(0, _end, _BLOCK_SIZE):
+            _stop = _start + _BLOCK_SIZE
+            _block = [None] * _BLOCK_SIZE
+            for _key, _table in self.tables.items():
+                _first = _done[_key]
+                _last = _done[_key] = int(np.searchsorted(self.order[_key], _stop))
+                if _last == _first:
+                    continue
+                _positions = (self.order[_key][_first:_last] - _start).tolist()
+                _lines = self._format(_key, _table[_first:_last], _names)
+                for _position, _line in zip(_positions, _lines):
+                    _block[_position] = _line
+            for _lines in (_other, _text):
+                while _lines and _lines[0][0] < _stop:
+                    _position, _line = _lines.popleft()
+                    _block[_position - _start] = _line
+            yield from (_line for _line in _block if _line is not None)
+
+    def _format(self, key, rows, names):
+        _pred, _arity = key
+        if _arity == 0:
+            return [_pred + "."] * len(rows)
+        _prefix = _pred + "("
+        _separator = self.separators.get(key, ",")
+        _columns = [names[rows[:, i]].tolist() for i in range(_arity)]
+        return [_prefix + _separator.join(_row) + ")." for _row in zip(*_columns)]
+
+    def __repr__(self):
+        return "ColumnarFacts({0} facts, {1} predicates, {2} symbols)".format(
+            len(self), len(self.tables), len(self.symbols)
+        )
+
+    @property
+    def nbytes(self):
+        """Bytes used by the integer arrays."""
+        return sum(_table.nbytes for _table in self.tables.values()) + sum(
+            _order.nbytes for _order in self.order.values()
+        )
+
+    def select(self, rows):
+        """Facts with only some rows of each table, sharing the symbol table.
+
+        Parameters
+        ----------
+        rows : dict
+            For each ``(predicate, arity)`` to keep, a boolean mask, indices,
+            or a slice of the rows of that table. Lines in ``other`` are not
+            kept.
+        """
+        _selected = type(self)()
+        _selected.symbols = self.symbols
+        for _key, _rows in rows.items():
+            _selected.tables[_key] = self.tables[_key][_rows]
+            _selected.order[_key] = self.order[_key][_rows]
+            _selected.separators[_key] = self.separators.get(_key, ",")
+        if self.text and _selected.order:
+            _kept = np.concatenate(list(_selected.order.values()))
+            _positions = np.fromiter(self.text, dtype=np.int64, count=len(self.text))
+            _selected.text = {
+                _position: self.text[_position]
+                for _position in _positions[np.isin(_positions, _kept)].tolist()
+            }
+        return _selected
+
+    def deduplicate(self):
+        """Remove repeated facts in place, keeping the first of each.
+
+        Lines in ``other`` are compared after removing surrounding whitespace.
+
+        Returns
+        -------
+        removed : int
+            Number of facts removed.
+        """
+        _before = len(self)
+        _rows = {}
+        for _key, _table in self.tables.items():
+            if len(_table) == 0 or _key[1] == 0:
+                _rows[_key] = slice(0, 1)
+                continue
+            _keys = _pack_rows(_table, max(len(self.symbols), 1))
+            _, _first = np.unique(_keys, return_index=True)
+            _rows[_key] = np.sort(_first)
+        _deduplicated = self.select(_rows)
+        self.tables = _deduplicated.tables
+        self.order = _deduplicated.order
+        self.text = _deduplicated.text
+        _seen = set()
+        _other = {}
+        for _position, _line in sorted(self.other.items()):
+            if _line.strip() not in _seen:
+                _seen.add(_line.strip())
+                _other[_position] = _line
+        self.other = _other
+        return _before - len(self)
+
+    def table(self, predicate, arity):
+        """Integer array of facts for ``predicate/arity``, possibly empty."""
+        _table = self.tables.get((predicate, arity))
+        if _table is None:
+            return np.empty((0, arity), dtype=np.int64)
+        return _table
+
+    def encode(self, examples, return_unknown=False):
+        """Encode example argument tuples into an integer array.
+
+        The symbol table is not changed: constants which do not appear in the
+        facts get ids from ``len(self.symbols)`` upwards, only for this array.
+        With ``return_unknown``, the list of those constants (in the order of
+        their ids) is returned as well.
+        """
+        _arity = len(examples[0]) if examples else 0
+        if any(len(_example) != _arity for _example in examples):
+            raise ValueError("All examples must have the same arity")
+        _unknown = {}
+
+        def _id(symbol):
+            _known = self.symbols.get(symbol)
+            if _known != -1:
+                return _known
+            return _unknown.setdefault(symbol, len(self.symbols) + len(_unknown))
+
+        _encoded = np.array(
+            [[_id(_a) for _a in _example] for _example in examples],
+            dtype=np.int64,
+        ).reshape(len(examples), _arity)
+        if return_unknown:
+            return _encoded, list(_unknown)
+        return _encoded
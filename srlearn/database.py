@@ -11,7 +11,8 @@ Use Cases
 
 - Creating an instance of the database through code (write to location)
 - Files already stored on the filesystem (copy to location)
-- Examples stored in a RDBMS?
+- Examples stored in a RDBMS (:func:`Database.from_sqlite` and
+  :func:`Database.from_dbapi`)
 
 Examples
 --------
@@ -30,8 +31,268 @@ Create an instance of the database from an existing set of files.
 >>> db = Database()
 """
 
-from shutil import copyfile
+import collections.abc
+import io
+import itertools
+import json
+import os
 import pathlib
+import sqlite3
+
+from ._triples import format_constant
+from .parser import parse_terms
+from .parser import read_lines
+from .system_manager import copy_file
+from .system_manager import open_file
+from .system_manager import SharedLines
+from .system_manager import write_lines
+
+
+class _QueryLines:
+    """Facts or examples read from database queries each time they are iterated.
+
+    Rows are fetched ``batch_size`` at a time and formatted as
+    ``predicate(column1,column2,...).``, so a table is never held in memory.
+    Values are formatted with :func:`srlearn._triples.format_constant`, and
+    rows with a NULL are skipped.
+
+    ``connection`` is an open connection, or the path to a SQLite database,
+    which is opened read-only (and closed) by each iteration in the thread
+    iterating, since SQLite connections can only be used in the thread which
+    opened them.
+    """
+
+    def __init__(self, connection, queries, batch_size, cursor=None):
+        self.connection = connection
+        self.queries = queries
+        self.batch_size = batch_size
+        self.cursor = cursor
+
+    def __iter__(self):
+        if not isinstance(self.connection, (str, os.PathLike)):
+            yield from self._lines(self.connection)
+            return
+        if not self.queries:
+            return
+        _path = pathlib.Path(self.connection).absolute()
+        if not _path.is_file():
+            raise FileNotFoundError("No SQLite database at {0}".format(_path))
+        _connection = sqlite3.connect(_path.as_uri() + "?mode=ro", uri=True)
+        try:
+            yield from self._lines(_connection)
+        finally:
+            _connection.close()
+
+    def _lines(self, connection):
+        for _predicate, _query in self.queries.items():
+            if self.cursor is None:
+                _cursor = connection.cursor()
+            else:
+                _cursor = self.cursor(connection)
+            try:
+                _cursor.execute(_query)
+                _prefix = _predicate + "("
+                while True:
+                    _rows = _cursor.fetchmany(self.batch_size)
+                    if not _rows:
+                        break
+                    for _row in _rows:
+                        if None not in _row:
+                            yield _prefix + ",".join(map(format_constant, _row)) + ")."
+            finally:
+                _cursor.close()
+
+    def __repr__(self):
+        return "<lines from queries for {0}>".format(", ".join(self.queries))
+
+
+def _query(table_or_query):
+    """A query selecting every column of a table, or the query itself."""
+    if any(_c.isspace() for _c in table_or_query):
+        return table_or_query
+    return 'SELECT * FROM "{0}"'.format(table_or_query.replace('"', '""'))
+
+
+class _ArrayLines:
+    """Facts or examples formatted from columns of arrays as they are iterated.
+
+    Columns are converted to Python objects and formatted ``block_size`` rows
+    at a time, so only one block of strings is held in memory. Values of
+    columns which are not numeric are formatted with
+    :func:`srlearn._triples.format_constant`, unless ``normalize`` is False
+    (for constants which were read from facts).
+    """
+
+    def __init__(self, templates, block_size=16384, normalize=True):
+        # List of (format, columns), where format has one %s per column.
+        self.templates = templates
+        self.block_size = block_size
+        self.normalize = normalize
+
+    def _values(self, column, start):
+        _values = column[start : start + self.block_size].tolist()
+        if self.normalize and column.dtype.kind not in "iuf":
+            return list(map(format_constant, _values))
+        return _values
+
+    def __iter__(self):
+        for _format, _columns in self.templates:
+            for _start in range(0, len(_columns[0]), self.block_size):
+                _block = [self._values(_column, _start) for _column in _columns]
+                yield from map(_format.__mod__, zip(*_block))
+
+    def __len__(self):
+        return sum(len(_columns[0]) for _, _columns in self.templates)
+
+    def __repr__(self):
+        return "<{0} lines from arrays>".format(len(self))
+
+
+def _columns(predicate, values, min_columns=1):
+    """Columns of a 2-D array, or a sequence of 1-D arrays, as NumPy arrays."""
+    import numpy as np
+
+    if isinstance(values, np.ndarray) and values.ndim == 2:
+        _columns = [values[:, i] for i in range(values.shape[1])]
+    elif isinstance(values, np.ndarray) and values.ndim == 1:
+        _columns = [values]
+    else:
+        _columns = [np.asarray(_column) for _column in values]
+    if len(_columns) < min_columns:
+        raise ValueError(
+            "'{0}' needs at least {1} column(s)".format(predicate, min_columns)
+        )
+    if any(_column.ndim != 1 for _column in _columns):
+        raise ValueError("Columns for '{0}' must be one-dimensional".format(predicate))
+    if len(set(len(_column) for _column in _columns)) != 1:
+        raise ValueError("Columns for '{0}' have different lengths".format(predicate))
+    return _columns
+
+
+def _template(predicate, arity):
+    return predicate.replace("%", "%%") + "(" + ",".join(["%s"] * arity) + ")."
+
+
+class _UniqueLines:
+    """Lines from a file or iterable, without repeats, each time they are iterated.
+
+    Lines are compared (and yielded) after removing surrounding whitespace,
+    as for lists in :func:`Database.deduplicate`. Lines already seen are
+    remembered in a set, so memory grows with the number of distinct lines
+    rather than the number of lines.
+    """
+
+    def __init__(self, source, block_size=65536):
+        self.source = source
+        self.block_size = block_size
+
+    def _lines(self):
+        if isinstance(self.source, (str, os.PathLike)):
+            with open_file(self.source, "r") as _fh:
+                for _line in _fh:
+                    yield _line.strip()
+        else:
+            for _line in self.source:
+                yield _line.strip()
+
+    def blocks(self):
+        """Iterate over lists of distinct lines."""
+        _seen = set()
+        _lines = self._lines()
+        while True:
+            _batch = list(itertools.islice(_lines, self.block_size))
+            if not _batch:
+                return
+            _block = []
+            for _line in _batch:
+                if _line not in _seen:
+                    _seen.add(_line)
+                    _block.append(_line)
+            yield _block
+
+    def __iter__(self):
+        for _block in self.blocks():
+            yield from _block
+
+    def __repr__(self):
+        return "<distinct lines of {0!r}>".format(self.source)
+
+
+class _ExampleSubset(collections.abc.Sequence):
+    """Examples at ``indices`` of a list of lines, without copying the lines."""
+
+    def __init__(self, lines, indices):
+        self.lines = lines
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return _ExampleSubset(self.lines, self.indices[index])
+        return self.lines[self.indices[index]]
+
+    def __iter__(self):
+        return map(self.lines.__getitem__, self.indices.tolist())
+
+    def __repr__(self):
+        return "<{0} of {1} examples>".format(len(self), len(self.lines))
+
+
+def _example_lines(examples):
+    """A list of examples, and the indices of a subset of them (or None)."""
+    if isinstance(examples, _ExampleSubset):
+        return examples.lines, examples.indices
+    if isinstance(examples, list):
+        return examples, None
+    return list(read_lines(examples)), None
+
+
+def _count_facts(facts):
+    """Number of facts and distinct constants per argument, in one pass."""
+    _counts = {}
+    for _line in read_lines(facts):
+        try:
+            _predicate, _arguments = parse_terms(_line)
+        except ValueError:
+            continue
+        _key = (_predicate, len(_arguments))
+        _entry = _counts.get(_key)
+        if _entry is None:
+            _entry = _counts[_key] = [0, [set() for _ in _arguments]]
+        _entry[0] += 1
+        for _constants, _argument in zip(_entry[1], _arguments):
+            _constants.add(_argument)
+    return {
+        _key: (_facts, [len(_constants) for _constants in _sets])
+        for _key, (_facts, _sets) in _counts.items()
+    }
+
+
+def _write_object(_object, target, cache=None):
+    """Write a Database attribute to ``target`` (see :func:`Database.write`)."""
+    if isinstance(_object, (str, os.PathLike)):
+        copy_file(str(_object), str(target))
+        return
+    if isinstance(_object, SharedLines):
+        _object.write(target, cache)
+        return
+    if isinstance(_object, io.IOBase):
+        # Lines read from an open file still have their line endings.
+        _object = (_line.rstrip("\r\n") for _line in _object)
+    if cache is not None:
+        cache.link(_object, target)
+    else:
+        write_lines(_object, target)
+
+
+def _mode_predicate(mode):
+    """Name of the predicate in a mode, e.g. ``friends(+Person,-Person).``"""
+    mode = mode.strip()
+    if mode.startswith("mode:"):
+        mode = mode[len("mode:") :]
+    return parse_terms(mode)[0]
 
 
 class Database:
@@ -48,6 +309,8 @@ class Database:
         The implementation is done with four attributes: ``pos``, ``neg``,
         ``facts``, and ``modes``. Each attribute is a list that may be set by
         mutating, or loaded from files with :func:`Database.from_files`.
+        ``pos``, ``neg``, and ``facts`` may also be paths or generators (see
+        :func:`Database.write`).
 
         Examples
         --------
@@ -63,7 +326,9 @@ class Database:
         self.facts = []
         self.modes = []
 
-    def write(self, filename="train", location=pathlib.Path("train")) -> None:
+    def write(
+        self, filename="train", location=pathlib.Path("train"), cache=None
+    ) -> None:
         """Write the database to disk
 
         Parameters
@@ -72,32 +337,31 @@ class Database:
             Name of the file to write to: 'train' or 'test'
         location : :class:`pathlib.Path`
             Path where data should be written to.
+        cache : :class:`srlearn.system_manager.DataCache`, optional
+            Store lists of examples and facts once in a cache, and link them
+            into ``location``.
 
         Notes
         -----
 
         This function has polymorphic behavior. When attributes (``self.pos``,
-        ``self.neg``, ``self.facts``) are lists of strings, the lists are
-        written to files. When the attributes are (path-like) strings or
-        pathlib Paths (:class:`pathlib.Path`), the files are copied.
+        ``self.neg``, ``self.facts``) are lists of strings (or
+        :class:`srlearn.columnar.ColumnarFacts`), the lines are written to
+        files. Generators, iterators and open files are also written, in
+        blocks of lines so they are never held in memory all at once; they are
+        consumed by the first ``write``. When the attributes are (path-like) strings or
+        pathlib Paths (:class:`pathlib.Path`), the files are linked into
+        ``location`` with :func:`srlearn.system_manager.link_file`, or copied
+        when they cannot be linked. Compressed files (``.gz``, ``.bz2``,
+        ``.xz``, or ``.zst``) are decompressed into ``location`` as a stream.
         """
 
-        def _write(_filename, _location, _object, _type):
-            if isinstance(_object, list):
-                with open(
-                    _location.joinpath("{0}_{1}.txt".format(_filename, _type)), "w"
-                ) as _fh:
-                    for example in _object:
-                        _fh.write(example + "\n")
-            else:
-                copyfile(
-                    str(_object),
-                    str(_location.joinpath("{0}_{1}.txt".format(_filename, _type))),
-                )
-
-        _write(filename, location, self.pos, "pos")
-        _write(filename, location, self.neg, "neg")
-        _write(filename, location, self.facts, "facts")
+        for _type in ("pos", "neg", "facts"):
+            _write_object(
+                getattr(self, _type),
+                location.joinpath("{0}_{1}.txt".format(filename, _type)),
+                cache,
+            )
 
     def __repr__(self) -> str:
         return (
@@ -109,6 +373,324 @@ class Database:
             + str(self.facts)
         )
 
+    def deduplicate(self, examples=False):
+        """Remove repeated facts, keeping the first of each
+
+        Lists of facts are deduplicated in place, and
+        :class:`srlearn.columnar.ColumnarFacts` remove repeated rows from
+        their arrays. Facts in files, generators, or other lazy sources are
+        deduplicated while they are streamed by :func:`Database.write`, with
+        a set of the distinct facts seen so far. Facts are compared as
+        strings, after removing surrounding whitespace.
+
+        Parameters
+        ----------
+        examples : bool (default: False)
+            Also remove repeated positive and negative examples.
+
+        Examples
+        --------
+
+        >>> from srlearn import Database
+        >>> db = Database()
+        >>> db.facts = ["f(a,b).", "f(a,c).", " f(a,b)."]
+        >>> db.deduplicate()
+        >>> db.facts
+        ['f(a,b).', 'f(a,c).']
+        """
+        _attributes = ["facts"] + (["pos", "neg"] if examples else [])
+        for _attribute in _attributes:
+            _object = getattr(self, _attribute)
+            if isinstance(_object, list):
+                _object = list(dict.fromkeys(_line.strip() for _line in _object))
+            elif hasattr(_object, "deduplicate"):
+                _object.deduplicate()
+            elif not isinstance(_object, _UniqueLines):
+                _object = _UniqueLines(_object)
+            setattr(self, _attribute, _object)
+
+    def describe(self):
+        """Count facts, arguments, and constants for each predicate
+
+        Facts are read once. For :class:`srlearn.columnar.ColumnarFacts` the
+        counts are computed from the integer arrays without formatting any
+        strings.
+
+        Returns
+        -------
+        stats : dict
+            For each ``"predicate/arity"``, a dict with the number of
+            ``facts``, the ``arity``, the number of ``distinct`` constants
+            at each argument position, and the ``fan_out``: the average
+            number of facts for each distinct first argument (``None`` for
+            predicates without arguments).
+
+        Examples
+        --------
+
+        >>> from srlearn import Database
+        >>> db = Database()
+        >>> db.facts = ["friends(a,b).", "friends(a,c).", "friends(b,c)."]
+        >>> db.describe()["friends/2"]
+        {'facts': 3, 'arity': 2, 'distinct': [2, 2], 'fan_out': 1.5}
+        """
+        import numpy as np
+        from .columnar import ColumnarFacts
+
+        _facts = self.facts
+        if isinstance(_facts, SharedLines):
+            _facts = _facts.lines
+        if isinstance(_facts, ColumnarFacts):
+            _counts = {
+                _key: (
+                    len(_table),
+                    [len(np.unique(_table[:, i])) for i in range(_key[1])],
+                )
+                for _key, _table in _facts.tables.items()
+            }
+        else:
+            _counts = _count_facts(_facts)
+
+        _stats = {}
+        for (_predicate, _arity), (_facts, _distinct) in _counts.items():
+            _stats["{0}/{1}".format(_predicate, _arity)] = {
+                "facts": _facts,
+                "arity": _arity,
+                "distinct": _distinct,
+                "fan_out": _facts / _distinct[0] if _arity and _distinct[0] else None,
+            }
+        return _stats
+
+    def prune(self, background, target, max_length=None):
+        """Remove facts which no clause for ``target`` could use
+
+        Starting from the constants in the positive and negative examples,
+        follow the ``+`` (input) and ``-`` (output) arguments of the modes
+        for up to ``max_length`` literals, and keep only the facts reached
+        along the way. Facts of predicates without a mode are removed.
+
+        Pruning is conservative: every fact a clause of at most
+        ``max_length`` literals could match is kept, and some which could
+        not may be kept too. The examples are read to find their constants,
+        so they should not be generators which can only be read once.
+
+        Parameters
+        ----------
+        background : :class:`srlearn.Background` or list of str
+            Background knowledge (or a list of modes)
+        target : str
+            Target predicate
+        max_length : int, optional
+            Maximum number of literals in a clause. Defaults to
+            ``background.max_tree_depth * background.node_size``, the most
+            literals on one path of a learned tree.
+
+        Returns
+        -------
+        db : srlearn.Database
+            A Database with the same examples and modes, where ``facts`` is
+            a :class:`srlearn.columnar.ColumnarFacts` of the reachable facts
+
+        Examples
+        --------
+
+        >>> from srlearn import Background, Database
+        >>> db = Database()
+        >>> db.pos = ["cancer(alice)."]
+        >>> db.facts = ["friends(alice,bob).", "friends(carol,dan).", "smokes(bob)."]
+        >>> bk = Background(modes=["cancer(+Person).", "friends(+Person,-Person).",
+        ...                        "smokes(+Person)."])
+        >>> list(db.prune(bk, "cancer").facts)
+        ['friends(alice,bob).', 'smokes(bob).']
+        """
+        from ._pruning import prune_database
+
+        if isinstance(background, list):
+            _modes = background
+        else:
+            _modes = background.modes or []
+            if max_length is None:
+                max_length = background.max_tree_depth * background.node_size
+        if not isinstance(max_length, int) or max_length < 1:
+            raise ValueError("'max_length' must be an 'int' >= 1")
+
+        _db = Database()
+        _db.pos = self.pos
+        _db.neg = self.neg
+        _db.modes = self.modes
+        _db.facts = prune_database(self, _modes, target, max_length)
+        return _db
+
+    def sample_negatives(self, background, target, ratio=2, random_state=None):
+        """Replace ``neg`` with negatives sampled under the closed world assumption
+
+        Any tuple of constants with the types in the mode for ``target``,
+        which is not a positive example, is a negative. The constants of each
+        type are read from the facts (and the positive examples) at the
+        argument positions the modes give that type. Instead of writing all
+        such negatives for BoostSRL to subsample with ``-negPosRatio``, only
+        ``ratio`` times the number of positives are drawn, without repeats,
+        from the cross product of the types, which is never built.
+
+        With the same ``ratio`` as the estimator's ``neg_pos_ratio``, the jar
+        keeps every sampled negative.
+
+        Parameters
+        ----------
+        background : :class:`srlearn.Background` or list of str
+            Background knowledge (or a list of modes), with a mode for
+            ``target``
+        target : str
+            Target predicate
+        ratio : int or float (default: 2)
+            Number of negatives per positive example. When there are fewer
+            negatives, all of them are used.
+        random_state : int, RandomState instance or None (default: None)
+            Seed, or random number generator, for reproducible samples
+
+        Returns
+        -------
+        stats : dict
+            The number of ``negatives`` sampled, the number of negatives
+            under the closed world assumption (``closed_world``), the
+            ``bytes_written`` for the sampled negatives, and an estimate of
+            the ``bytes_saved`` by not writing the others.
+
+        Examples
+        --------
+
+        >>> from srlearn import Database
+        >>> db = Database()
+        >>> db.pos = ["cancer(alice)."]
+        >>> db.facts = ["friends(alice,bob).", "friends(bob,carol)."]
+        >>> db.sample_negatives(["cancer(+Person).", "friends(+Person,-Person)."],
+        ...                     "cancer", ratio=1, random_state=0)["closed_world"]
+        2
+        >>> len(db.neg)
+        1
+        """
+        from ._sampling import sample_database_negatives
+
+        if isinstance(background, list):
+            _modes = background
+        else:
+            _modes = background.modes or []
+        if (
+            isinstance(ratio, bool)
+            or not isinstance(ratio, (int, float))
+            or ratio <= 0
+        ):
+            raise ValueError("'ratio' must be an 'int' or 'float' > 0")
+
+        _columns, _stats = sample_database_negatives(
+            self, _modes, target, ratio, random_state
+        )
+        self.neg = _ArrayLines(
+            [(_template(target, len(_columns)), _columns)], normalize=False
+        )
+        return _stats
+
+    def subset(self, pos_index=None, neg_index=None):
+        """A view of the Database with a subset of the examples
+
+        The view shares the facts, and the lists of examples, with this
+        Database; it only stores the indices of its examples. Its facts are
+        a :class:`srlearn.system_manager.SharedLines`, which is written once
+        and then linked by :func:`Database.write` for the Database and for
+        views taken from it, so every fold of a cross-validation uses one
+        copy of the facts on disk.
+
+        Parameters
+        ----------
+        pos_index : array-like of int or bool, optional
+            Indices (or a mask) of the positive examples to keep, default all
+        neg_index : array-like of int or bool, optional
+            Indices (or a mask) of the negative examples to keep, default all
+
+        Returns
+        -------
+        db : srlearn.Database
+            The view. Examples which are not lists (e.g. paths) are read
+            into a list first, and views of a view share that list.
+
+        Examples
+        --------
+
+        >>> from srlearn.datasets import load_toy_cancer
+        >>> train, _ = load_toy_cancer()
+        >>> view = train.subset(pos_index=[0, 2], neg_index=[True, False])
+        >>> list(view.pos), list(view.neg)
+        (['cancer(alice).', 'cancer(chuck).'], ['cancer(dan).'])
+        """
+        import numpy as np
+
+        def _subset(_examples, _index):
+            _lines, _base = _example_lines(_examples)
+            if _index is None:
+                _indices = np.arange(len(_lines)) if _base is None else _base
+            else:
+                _index = np.asarray(_index)
+                if _index.dtype == bool:
+                    _index = np.flatnonzero(_index)
+                _indices = _index if _base is None else _base[_index]
+            return _ExampleSubset(_lines, _indices)
+
+        _db = Database()
+        _db.pos = _subset(self.pos, pos_index)
+        _db.neg = _subset(self.neg, neg_index)
+        if isinstance(self.facts, (str, os.PathLike, SharedLines)):
+            _db.facts = self.facts
+        else:
+            _db.facts = SharedLines(self.facts)
+        _db.modes = self.modes
+        return _db
+
+    def folds(self, n_splits=5, shuffle=False, random_state=None):
+        """Split the examples into train and test views for cross-validation
+
+        The positive and negative examples are each split into ``n_splits``
+        folds with :class:`sklearn.model_selection.KFold`, so every fold has
+        the same share of positives. Each view comes from
+        :func:`Database.subset`, and they all share one copy of the facts and
+        examples.
+
+        Parameters
+        ----------
+        n_splits : int (default: 5)
+            Number of folds, at least 2
+        shuffle : bool (default: False)
+            Shuffle the examples before splitting
+        random_state : int, RandomState instance or None (default: None)
+            Seed for the shuffle
+
+        Returns
+        -------
+        folds : list of tuple
+            ``(train, test)`` Database views, one per fold
+
+        Examples
+        --------
+
+        >>> from srlearn.datasets import load_toy_cancer
+        >>> train, _ = load_toy_cancer()
+        >>> [len(_test.pos) for _, _test in train.folds(n_splits=2)]
+        [2, 2]
+        """
+        from sklearn.model_selection import KFold
+
+        _all = self.subset()
+        _kfold = KFold(n_splits=n_splits, shuffle=shuffle, random_state=random_state)
+        _splits = zip(
+            _kfold.split(_all.pos.indices), _kfold.split(_all.neg.indices)
+        )
+        return [
+            (
+                _all.subset(_pos_train, _neg_train),
+                _all.subset(_pos_test, _neg_test),
+            )
+            for (_pos_train, _pos_test), (_neg_train, _neg_test) in _splits
+        ]
+
     @staticmethod
     def from_files(pos="pos.pl", neg="neg.pl", facts="facts.pl", lazy_load=True):
         """Load files into a Database
@@ -117,6 +699,10 @@ class Database:
         contents of files. By default this performs a "lazy load," where the
         files are not loaded into Python lists, but copied at learning time.
 
+        Files ending with ``.gz``, ``.bz2``, ``.xz``, or ``.zst`` (which
+        needs the ``zstandard`` package) are decompressed as they are read,
+        or, with a lazy load, as they are copied for learning.
+
         Parameters
         ----------
         pos : str or pathlib.Path
@@ -141,11 +727,517 @@ class Database:
             _db.neg = neg
             _db.facts = facts
         else:
-            with open(pos, "r") as _fh:
+            with open_file(pos, "r") as _fh:
                 _db.pos = _fh.read().splitlines()
-            with open(neg, "r") as _fh:
+            with open_file(neg, "r") as _fh:
                 _db.neg = _fh.read().splitlines()
-            with open(facts, "r") as _fh:
+            with open_file(facts, "r") as _fh:
                 _db.facts = _fh.read().splitlines()
 
         return _db
+
+    def to_files(self, pos="pos.pl", neg="neg.pl", facts="facts.pl"):
+        """Write the examples and facts to files
+
+        The inverse of :func:`Database.from_files`. Each file is compressed
+        when its name ends with ``.gz``, ``.bz2``, ``.xz``, or ``.zst``
+        (which needs the ``zstandard`` package). Attributes which are paths
+        are linked when the compression matches, or converted as a stream
+        when it does not.
+
+        Parameters
+        ----------
+        pos : str or pathlib.Path
+            Location to write positive examples to
+        neg : str or pathlib.Path
+            Location to write negative examples to
+        facts : str or pathlib.Path
+            Location to write facts to
+
+        Examples
+        --------
+
+        >>> import tempfile, pathlib
+        >>> from srlearn import Database
+        >>> from srlearn.datasets import load_toy_cancer
+        >>> train, _ = load_toy_cancer()
+        >>> _dir = pathlib.Path(tempfile.mkdtemp())
+        >>> train.to_files(_dir / "pos.pl", _dir / "neg.pl", _dir / "facts.pl.gz")
+        >>> db = Database.from_files(_dir / "pos.pl", _dir / "neg.pl",
+        ...                          _dir / "facts.pl.gz", lazy_load=False)
+        >>> db.facts == train.facts
+        True
+        """
+        for _object, _path in ((self.pos, pos), (self.neg, neg), (self.facts, facts)):
+            _write_object(_object, _path)
+
+    def save_binary(self, directory):
+        """Store the database in a binary format which opens without parsing
+
+        The facts are stored as a :class:`srlearn.columnar.ColumnarFacts`:
+        a file with the symbols, and for each predicate one ``.npy`` array of
+        symbol ids and one of line numbers. The examples are stored as text,
+        and the modes in ``database.json``. Open the snapshot with
+        :func:`Database.load_binary`.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path
+            Directory to store the files in. It is created if needed.
+
+        Notes
+        -----
+
+        Facts are parsed once, here, unless they are already columnar. A
+        loaded snapshot is written by :func:`Database.write` with the same
+        text as the original database: facts keep their order and spacing,
+        and comments and other lines are kept where they were.
+        """
+        from .columnar import ColumnarFacts
+
+        _directory = pathlib.Path(directory)
+        _directory.mkdir(parents=True, exist_ok=True)
+        ColumnarFacts.from_database(self).save(_directory)
+        _write_object(self.pos, _directory.joinpath("pos.txt"))
+        _write_object(self.neg, _directory.joinpath("neg.txt"))
+        with open(_directory.joinpath("database.json"), "w") as _fh:
+            json.dump({"format": 1, "modes": list(self.modes)}, _fh)
+
+    @staticmethod
+    def load_binary(directory, mmap_mode="r"):
+        """Open a database stored with :func:`Database.save_binary`
+
+        The arrays of facts are memory-mapped, so a database opens in about
+        the same time however large it is, and the operating system only
+        reads the parts which are used. Examples are loaded lazily, as with
+        :func:`Database.from_files`.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path
+            Directory written by :func:`Database.save_binary`
+        mmap_mode : str or None (default: "r")
+            How the arrays are mapped, see
+            :meth:`srlearn.columnar.ColumnarFacts.load`
+
+        Returns
+        -------
+        db : srlearn.Database
+            A Database where ``facts`` is a
+            :class:`srlearn.columnar.ColumnarFacts`
+
+        Examples
+        --------
+
+        >>> import tempfile
+        >>> from srlearn import Database
+        >>> from srlearn.datasets import load_toy_cancer
+        >>> train, _ = load_toy_cancer()
+        >>> _dir = tempfile.mkdtemp()
+        >>> train.save_binary(_dir)
+        >>> db = Database.load_binary(_dir)
+        >>> db.facts
+        ColumnarFacts(15 facts, 2 predicates, 6 symbols)
+        >>> list(db.facts) == train.facts
+        True
+        """
+        from .columnar import ColumnarFacts
+
+        _directory = pathlib.Path(directory)
+        with open(_directory.joinpath("database.json"), "r") as _fh:
+            _metadata = json.load(_fh)
+        if _metadata.get("format") != 1:
+            raise ValueError(
+                "Unsupported database format: {0}".format(_metadata.get("format"))
+            )
+        _db = Database()
+        _db.pos = _directory.joinpath("pos.txt")
+        _db.neg = _directory.joinpath("neg.txt")
+        _db.facts = ColumnarFacts.load(_directory, mmap_mode=mmap_mode)
+        _db.modes = _metadata["modes"]
+        return _db
+
+    @staticmethod
+    def from_dbapi(
+        connection,
+        facts=None,
+        pos=None,
+        neg=None,
+        modes=None,
+        batch_size=10000,
+        cursor=None,
+    ):
+        """Read facts and examples from tables in a relational database
+
+        Return an instance of a Database where pos, neg, and facts are read
+        from the database each time they are written, one batch of rows at a
+        time, and streamed to files without holding whole tables in memory.
+
+        Each of ``facts``, ``pos``, and ``neg`` maps predicate names to either
+        a table name or a ``SELECT`` query. Every column of the result is an
+        argument of the predicate, in order.
+
+        Parameters
+        ----------
+        connection : DB-API 2.0 connection
+            Connection to the database, e.g. from :func:`sqlite3.connect`
+        facts : dict, optional
+            Predicate names mapped to tables or queries for facts
+        pos : dict, optional
+            Predicate names mapped to tables or queries for positive examples
+        neg : dict, optional
+            Predicate names mapped to tables or queries for negative examples
+        modes : list of str, optional
+            Modes, such as ``Background.modes``. When given, facts are only
+            read for predicates which appear in a mode, and ``modes`` is set
+            on the Database.
+        batch_size : int (default: 10000)
+            Number of rows fetched at a time with ``fetchmany``
+        cursor : callable, optional
+            Called with the connection to create each cursor, e.g.
+            ``lambda conn: conn.cursor(name="srlearn")`` for a server-side
+            cursor with psycopg2. Defaults to ``connection.cursor()``.
+
+        Returns
+        -------
+        db : srlearn.Database
+            Instance of a Database object
+
+        Examples
+        --------
+
+        >>> import sqlite3
+        >>> from srlearn import Database
+        >>> conn = sqlite3.connect(":memory:")
+        >>> _ = conn.execute("CREATE TABLE friends (a TEXT, b TEXT)")
+        >>> _ = conn.execute("INSERT INTO friends VALUES ('alice', 'bob')")
+        >>> db = Database.from_dbapi(
+        ...     conn,
+        ...     facts={"friends": "friends", "smokes": "SELECT a FROM friends"},
+        ...     modes=["friends(+Person,-Person)."],
+        ... )
+        >>> list(db.facts)
+        ['friends(alice,bob).']
+        """
+        if not isinstance(batch_size, int) or batch_size < 1:
+            raise ValueError("'batch_size' must be an 'int' >= 1")
+
+        facts = dict(facts or {})
+        if modes is not None:
+            _moded = set(_mode_predicate(_mode) for _mode in modes)
+            facts = {_p: _q for _p, _q in facts.items() if _p in _moded}
+
+        def _lines(_mapping):
+            return _QueryLines(
+                connection,
+                {_p: _query(_q) for _p, _q in (_mapping or {}).items()},
+                batch_size,
+                cursor,
+            )
+
+        _db = Database()
+        _db.pos = _lines(pos)
+        _db.neg = _lines(neg)
+        _db.facts = _lines(facts)
+        if modes is not None:
+            _db.modes = list(modes)
+        return _db
+
+    @staticmethod
+    def from_sqlite(
+        database, facts=None, pos=None, neg=None, modes=None, batch_size=10000
+    ):
+        """Read facts and examples from tables in a SQLite database
+
+        ``database`` is a path to a SQLite file or an open
+        :class:`sqlite3.Connection`. See :func:`Database.from_dbapi` for the
+        other parameters. A path is opened read-only each time the facts or
+        examples are read, in the thread reading them (as with
+        ``fit_async``), and closed afterwards. Reading them raises
+        FileNotFoundError if there is no file at the path.
+
+        Returns
+        -------
+        db : srlearn.Database
+            Instance of a Database object
+        """
+        return Database.from_dbapi(
+            database,
+            facts=facts,
+            pos=pos,
+            neg=neg,
+            modes=modes,
+            batch_size=batch_size,
+        )
+
+    @staticmethod
+    def from_arrays(facts=None, pos=None, neg=None, regression=None):
+        """Create a Database from columns of arrays
+
+        Each of ``facts``, ``pos``, and ``neg`` maps predicate names to the
+        columns of its arguments: a 2-D array with one column per argument,
+        or a sequence of 1-D arrays (such as the source and destination of an
+        edge list). Lines are formatted from the arrays in blocks when the
+        Database is written, instead of being built up front.
+
+        Parameters
+        ----------
+        facts : dict, optional
+            Predicate names mapped to columns of facts
+        pos : dict, optional
+            Predicate names mapped to columns of positive examples
+        neg : dict, optional
+            Predicate names mapped to columns of negative examples
+        regression : dict, optional
+            Predicate names mapped to columns of regression examples. The last
+            column holds the values, which are written to ``pos`` as
+            ``regressionExample(predicate(...),value).``
+
+        Returns
+        -------
+        db : srlearn.Database
+            Instance of a Database object
+
+        Examples
+        --------
+
+        >>> import numpy as np
+        >>> from srlearn import Database
+        >>> db = Database.from_arrays(
+        ...     facts={"friends": (np.array(["a", "b"]), np.array(["b", "c"]))},
+        ...     regression={"medv": (np.array(["id1"]), np.array([33.2]))},
+        ... )
+        >>> list(db.facts)
+        ['friends(a,b).', 'friends(b,c).']
+        >>> list(db.pos)
+        ['regressionExample(medv(id1),33.2).']
+        """
+
+        def _lines(_mapping):
+            _templates = []
+            for _predicate, _values in (_mapping or {}).items():
+                _c = _columns(_predicate, _values)
+                _templates.append((_template(_predicate, len(_c)), _c))
+            return _ArrayLines(_templates)
+
+        _db = Database()
+        _db.pos = _lines(pos)
+        _db.neg = _lines(neg)
+        _db.facts = _lines(facts)
+        for _predicate, _values in (regression or {}).items():
+            _c = _columns(_predicate, _values, min_columns=2)
+            _format = "regressionExample({0},%s).".format(
+                _template(_predicate, len(_c) - 1)[:-1]
+            )
+            _db.pos.templates.append((_format, _c))
+        return _db
+
+    @staticmethod
+    def from_frame(
+        frame, target, facts=None, id_column=None, id_prefix="id", regression=False
+    ):
+        """Create a Database from a table with one row per example
+
+        Each row of ``frame`` is an entity, identified by ``id_prefix``
+        followed by the row's index (or its ``id_column``). Every other column
+        becomes a binary predicate relating the entity to its value, as in
+        ``age(id100,1).``, and ``target`` becomes the examples.
+
+        Parameters
+        ----------
+        frame : pandas.DataFrame
+            Table of entities, or any object where ``frame[column]`` returns
+            an array-like column
+        target : str
+            Column holding the examples' labels (or values, for regression)
+        facts : list or dict, optional
+            Columns to write as facts, or a dict mapping columns to predicate
+            names. Defaults to every column except ``target`` and
+            ``id_column``.
+        id_column : str, optional
+            Column identifying each row. Defaults to ``frame.index``.
+        id_prefix : str (default: "id")
+            Prepended to each id.
+        regression : bool (default: False)
+            Write ``regressionExample(target(id),value).`` for every row.
+            Otherwise rows where ``target`` is true are positive examples,
+            and the rest are negative examples.
+
+        Returns
+        -------
+        db : srlearn.Database
+            Instance of a Database object
+
+        Examples
+        --------
+
+        >>> import pandas as pd   # doctest: +SKIP
+        >>> from srlearn import Database
+        >>> frame = pd.DataFrame(   # doctest: +SKIP
+        ...     {"age": [1, 2], "medv": [33.2, 27.5]}, index=[100, 101]
+        ... )
+        >>> db = Database.from_frame(frame, "medv", regression=True)  # doctest: +SKIP
+        >>> list(db.pos)   # doctest: +SKIP
+        ['regressionExample(medv(id100),33.2).', 'regressionExample(medv(id101),27.5).']
+        >>> list(db.facts)   # doctest: +SKIP
+        ['age(id100,1).', 'age(id101,2).']
+        """
+        import numpy as np
+
+        if id_column is None:
+            _ids = np.asarray(frame.index)
+        else:
+            _ids = np.asarray(frame[id_column])
+        # Prefixed ids are made into valid constants as a whole.
+        _ids = np.array(
+            [format_constant(id_prefix + str(_i)) for _i in _ids.tolist()],
+            dtype=object,
+        )
+        if facts is None:
+            facts = [_c for _c in frame.columns if _c not in (target, id_column)]
+        if not isinstance(facts, dict):
+            facts = {_c: _c for _c in facts}
+
+        def _format(_predicate, _inner):
+            return str(_predicate).replace("%", "%%") + "(" + _inner + ")."
+
+        _db = Database()
+        _db.facts = _ArrayLines(
+            [
+                (_format(_predicate, "%s,%s"), [_ids, np.asarray(frame[_column])])
+                for _column, _predicate in facts.items()
+            ]
+        )
+        _values = np.asarray(frame[target])
+        if regression:
+            _example = "regressionExample(" + _format(target, "%s")[:-1] + ",%s)."
+            _db.pos = _ArrayLines([(_example, [_ids, _values])])
+            _db.neg = []
+        else:
+            _mask = _values.astype(bool)
+            _db.pos = _ArrayLines([(_format(target, "%s"), [_ids[_mask]])])
+            _db.neg = _ArrayLines([(_format(target, "%s"), [_ids[~_mask]])])
+        return _db
+
+    @staticmethod
+    def from_table_files(
+        facts=None, pos=None, neg=None, batch_size=65536, engine="auto", delimiter=","
+    ):
+        """Read facts and examples from CSV, Parquet, or Arrow files
+
+        Return an instance of a Database where pos, neg, and facts are read
+        from the files each time they are written, one batch of rows at a
+        time, so memory is bounded by ``batch_size`` rather than file size.
+
+        Each of ``facts``, ``pos``, and ``neg`` maps predicate names to a file
+        path, or to a ``(path, columns)`` tuple. Every column (or every named
+        column, in order) is an argument of the predicate: a CSV edge list
+        with columns ``src,dst`` becomes ``friends(src,dst).`` facts. CSV
+        files need a header row. Rows with an empty or missing value are
+        skipped.
+
+        Parquet (``.parquet``) and Arrow (``.arrow``, ``.feather``) files need
+        `pyarrow <https://arrow.apache.org/docs/python/>`_, and their values
+        are written as Arrow formats them as strings. CSV files are read
+        with pyarrow when it is installed, or the :mod:`csv` module otherwise,
+        and values are written as they appear in the file.
+
+        Parameters
+        ----------
+        facts : dict, optional
+            Predicate names mapped to files of facts
+        pos : dict, optional
+            Predicate names mapped to files of positive examples
+        neg : dict, optional
+            Predicate names mapped to files of negative examples
+        batch_size : int (default: 65536)
+            Number of rows read at a time
+        engine : str (default: "auto")
+            Read CSV files with ``"pyarrow"`` or ``"csv"``. ``"auto"`` uses
+            pyarrow when it is installed.
+        delimiter : str (default: ",")
+            Field delimiter for CSV files
+
+        Returns
+        -------
+        db : srlearn.Database
+            Instance of a Database object
+
+        Examples
+        --------
+
+        >>> from srlearn import Database
+        >>> db = Database.from_table_files(
+        ...     facts={"friends": ("edges.csv", ["src", "dst"])},
+        ...     pos={"smokes": "smokers.parquet"},
+        ... )
+        """
+        from ._tables import TableFileLines
+
+        _db = Database()
+        _db.pos = TableFileLines(pos or {}, batch_size, engine, delimiter)
+        _db.neg = TableFileLines(neg or {}, batch_size, engine, delimiter)
+        _db.facts = TableFileLines(facts or {}, batch_size, engine, delimiter)
+        return _db
+
+    @staticmethod
+    def from_triples(
+        path, modes=None, pos=None, neg=None, file_format="auto", batch_size=65536
+    ):
+        """Read facts from a file of subject/predicate/object triples
+
+        Each triple becomes the fact ``predicate(subject,object).`` The file
+        is streamed each time the Database is written, so it is never held
+        in memory.
+
+        Terms are normalized into valid BoostSRL identifiers: URIs are
+        shortened to their local name (after the last ``/`` or ``#``) and
+        literals to their value, and other characters become ``_``.
+        Predicates start with a lower case letter, and constants which
+        would otherwise be read as variables are prefixed with ``c_``.
+
+        Parameters
+        ----------
+        path : str or pathlib.Path
+            Tab-separated file with one triple per line, or N-Triples file
+        modes : list of str, optional
+            Modes, such as ``Background.modes``. When given, only triples
+            whose (normalized) predicate appears in a mode are kept, and
+            ``modes`` is set on the Database.
+        pos : list of str, optional
+            Positive examples
+        neg : list of str, optional
+            Negative examples
+        file_format : str (default: "auto")
+            ``"tsv"``, ``"ntriples"``, or ``"auto"`` to read files ending in
+            ``.nt`` as N-Triples and others as tab-separated
+        batch_size : int (default: 65536)
+            Number of lines read at a time
+
+        Returns
+        -------
+        db : srlearn.Database
+            Instance of a Database object
+
+        Examples
+        --------
+
+        >>> from srlearn import Database
+        >>> db = Database.from_triples(
+        ...     "dbpedia.nt",
+        ...     modes=["birthPlace(+person,-place).", "spouse(+person,-person)."],
+        ... )
+        """
+        from ._triples import TripleLines
+
+        _predicates = None
+        if modes is not None:
+            _predicates = set(_mode_predicate(_mode) for _mode in modes)
+
+        _db = Database()
+        _db.facts = TripleLines(path, _predicates, file_format, batch_size)
+        _db.pos = pos if pos is not None else []
+        _db.neg = neg if neg is not None else []
+        if modes is not None:
+            _db.modes = list(modes)
+        return _db
@@ -0,0 +1,560 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Build the ``java`` command lines for the jar files.
+
+Every ``java -jar`` call loads, parses, and verifies the classes of the JVM
+and of ``BoostSRL.jar`` or ``SRLBoost.jar`` again. With class data sharing
+(AppCDS), these classes are stored in an archive once, which later calls
+map into memory instead. This is opt-in:
+
+>>> from srlearn import jvm
+>>> jvm.set_class_data_sharing(True)    # doctest: +SKIP
+
+or set the ``SRLEARN_CLASS_DATA_SHARING=1`` environment variable.
+
+The first call with a jar runs as usual and records the classes it loads.
+Afterwards an archive is dumped (which takes about a second), and every
+later call (in any process) uses it. Archives are named after a hash of the
+jar and of the ``java`` version, so a new jar or JVM gets a new archive.
+Class data sharing needs Java 10 or later; with older versions the commands
+are not changed.
+
+The heap, GC and compiler threads, and CPUs of each call are set with a
+:class:`ResourceProfile` (the ``jvm_options`` of the estimators). When the
+JVM runs out of memory, :class:`JVMOutOfMemoryError` is raised.
+"""
+
+import asyncio
+import contextlib
+import hashlib
+import os
+import pathlib
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import zipfile
+
+from ._runner import JVMOutOfMemoryError
+from .system_manager import get_scratch_root
+
+__all__ = [
+    "JVMOutOfMemoryError",
+    "ResourceProfile",
+    "archive_directory",
+    "java_command",
+    "java_command_async",
+    "java_version",
+    "resource_profile",
+    "set_class_data_sharing",
+]
+
+# Environment variable to turn class data sharing on ("1") or off ("0").
+CLASS_DATA_SHARING_VARIABLE = "SRLEARN_CLASS_DATA_SHARING"
+
+# Directory next to `bsrl_data` for class data sharing archives.
+ARCHIVE_DIRECTORY = "bsrl_cds"
+
+_class_data_sharing = None
+_archive_directory = None
+_lock = threading.Lock()
+_java_versions = {}
+_jar_digests = {}
+
+_SIZE_SUFFIXES = {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30, "t": 1 << 40}
+_COLLECTORS = {
+    "serial": "-XX:+UseSerialGC",
+    "parallel": "-XX:+UseParallelGC",
+    "g1": "-XX:+UseG1GC",
+}
+
+
+def set_class_data_sharing(enabled=True, directory=None):
+    """Turn class data sharing on or off for the jar files.
+
+    This takes precedence over the ``SRLEARN_CLASS_DATA_SHARING``
+    environment variable.
+
+    Parameters
+    ----------
+    enabled : bool or None (Default: True)
+        Use class data sharing archives, or None to restore the default.
+    directory : str (or pathlike), optional
+        Where archives are stored, defaults to a ``bsrl_cds`` directory in
+        :func:`srlearn.system_manager.get_scratch_root`.
+    """
+    global _class_data_sharing, _archive_directory
+    _class_data_sharing = enabled
+    _archive_directory = None if directory is None else pathlib.Path(directory)
+
+
+def _sharing_enabled():
+    if _class_data_sharing is not None:
+        return _class_data_sharing
+    return os.environ.get(CLASS_DATA_SHARING_VARIABLE, "").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+
+
+def archive_directory():
+    """Directory where class data sharing archives are stored."""
+    if _archive_directory is not None:
+        return _archive_directory
+    return get_scratch_root().joinpath(ARCHIVE_DIRECTORY)
+
+
+def _java_path():
+    _java = shutil.which("java")
+    if _java is None:
+        raise RuntimeError("Could not find 'java' on the PATH")
+    return os.path.realpath(_java)
+
+
+def java_version():
+    """Version of the ``java`` on the PATH.
+
+    The output of ``java -version`` is read once per ``java`` executable.
+
+    Returns
+    -------
+    feature : int
+        Feature release, e.g. 8 for "1.8.0_292" and 17 for "17.0.2".
+    description : str
+        The output of ``java -version``.
+    """
+    _java = _java_path()
+    _key = (_java, os.stat(_java).st_mtime_ns)
+    if _key not in _java_versions:
+        _output = subprocess.run(
+            [_java, "-version"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            universal_newlines=True,
+        ).stdout
+        # e.g. 'openjdk version "17.0.2"' or 'java version "1.8.0_292"'
+        _match = re.search(r'version "(?:1\.)?(\d+)', _output)
+        _feature = int(_match.group(1)) if _match else 0
+        _java_versions[_key] = (_feature, _output)
+    return _java_versions[_key]
+
+
+def parse_size(size):
+    """Bytes in a size given as an int or as a string like ``"512m"`` or ``"4g"``."""
+    if isinstance(size, int) and not isinstance(size, bool):
+        return size
+    _match = re.fullmatch(r"(\d+)([kmgt]?)b?", str(size).strip().lower())
+    if _match is None:
+        raise ValueError(
+            "Sizes must be a number of bytes or a string like '512m', not {0!r}".format(
+                size
+            )
+        )
+    return int(_match.group(1)) * _SIZE_SUFFIXES[_match.group(2)]
+
+
+def physical_memory():
+    """Bytes of physical memory, or None where it cannot be read."""
+    try:
+        return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def input_size(paths):
+    """Total bytes of the files in some files or directories (recursively)."""
+    _total = 0
+    for _path in paths:
+        if os.path.isfile(_path):
+            _total += os.path.getsize(_path)
+            continue
+        for _root, _, _files in os.walk(_path):
+            for _name in _files:
+                try:
+                    _total += os.path.getsize(os.path.join(_root, _name))
+                except OSError:
+                    pass
+    return _total
+
+
+class ResourceProfile:
+    """Heap, threads, and CPUs of the JVM started for each call to a jar.
+
+    With the defaults, the maximum heap is sized from the files written for
+    the call: the facts, examples, and models are parsed into objects which
+    take many times the space of the text (about 8-20x for ``SRLBoost.jar``).
+
+    >>> from srlearn.jvm import ResourceProfile
+    >>> ResourceProfile(heap="auto").java_options(input_bytes=100 << 20)
+    ['-Xmx1856m', '-XX:+ExitOnOutOfMemoryError']
+    >>> ResourceProfile(heap="2g", processors=2, gc="serial").java_options()
+    ['-Xmx2048m', '-XX:ActiveProcessorCount=2', '-XX:ParallelGCThreads=2', \
+'-XX:ConcGCThreads=2', '-XX:CICompilerCount=2', '-XX:+UseSerialGC', \
+'-XX:+ExitOnOutOfMemoryError']
+
+    Parameters
+    ----------
+    heap : str, int or None (Default: "auto")
+        Maximum heap (``-Xmx``): ``"auto"`` to size it from the input, a size
+        like ``"4g"`` or a number of bytes, or None for the JVM's default
+        (a quarter of the physical memory).
+    heap_factor : float (Default: 16)
+        With ``heap="auto"``, bytes of heap per byte of input.
+    min_heap : str or int (Default: "256m")
+        With ``heap="auto"``, heap added to the scaled input size: the JVM and
+        the jar need this much for the smallest data sets.
+    max_heap : str, int or None (Default: None)
+        With ``heap="auto"``, the largest heap, by default three quarters of
+        the physical memory.
+    processors : int, optional
+        Number of processors the JVM assumes it has
+        (``-XX:ActiveProcessorCount``), which sizes its thread pools. Unless
+        they are given, GC and compiler threads are capped to this number.
+    gc_threads : int, optional
+        Number of parallel and concurrent GC threads.
+    compiler_threads : int, optional
+        Number of JIT compiler threads (at least 2).
+    gc : str, optional
+        Garbage collector: ``"serial"``, ``"parallel"``, or ``"g1"``. The serial
+        collector needs the least memory and threads on one or two CPUs.
+    cpus : iterable of int, optional
+        Pin the JVM to these CPUs (Linux only). The JVM sizes its thread pools
+        from them, unless ``processors`` is given.
+    options : list of str, optional
+        Further options for ``java``, added last.
+
+    Notes
+    -----
+    ``-XX:+ExitOnOutOfMemoryError`` is always passed, so the JVM stops at the
+    first OutOfMemoryError instead of continuing in a broken state, and
+    :class:`JVMOutOfMemoryError` is raised. Profiles only apply when a new JVM
+    is started for every call (``jvm_workers=0``).
+    """
+
+    def __init__(
+        self,
+        heap="auto",
+        heap_factor=16,
+        min_heap="256m",
+        max_heap=None,
+        processors=None,
+        gc_threads=None,
+        compiler_threads=None,
+        gc=None,
+        cpus=None,
+        options=None,
+    ):
+        if heap is not None and heap != "auto":
+            parse_size(heap)
+        parse_size(min_heap)
+        if max_heap is not None:
+            parse_size(max_heap)
+        if (
+            isinstance(heap_factor, bool)
+            or not isinstance(heap_factor, (int, float))
+            or heap_factor < 0
+        ):
+            raise ValueError("'heap_factor' must be a number >= 0")
+        for _name, _value in (
+            ("processors", processors),
+            ("gc_threads", gc_threads),
+            ("compiler_threads", compiler_threads),
+        ):
+            if _value is not None and (
+                isinstance(_value, bool) or not isinstance(_value, int) or _value < 1
+            ):
+                raise ValueError("'{0}' must be None or an 'int' >= 1".format(_name))
+        if gc is not None and gc not in _COLLECTORS:
+            raise ValueError(
+                "'gc' must be None or one of {0}".format(tuple(_COLLECTORS))
+            )
+        if cpus is not None:
+            if not hasattr(os, "sched_setaffinity"):
+                raise ValueError("Pinning to 'cpus' is only supported on Linux")
+            cpus = sorted(set(int(_cpu) for _cpu in cpus))
+            if not cpus:
+                raise ValueError("'cpus' must not be empty")
+        if isinstance(options, str):
+            raise ValueError("'options' must be a list of str")
+
+        self.heap = heap
+        self.heap_factor = heap_factor
+        self.min_heap = min_heap
+        self.max_heap = max_heap
+        self.processors = processors
+        self.gc_threads = gc_threads
+        self.compiler_threads = compiler_threads
+        self.gc = gc
+        self.cpus = cpus
+        self.options = None if options is None else [str(_o) for _o in options]
+
+    def heap_size(self, input_bytes=0):
+        """Maximum heap in bytes for some bytes of input, or None for the default."""
+        if self.heap is None:
+            return None
+        if self.heap != "auto":
+            return parse_size(self.heap)
+        _heap = parse_size(self.min_heap) + int(self.heap_factor * input_bytes)
+        _max = self.max_heap
+        if _max is None:
+            _memory = physical_memory()
+            _max = None if _memory is None else _memory * 3 // 4
+        if _max is not None:
+            _heap = min(_heap, max(parse_size(_max), parse_size(self.min_heap)))
+        return _heap
+
+    def java_options(self, input_bytes=0):
+        """Options for ``java`` for a call reading ``input_bytes`` of files."""
+        _options = []
+        _heap = self.heap_size(input_bytes)
+        if _heap is not None:
+            # Whole megabytes, rounded up: -Xmx needs a multiple of 1024 bytes.
+            _options.append("-Xmx{0}m".format(-(-_heap // (1 << 20))))
+        if self.processors is not None:
+            _options.append("-XX:ActiveProcessorCount={0}".format(self.processors))
+        _gc_threads = self.gc_threads or self.processors
+        if _gc_threads is not None:
+            _options.append("-XX:ParallelGCThreads={0}".format(_gc_threads))
+            _options.append("-XX:ConcGCThreads={0}".format(_gc_threads))
+        _compiler_threads = self.compiler_threads or self.processors
+        if _compiler_threads is not None:
+            # Tiered compilation needs a C1 and a C2 thread.
+            _options.append("-XX:CICompilerCount={0}".format(max(2, _compiler_threads)))
+        if self.gc is not None:
+            _options.append(_COLLECTORS[self.gc])
+        _options.append("-XX:+ExitOnOutOfMemoryError")
+        return _options + (self.options or [])
+
+    def to_dict(self):
+        """Parameters of the profile, e.g. to save them as json."""
+        return dict(self.__dict__)
+
+    def __eq__(self, other):
+        return isinstance(other, ResourceProfile) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        _default = ResourceProfile()
+        _changed = [
+            "{0}={1!r}".format(_k, _v)
+            for _k, _v in self.to_dict().items()
+            if getattr(_default, _k) != _v
+        ]
+        return "ResourceProfile({0})".format(", ".join(_changed))
+
+
+def resource_profile(jvm_options):
+    """The ResourceProfile for an estimator's ``jvm_options``.
+
+    Parameters
+    ----------
+    jvm_options : None, "auto", list of str, dict, or ResourceProfile
+        None for no options, ``"auto"`` for ``ResourceProfile()``, a list of
+        options for ``java`` (used as they are), or the parameters of a
+        ResourceProfile as a dict.
+
+    Returns
+    -------
+    profile : ResourceProfile or None
+    """
+    if jvm_options is None or isinstance(jvm_options, ResourceProfile):
+        return jvm_options
+    if jvm_options == "auto":
+        return ResourceProfile()
+    if isinstance(jvm_options, dict):
+        return ResourceProfile(**jvm_options)
+    if isinstance(jvm_options, (list, tuple)) and all(
+        isinstance(_o, str) for _o in jvm_options
+    ):
+        return ResourceProfile(heap=None, options=list(jvm_options))
+    raise ValueError(
+        "'jvm_options' must be None, 'auto', a list of str, or a ResourceProfile"
+    )
+
+
+def _jar_digest(jar):
+    _stat = os.stat(jar)
+    _key = (os.path.realpath(jar), _stat.st_size, _stat.st_mtime_ns)
+    if _key not in _jar_digests:
+        _hash = hashlib.sha1()
+        with open(jar, "rb") as _fh:
+            for _chunk in iter(lambda: _fh.read(1 << 20), b""):
+                _hash.update(_chunk)
+        _jar_digests[_key] = _hash.hexdigest()[:16]
+    return _jar_digests[_key]
+
+
+def _archive_path(jar):
+    _java = hashlib.sha1(java_version()[1].encode("utf-8")).hexdigest()[:16]
+    _name = "{0}-{1}-{2}.jsa".format(
+        pathlib.Path(jar).stem, _jar_digest(jar), _java
+    )
+    return archive_directory().joinpath(_name)
+
+
+def _directory_entries(manifest, jar):
+    """Entries of a manifest's Class-Path which are directories."""
+    # Lines longer than 72 bytes continue on lines starting with a space.
+    _text = manifest.replace("\r\n", "\n").replace("\n ", "")
+    for _line in _text.split("\n"):
+        if _line.lower().startswith("class-path:"):
+            _base = os.path.dirname(os.path.abspath(jar))
+            return [
+                _entry
+                for _entry in _line.split(":", 1)[1].split()
+                if os.path.isdir(os.path.join(_base, _entry))
+            ]
+    return []
+
+
+def _shareable_jar(jar, archive):
+    """The jar, or a copy whose manifest does not put directories on the class path.
+
+    ``BoostSRL.jar`` has ``Class-Path: .``, and class data sharing is
+    turned off when a non-empty directory is on the class path. The copy is
+    stored next to the archive.
+    """
+    with zipfile.ZipFile(jar) as _zip:
+        try:
+            _manifest = _zip.read("META-INF/MANIFEST.MF").decode("utf-8")
+        except KeyError:
+            return str(jar)
+        _directories = _directory_entries(_manifest, jar)
+        if not _directories:
+            return str(jar)
+
+        _copy = str(archive)[: -len(".jsa")] + ".jar"
+        if os.path.exists(_copy):
+            return _copy
+        _lines = []
+        for _line in _manifest.replace("\r\n", "\n").replace("\n ", "").split("\n"):
+            if _line.lower().startswith("class-path:"):
+                _entries = [
+                    _e
+                    for _e in _line.split(":", 1)[1].split()
+                    if _e not in _directories
+                ]
+                if not _entries:
+                    continue
+                _line = "Class-Path: " + " ".join(_entries)
+            _lines.append(_line)
+
+        _partial = "{0}.{1}.{2}.part".format(_copy, os.getpid(), threading.get_ident())
+        try:
+            with zipfile.ZipFile(_partial, "w", zipfile.ZIP_DEFLATED) as _out:
+                for _info in _zip.infolist():
+                    if _info.filename == "META-INF/MANIFEST.MF":
+                        _out.writestr(_info, "\r\n".join(_lines).encode("utf-8"))
+                    else:
+                        _out.writestr(_info, _zip.read(_info))
+            os.replace(_partial, _copy)
+        finally:
+            if os.path.exists(_partial):
+                os.remove(_partial)
+    return _copy
+
+
+def _dump_archive(jar, classlist, archive):
+    """Dump an archive of the classes in ``classlist``, replacing it atomically."""
+    _partial = "{0}.{1}.{2}.part".format(archive, os.getpid(), threading.get_ident())
+    try:
+        _process = subprocess.run(
+            [
+                "java",
+                "-Xshare:dump",
+                "-XX:SharedClassListFile=" + str(classlist),
+                "-XX:SharedArchiveFile=" + _partial,
+                "-cp",
+                str(jar),
+            ],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+        )
+        if _process.returncode == 0 and os.path.exists(_partial):
+            os.replace(_partial, archive)
+    finally:
+        if os.path.exists(_partial):
+            os.remove(_partial)
+
+
+@contextlib.contextmanager
+def java_command(jar, options=()):
+    """Command to run a jar, using a class data sharing archive when enabled.
+
+    Used as a context manager around the call:
+
+    >>> from srlearn.jvm import java_command
+    >>> with java_command("SRLBoost.jar") as argv:    # doctest: +SKIP
+    ...     subprocess.run(argv + ["-l", "-train", "train/"])
+
+    When there is no archive for the jar yet, the classes loaded by the call
+    are recorded, and an archive is dumped after the call succeeds. Jars
+    whose manifest puts a directory on the class path (which turns class
+    data sharing off) are run from a copy without those entries.
+
+    Parameters
+    ----------
+    jar : str (or pathlike)
+        Path to the jar file.
+    options : list of str, optional
+        Options for ``java``, e.g. from :meth:`ResourceProfile.java_options`.
+
+    Yields
+    ------
+    argv : list of str
+        ``java``, its options, ``-jar``, and the jar.
+    """
+    options = list(options)
+    if not _sharing_enabled() or java_version()[0] < 10:
+        yield ["java"] + options + ["-jar", str(jar)]
+        return
+
+    _archive = _archive_path(jar)
+    if _archive.exists():
+        yield ["java"] + options + [
+            "-XX:SharedArchiveFile=" + str(_archive),
+            "-Xshare:auto",
+            "-jar",
+            _shareable_jar(jar, _archive),
+        ]
+        return
+
+    _archive.parent.mkdir(parents=True, exist_ok=True)
+    _jar = _shareable_jar(jar, _archive)
+    _fd, _classlist = tempfile.mkstemp(dir=_archive.parent, suffix=".classlist")
+    os.close(_fd)
+    try:
+        yield ["java"] + options + [
+            "-XX:DumpLoadedClassList=" + _classlist,
+            "-jar",
+            _jar,
+        ]
+        with _lock:
+            if not _archive.exists():
+                _dump_archive(_jar, _classlist, _archive)
+    finally:
+        os.remove(_classlist)
+
+
+@contextlib.asynccontextmanager
+async def java_command_async(jar, options=()):
+    """Like :func:`java_command`, as an async context manager.
+
+    Reading the ``java`` version and dumping an archive start processes of
+    their own, so they run in a thread instead of blocking the event loop.
+
+    >>> async with java_command_async("SRLBoost.jar") as argv:    # doctest: +SKIP
+    ...     await run_command_async(argv + ["-l", "-train", "train/"])
+    """
+    _loop = asyncio.get_running_loop()
+    _context = java_command(jar, options)
+    _argv = await _loop.run_in_executor(None, _context.__enter__)
+    try:
+        yield _argv
+    except BaseException as _error:
+        # Only removes the list of classes, no archive is dumped.
+        _context.__exit__(type(_error), _error, _error.__traceback__)
+        raise
+    await _loop.run_in_executor(None, _context.__exit__, None, None, None)
@@ -0,0 +1,287 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Parse the literals in facts, examples, and modes.
+
+Facts and examples are written one literal per line, like
+``friends(alice, bob).``, or ``regressionExample(medv(id1),33.2).`` for
+regression. Modes are written like ``friends(+Person,-Person).``
+
+>>> from srlearn.parser import parse_literal, parse_mode
+>>> parse_literal("friends(alice, bob).")
+Literal('friends', ('alice', 'bob'))
+>>> parse_mode("friends(+Person,-Person).")
+Mode('friends', ('+', '-'), ('Person', 'Person'))
+
+Whole files (or any iterable of lines) are parsed one line at a time:
+
+>>> from srlearn.parser import parse_lines
+>>> [str(_literal) for _literal in parse_lines(["% comment", "smokes(bob)."])]
+['smokes(bob).']
+
+For large sets of facts, :class:`srlearn.columnar.ColumnarFacts` stores the
+parsed arguments as integer arrays instead of one object per literal.
+"""
+
+import os
+
+from .system_manager import open_file
+
+__all__ = [
+    "Literal",
+    "Mode",
+    "parse_file",
+    "parse_lines",
+    "parse_literal",
+    "parse_mode",
+    "parse_regression_example",
+    "parse_terms",
+    "read_lines",
+    "split_arguments",
+]
+
+_MARKERS = "+-#`"
+
+
+def split_arguments(string):
+    """Split a comma-separated argument string at the top level.
+
+    Commas nested inside parentheses or quotes do not split.
+
+    >>> split_arguments("medv(id1), 33.2")
+    ['medv(id1)', '33.2']
+    """
+    if "(" not in string and '"' not in string and "'" not in string:
+        # Fast path for the common case: plain constants and variables.
+        if " " not in string and "\t" not in string:
+            return string.split(",") if string else []
+        if not string.strip():
+            return []
+        return [_a.strip() for _a in string.split(",")]
+
+    _args = []
+    _depth = 0
+    _quote = None
+    _start = 0
+    for i, char in enumerate(string):
+        if _quote:
+            if char == _quote:
+                _quote = None
+        elif char in "\"'":
+            _quote = char
+        elif char == "(":
+            _depth += 1
+        elif char == ")":
+            _depth -= 1
+        elif char == "," and _depth == 0:
+            _args.append(string[_start:i].strip())
+            _start = i + 1
+    _last = string[_start:].strip()
+    if _last or _args:
+        _args.append(_last)
+    return _args
+
+
+def parse_terms(string):
+    """Parse ``pred(a, b)`` into ``("pred", ("a", "b"))``.
+
+    This is the fastest way to parse one literal, and does not build a
+    :class:`Literal`. A final period is optional.
+
+    Raises
+    ------
+    ValueError
+        If there is an open parenthesis but the literal does not end with a
+        close parenthesis.
+    """
+    string = string.strip()
+    if string[-1:] == ".":
+        string = string[:-1].rstrip()
+    _open = string.find("(")
+    if _open == -1:
+        return string, ()
+    if string[-1:] != ")":
+        raise ValueError("Could not parse literal: {0}".format(string))
+    return (
+        string[:_open].strip(),
+        tuple(split_arguments(string[_open + 1 : -1])),
+    )
+
+
+class Literal:
+    """A predicate applied to a tuple of arguments.
+
+    Parameters
+    ----------
+    predicate : str
+        Name of the predicate.
+    arguments : tuple of str
+        Arguments as they were written, which may be nested literals.
+    """
+
+    __slots__ = ("predicate", "arguments")
+
+    def __init__(self, predicate, arguments=()):
+        self.predicate = predicate
+        self.arguments = tuple(arguments)
+
+    @property
+    def arity(self):
+        return len(self.arguments)
+
+    def __eq__(self, other):
+        if not isinstance(other, Literal):
+            return NotImplemented
+        return (self.predicate, self.arguments) == (other.predicate, other.arguments)
+
+    def __hash__(self):
+        return hash((self.predicate, self.arguments))
+
+    def __repr__(self):
+        return "Literal({0!r}, {1!r})".format(self.predicate, self.arguments)
+
+    def __str__(self):
+        if not self.arguments:
+            return self.predicate + "."
+        return "{0}({1}).".format(self.predicate, ",".join(self.arguments))
+
+
+class Mode:
+    """A mode declaration, e.g. ``friends(+Person,-Person).``
+
+    Parameters
+    ----------
+    predicate : str
+        Name of the predicate.
+    markers : tuple of str
+        The mode of each argument: ``"+"`` (input), ``"-"`` (output), ``"#"``
+        (constant), or a combination of these.
+    types : tuple of str
+        The type of each argument.
+    """
+
+    __slots__ = ("predicate", "markers", "types")
+
+    def __init__(self, predicate, markers, types):
+        self.predicate = predicate
+        self.markers = tuple(markers)
+        self.types = tuple(types)
+
+    @property
+    def arity(self):
+        return len(self.types)
+
+    def __eq__(self, other):
+        if not isinstance(other, Mode):
+            return NotImplemented
+        return (self.predicate, self.markers, self.types) == (
+            other.predicate,
+            other.markers,
+            other.types,
+        )
+
+    def __hash__(self):
+        return hash((self.predicate, self.markers, self.types))
+
+    def __repr__(self):
+        return "Mode({0!r}, {1!r}, {2!r})".format(
+            self.predicate, self.markers, self.types
+        )
+
+    def __str__(self):
+        return "{0}({1}).".format(
+            self.predicate,
+            ",".join(_m + _t for _m, _t in zip(self.markers, self.types)),
+        )
+
+
+def parse_literal(string):
+    """Parse one fact or example into a :class:`Literal`."""
+    return Literal(*parse_terms(string))
+
+
+def parse_mode(string):
+    """Parse one mode into a :class:`Mode`, with or without a ``mode:`` prefix.
+
+    >>> parse_mode("mode: courseprof(-Course, +Person).")
+    Mode('courseprof', ('-', '+'), ('Course', 'Person'))
+    """
+    string = string.strip()
+    if string.startswith("mode:"):
+        string = string[len("mode:") :]
+    _predicate, _arguments = parse_terms(string)
+    _markers = []
+    _types = []
+    for _argument in _arguments:
+        _type = _argument.lstrip(_MARKERS)
+        _marker = _argument[: len(_argument) - len(_type)]
+        if not _marker or not _type:
+            raise ValueError(
+                "Could not parse mode argument '{0}' in: {1}".format(_argument, string)
+            )
+        _markers.append(_marker)
+        _types.append(_type)
+    return Mode(_predicate, _markers, _types)
+
+
+def parse_regression_example(string):
+    """Parse ``regressionExample(medv(id1),33.2).`` into a literal and value.
+
+    >>> parse_regression_example("regressionExample(medv(id1),33.2).")
+    (Literal('medv', ('id1',)), 33.2)
+    """
+    _predicate, _arguments = parse_terms(string)
+    if _predicate != "regressionExample" or len(_arguments) != 2:
+        raise ValueError("Not a regression example: {0}".format(string))
+    return parse_literal(_arguments[0]), float(_arguments[1])
+
+
+def read_lines(source):
+    """Iterate over the non-empty, non-comment lines of a source.
+
+    ``source`` may be a path to a file, which is read one line at a time
+    (and decompressed, see :func:`srlearn.system_manager.open_file`), or
+    an iterable of strings (such as a list or
+    :class:`srlearn.columnar.ColumnarFacts`), mirroring the polymorphic
+    behavior of :func:`srlearn.database.Database.write`. Lines starting with
+    ``//`` or ``%`` are comments.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open_file(source, "r") as _fh:
+            yield from _strip_lines(_fh)
+    else:
+        yield from _strip_lines(source)
+
+
+def _strip_lines(lines):
+    for _line in lines:
+        _line = _line.strip()
+        if _line and _line[0] != "%" and not _line.startswith("//"):
+            yield _line
+
+
+def parse_lines(lines):
+    """Parse each fact or example in ``lines`` into a :class:`Literal`.
+
+    Parameters
+    ----------
+    lines : iterable of str, or str (or pathlike)
+        Lines, or a path to a file with one literal per line.
+
+    Yields
+    ------
+    literal : Literal
+    """
+    for _line in read_lines(lines):
+        yield Literal(*parse_terms(_line))
+
+
+def parse_file(path):
+    """Parse a file of facts or examples, one line at a time.
+
+    Equivalent to :func:`parse_lines` with a path, but will not accept a
+    string of lines by mistake.
+    """
+    if not isinstance(path, (str, os.PathLike)):
+        raise TypeError("'path' should be a 'str' or 'os.PathLike'")
+    return parse_lines(path)
@@ -0,0 +1,190 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Follow learning as the jar writes its log.
+
+``fit(database, progress=...)`` parses the output of the jar while it runs,
+and reports each tree as soon as it is learned:
+
+>>> def show(tree):
+...     print("tree {0}/{1}: {2} clauses after {3:.1f}s".format(
+...         tree.tree, tree.n_trees, tree.clauses, tree.elapsed))
+>>> dn.fit(train, progress=show)    # doctest: +SKIP
+tree 1/10: 2 clauses after 28.1s
+tree 2/10: 3 clauses after 30.1s
+
+With ``progress=True``, a `tqdm <https://tqdm.github.io/>`_ progress bar is
+shown instead. The jar writes each tree to ``TREES_DIR`` when it is learned,
+so ``tree.path`` can be read (e.g. to save or inspect the tree) before
+learning finishes.
+"""
+
+from collections import namedtuple
+import logging
+import os
+import re
+import threading
+import time
+
+__all__ = ["TreeProgress", "TrainingLog"]
+
+TreeProgress = namedtuple(
+    "TreeProgress", ["tree", "n_trees", "clauses", "elapsed", "path"]
+)
+TreeProgress.__doc__ = """A tree learned by the jar.
+
+Attributes
+----------
+tree : int
+    Number of the tree, starting at 1.
+n_trees : int
+    Number of trees being learned.
+clauses : int
+    Number of clauses (paths from the root to a leaf) in the tree.
+elapsed : float
+    Seconds since the jar started.
+path : pathlib.Path
+    The ``.tree`` file written by the jar.
+"""
+
+# e.g. "%%%%%  WILL-Produced Tree #3 @ 3:47:43 10/18/26.  [Using ...]  %%%%%"
+_TREE = re.compile(r"WILL-Produced Tree #(\d+)")
+# e.g. "cancer(A, 0.1420942428155648) :- !. // Clause #2."
+_CLAUSE = re.compile(r"// Clause #\d+\.")
+# Printed after the clauses of each tree, and after saving it.
+_FLATTENED = "The flattened versions of these clauses"
+_SAVED = "% Saving model in:"
+
+
+class TrainingLog:
+    """Parse the output of the jar while learning, calling back for each tree.
+
+    Parameters
+    ----------
+    callback : callable
+        Called with a :class:`TreeProgress` for each learned tree.
+    n_trees : int
+        Number of trees being learned.
+    trees_dir : pathlib.Path
+        Directory the jar writes the trees to.
+    target : str
+        Target predicate, which names the tree files.
+    """
+
+    def __init__(self, callback, n_trees, trees_dir, target):
+        self.callback = callback
+        self.n_trees = n_trees
+        self.trees_dir = trees_dir
+        self.target = target
+        self._started = time.monotonic()
+        self._tree = None
+        self._clauses = 0
+        self._counting = False
+        self._saved = False
+
+    def __call__(self, line):
+        """Read one line of output."""
+        if self._saved:
+            # The tree file is written after the line announcing the checkpoint.
+            self._report()
+        _match = _TREE.search(line)
+        if _match:
+            self._tree = int(_match.group(1))
+            self._clauses = 0
+            self._counting = True
+        elif self._tree is not None:
+            if self._counting and _CLAUSE.search(line):
+                self._clauses += 1
+            elif _FLATTENED in line:
+                self._counting = False
+            elif line.startswith(_SAVED):
+                self._saved = True
+
+    def finish(self):
+        """Report the last tree, once the jar has exited."""
+        if self._saved:
+            self._report()
+
+    def _report(self):
+        _progress = TreeProgress(
+            tree=self._tree,
+            n_trees=self.n_trees,
+            clauses=self._clauses,
+            elapsed=time.monotonic() - self._started,
+            path=self.trees_dir.joinpath(
+                "{0}Tree{1}.tree".format(self.target, self._tree - 1)
+            ),
+        )
+        self._tree = None
+        self._saved = False
+        try:
+            self.callback(_progress)
+        except Exception:
+            # The output must still be read, or the jar blocks.
+            logging.exception("Error in progress callback %r", self.callback)
+
+
+def progress_bar(n_trees):
+    """A tqdm progress bar of learned trees, and its callback."""
+    try:
+        from tqdm.auto import tqdm
+    except ImportError as excep:
+        raise ImportError("tqdm needs to be available for progress=True") from excep
+    _bar = tqdm(total=n_trees, unit="tree")
+
+    def _update(progress):
+        _bar.set_postfix(clauses=progress.clauses)
+        _bar.update(progress.tree - _bar.n)
+
+    return _bar, _update
+
+
+def follow(path, on_line, stop, interval=0.1):
+    """Call ``on_line`` for each line appended to a file until ``stop`` is set.
+
+    For output written to a file by another process (e.g. by a
+    :class:`srlearn.worker.WorkerPool`). Lines written before ``stop`` was
+    set are all read.
+    """
+    _fh = None
+    _partial = ""
+    try:
+        while True:
+            _stopping = stop.is_set()
+            if _fh is None and os.path.exists(path):
+                _fh = open(path, "r")
+            if _fh is not None:
+                for _line in iter(_fh.readline, ""):
+                    _partial += _line
+                    if _partial.endswith("\n"):
+                        on_line(_partial.rstrip("\r\n"))
+                        _partial = ""
+            if _stopping:
+                if _partial:
+                    on_line(_partial)
+                return
+            stop.wait(interval)
+    finally:
+        if _fh is not None:
+            _fh.close()
+
+
+class FollowThread(threading.Thread):
+    """Run :func:`follow` in a thread, as a context manager."""
+
+    def __init__(self, path, on_line):
+        super().__init__(daemon=True)
+        self.path = path
+        self.on_line = on_line
+        self._stop_following = threading.Event()
+
+    def run(self):
+        follow(self.path, self.on_line, self._stop_following)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop_following.set()
+        self.join()
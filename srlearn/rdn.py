@@ -9,10 +9,16 @@ import warnings
 import numpy as np
 
 from .base import BaseBoostedRelationalModel
-from .database import Database
+from .base import _JarCall
+from .base import _as_database
+from ._inference import best_f1_threshold
+from ._inference import parse_examples
+from ._inference import sigmoid
 
 warnings.simplefilter("default")
 
+_THRESHOLD = re.compile("% Threshold = (\\d*.\\d*)")
+
 
 class BoostedRDNClassifier(BaseBoostedRelationalModel):
     """Relational Dependency Networks Estimator
@@ -43,7 +49,7 @@ class BoostedRDNClassifier(BaseBoostedRelationalModel):
     mode: friends(-Person,+Person).
     mode: smokes(+Person).
     mode: cancer(+Person).
-    , n_estimators=10, neg_pos_ratio=2, solver='BoostSRL', target='cancer')
+    , inference='jar', jvm_options=None, jvm_workers=0, n_estimators=10, neg_pos_ratio=2, solver='BoostSRL', target='cancer', timeout=None)
     >>> dn.predict(test)
     array([ True,  True,  True, False, False])
 
@@ -60,6 +66,10 @@ class BoostedRDNClassifier(BaseBoostedRelationalModel):
         max_tree_depth=3,
         neg_pos_ratio=2,
         solver=None,
+        inference="jar",
+        jvm_workers=0,
+        jvm_options=None,
+        timeout=None,
     ):
         """Initialize a BoostedRDN
 
@@ -77,6 +87,26 @@ class BoostedRDNClassifier(BaseBoostedRelationalModel):
             Maximum number of nodes from root to leaf (height) in the tree.
         neg_pos_ratio : int or float, optional (default: 2)
             Ratio of negative to positive examples used during learning.
+        solver : str, optional (default: None)
+            Jar used for learning and inference: "BoostSRL" or "SRLBoost"
+        inference : str, optional (default: "jar")
+            Use the ``solver`` jar for predictions, or evaluate the learned
+            trees without starting a JVM: one example at a time ("python"),
+            or for all examples at once with NumPy joins ("numpy").
+        jvm_workers : int, optional (default: 0)
+            Number of long-lived JVM worker processes (shared between
+            estimators) used to run the jar. With 0, a new JVM is started for
+            every call. Requires ``JPype1``, see :mod:`srlearn.worker`.
+        jvm_options : None, "auto", list of str, or ResourceProfile, optional
+            Heap, threads, and CPUs of the JVM started for each call (with
+            ``jvm_workers=0``). ``"auto"`` sizes the heap from the files
+            written for the call, see :class:`srlearn.jvm.ResourceProfile`.
+            It cannot be combined with ``jvm_workers``. When the JVM runs out
+            of memory, ``fit`` and ``predict`` raise
+            :class:`srlearn.jvm.JVMOutOfMemoryError`.
+        timeout : float, optional (default: None)
+            Seconds each call to the jar may run before it is stopped and
+            ``subprocess.TimeoutExpired`` is raised. None waits indefinitely.
 
         Attributes
         ----------
@@ -84,6 +114,11 @@ class BoostedRDNClassifier(BaseBoostedRelationalModel):
             Return the boosted regression trees
         feature_importances_ : array, shape (n_features)
             Return the feature importances (based on how often each feature appears)
+        fit_stats_ : dict
+            Time and resources spent in each stage of the last ``fit``, see
+            :mod:`srlearn.stats`
+        predict_stats_ : dict
+            Time and resources spent in each stage of the last prediction
         """
 
         super().__init__(
@@ -94,9 +129,13 @@ class BoostedRDNClassifier(BaseBoostedRelationalModel):
             max_tree_depth=max_tree_depth,
             neg_pos_ratio=neg_pos_ratio,
             solver=solver,
+            inference=inference,
+            jvm_workers=jvm_workers,
+            jvm_options=jvm_options,
+            timeout=timeout,
         )
 
-    def fit(self, database):
+    def fit(self, database, progress=None):
         """Learn structure and parameters.
 
         Fit the structure and parameters of a Relational Dependency Network using a
@@ -107,6 +146,10 @@ class BoostedRDNClassifier(BaseBoostedRelationalModel):
         ----------
         database : :class:`srlearn.database.Database`
             Database containing examples and facts.
+        progress : callable or bool, optional
+            Called with a :class:`srlearn.progress.TreeProgress` for each tree
+            as soon as it is learned, or True for a tqdm progress bar. See
+            :mod:`srlearn.progress`.
 
         Returns
         -------
@@ -129,23 +172,23 @@ class BoostedRDNClassifier(BaseBoostedRelationalModel):
         .. [2] https://starling.utdallas.edu/software/boostsrl/
         """
 
-        self._check_params()
+        return self._fit(database, progress)
+
+    def _train_call(self, database):
+        """Write the background and data for learning, return the call to the jar."""
 
         # Write the background to file.
         self.background.write(
-            filename="train", location=self.file_system.files.TRAIN_DIR
+            filename="train",
+            location=self.file_system.files.TRAIN_DIR,
+            cache=self.file_system.cache,
         )
 
-        if isinstance(database, tuple):
-            _db = Database()
-            _db.pos = database.pos
-            _db.neg = database.neg
-            _db.facts = database.facts
-            database = _db
-
         # Write the data to files.
-        database.write(
-            filename="train", location=self.file_system.files.TRAIN_DIR
+        _as_database(database).write(
+            filename="train",
+            location=self.file_system.files.TRAIN_DIR,
+            cache=self.file_system.cache,
         )
 
         if self.solver == "BoostSRL":
@@ -153,90 +196,107 @@ class BoostedRDNClassifier(BaseBoostedRelationalModel):
         else:
             _jar = str(self.file_system.files.SRLBOOST_BACKEND)
 
-        _CALL = (
-            "java -jar "
-            + _jar
-            + " -l -train "
-            + str(self.file_system.files.TRAIN_DIR)
-            + " -target "
-            + self.target
-            + " -trees "
-            + str(self.n_estimators)
-            + " -negPosRatio "
-            + str(self.neg_pos_ratio)
-            + " > "
-            + str(self.file_system.files.TRAIN_LOG)
+        _args = [
+            "-l",
+            "-train",
+            str(self.file_system.files.TRAIN_DIR),
+            "-target",
+            self.target,
+            "-trees",
+            str(self.n_estimators),
+            "-negPosRatio",
+            str(self.neg_pos_ratio),
+        ]
+
+        return _JarCall(
+            _jar,
+            _args,
+            str(self.file_system.files.TRAIN_LOG),
+            None,
+            [self.file_system.files.TRAIN_DIR],
         )
 
-        # Call the constructed command.
-        self._call_shell_command(_CALL)
-
-        # Read the trees from files.
-        _estimators = []
-        for _tree_number in range(self.n_estimators):
-            with open(
-                self.file_system.files.TREES_DIR.joinpath(
-                    "{0}Tree{1}.tree".format(self.target, _tree_number)
-                )
-            ) as _fh:
-                _estimators.append(_fh.read())
-
-        self._get_dotfiles()
-        self.estimators_ = _estimators
-
-        return self
-
-    def _run_inference(self, database) -> None:
-        """Run inference mode on the BoostSRL Jar files.
-
-        This is a helper method for ``self.predict`` and ``self.predict_proba``
-        """
-
-        self._check_initialized()
-
-        if isinstance(database, tuple):
-            _db = Database()
-            _db.pos = database.pos
-            _db.neg = database.neg
-            _db.facts = database.facts
-            database = _db
+    def _test_call(self, database):
+        """Write the background and data for inference, return the call to the jar."""
 
         # Write the background to file.
         self.background.write(
-            filename="test", location=self.file_system.files.TEST_DIR
+            filename="test",
+            location=self.file_system.files.TEST_DIR,
+            cache=self.file_system.cache,
         )
 
         # Write the data to files.
-        database.write(filename="test", location=self.file_system.files.TEST_DIR)
+        database.write(
+            filename="test",
+            location=self.file_system.files.TEST_DIR,
+            cache=self.file_system.cache,
+        )
 
         if self.solver == "BoostSRL":
             _jar = str(self.file_system.files.BOOSTSRL_BACKEND)
         else:
             _jar = str(self.file_system.files.SRLBOOST_BACKEND)
 
-        _CALL = (
-            "java -jar "
-            + _jar
-            + " -i -test "
-            + str(self.file_system.files.TEST_DIR)
-            + " -model "
-            + str(self.file_system.files.MODELS_DIR)
-            + " -target "
-            + self.target
-            + " -trees "
-            + str(self.n_estimators)
-            + " -aucJarPath "
-            + str(self.file_system.files.AUC_JAR)
-            + " > "
-            + str(self.file_system.files.TEST_LOG)
+        _args = [
+            "-i",
+            "-test",
+            str(self.file_system.files.TEST_DIR),
+            "-model",
+            str(self.file_system.files.MODELS_DIR),
+            "-target",
+            self.target,
+            "-trees",
+            str(self.n_estimators),
+            "-aucJarPath",
+            str(self.file_system.files.AUC_JAR),
+        ]
+
+        return _JarCall(
+            _jar,
+            _args,
+            str(self.file_system.files.TEST_LOG),
+            {"threshold": _THRESHOLD},
+            [self.file_system.files.TEST_DIR, self.file_system.files.MODELS_DIR],
+        )
+
+    def _read_results(self, matches):
+        """Read the threshold and the results of inference with the jar.
+
+        Returns
+        -------
+        classes : ndarray
+            1 for positive examples and 0 for negative examples.
+        results : ndarray
+            Probability of the class each example was labeled with, following
+            the convention of the ``results_<target>.db`` file.
+        """
+        self.threshold_ = float(matches["threshold"])
+
+        _results_db = self.file_system.files.TEST_DIR.joinpath(
+            "results_" + self.target + ".db"
         )
+        _classes, _results = np.genfromtxt(
+            _results_db,
+            delimiter=") ",
+            usecols=(0, 1),
+            converters={0: lambda s: 0 if s[0] == 33 else 1},
+            unpack=True,
+        )
+        return _classes, _results
+
+    def _run_python_inference(self, database):
+        """Score examples with :mod:`srlearn._inference` instead of the jar."""
 
-        self._call_shell_command(_CALL)
+        _pos, _ = parse_examples(database.pos, self.target)
+        _neg, _ = parse_examples(database.neg, self.target)
 
-        # Read the threshold
-        with open(self.file_system.files.TEST_LOG, "r") as _fh:
-            _threshold = re.findall("% Threshold = \\d*.\\d*", _fh.read())
-        self.threshold_ = float(_threshold[0].split(" = ")[1])
+        _probs = sigmoid(self._python_decision_function(_pos + _neg, database))
+        _classes = np.concatenate((np.ones(len(_pos)), np.zeros(len(_neg))))
+        self.threshold_ = best_f1_threshold(_probs, _classes)
+
+        _results = np.where(_classes == 1, _probs, 1 - _probs)
+        return _classes, _results
 
     def predict(self, database):
         """Use the learned model to predict on new data.
@@ -252,24 +312,33 @@ class BoostedRDNClassifier(BaseBoostedRelationalModel):
             Positive or negative class.
         """
 
-        self._run_inference(database)
+        return self._predict_classes(*self._run_inference(database))
 
-        # Collect the classifications.
-        _results_db = self.file_system.files.TEST_DIR.joinpath(
-            "results_" + self.target + ".db"
-        )
-        _classes, _results = np.genfromtxt(
-            _results_db,
-            delimiter=") ",
-            usecols=(0, 1),
-            converters={0: lambda s: 0 if s[0] == 33 else 1},
-            unpack=True,
-        )
+    async def predict_async(self, database):
+        """Like :meth:`predict`, without blocking the event loop.
+
+        Cancelling the task kills the JVM. Concurrent predictions with the
+        same estimator take turns running the jar, since they share its test
+        directory.
+
+        Parameters
+        ----------
+        database : :class:`srlearn.Database`
+            Database containing examples and facts.
+
+        Returns
+        -------
+        results : ndarray
+            Positive or negative class.
+        """
+
+        return self._predict_classes(*await self._run_inference_async(database))
 
-        self.classes_ = _classes
+    def _predict_classes(self, classes, results):
+        self.classes_ = classes
 
-        _neg = _results[_classes == 0]
-        _pos = _results[_classes == 1]
+        _neg = results[classes == 0]
+        _pos = results[classes == 1]
         _results2 = np.greater(
             np.concatenate((_pos, 1 - _neg), axis=0), self.threshold_
         )
@@ -290,24 +359,36 @@ class BoostedRDNClassifier(BaseBoostedRelationalModel):
             Probability of belonging to the positive class
         """
 
-        self._run_inference(database)
+        return self._predict_probabilities(*self._run_inference(database))
 
-        _results_db = self.file_system.files.TEST_DIR.joinpath(
-            "results_" + self.target + ".db"
-        )
-        _classes, _results = np.genfromtxt(
-            _results_db,
-            delimiter=") ",
-            usecols=(0, 1),
-            converters={0: lambda s: 0 if s[0] == 33 else 1},
-            unpack=True,
+    async def predict_proba_async(self, database):
+        """Like :meth:`predict_proba`, without blocking the event loop.
+
+        Cancelling the task kills the JVM. Concurrent predictions with the
+        same estimator take turns running the jar, since they share its test
+        directory.
+
+        Parameters
+        ----------
+        database : :class:`srlearn.Database`
+            Database containing examples and facts.
+
+        Returns
+        -------
+        results : ndarray
+            Probability of belonging to the positive class
+        """
+
+        return self._predict_probabilities(
+            *await self._run_inference_async(database)
         )
 
-        _neg = _results[_classes == 0]
-        _pos = _results[_classes == 1]
+    def _predict_probabilities(self, classes, results):
+        _neg = results[classes == 0]
+        _pos = results[classes == 1]
         _results2 = np.concatenate((_pos, 1 - _neg), axis=0)
 
-        self.classes_ = _classes
+        self.classes_ = classes
 
         return _results2
 
@@ -384,7 +465,7 @@ class BoostedRDNRegressor(BaseBoostedRelationalModel):
     mode: b(+id,#varb).
     mode: lstat(+id,#varlstat).
     mode: medv(+id).
-    , n_estimators=5, neg_pos_ratio=2, solver='BoostSRL', target='medv')
+    , inference='jar', jvm_options=None, jvm_workers=0, n_estimators=5, neg_pos_ratio=2, solver='BoostSRL', target='medv', timeout=None)
     >>> reg.predict(test)   # doctest: +SKIP
     array([10.04313307 13.55804603 20.549378   18.14681934 23.9393469  10.01292162
          29.83298024 20.34668817 27.81642572 32.04067867  9.41342835 20.975001
@@ -403,6 +484,10 @@ class BoostedRDNRegressor(BaseBoostedRelationalModel):
         max_tree_depth=3,
         neg_pos_ratio=2,
         solver="BoostSRL",
+        inference="jar",
+        jvm_workers=0,
+        jvm_options=None,
+        timeout=None,
     ):
         """Initialize a BoostedRDN
 
@@ -420,6 +505,26 @@ class BoostedRDNRegressor(BaseBoostedRelationalModel):
             Maximum number of nodes from root to leaf (height) in the tree.
         neg_pos_ratio : int or float, optional (default: 2)
             Ratio of negative to positive examples used during learning.
+        solver : str, optional (default: "BoostSRL")
+            Jar used for learning and inference: "BoostSRL" or "SRLBoost"
+        inference : str, optional (default: "jar")
+            Use the ``solver`` jar for predictions, or evaluate the learned
+            trees without starting a JVM: one example at a time ("python"),
+            or for all examples at once with NumPy joins ("numpy").
+        jvm_workers : int, optional (default: 0)
+            Number of long-lived JVM worker processes (shared between
+            estimators) used to run the jar. With 0, a new JVM is started for
+            every call. Requires ``JPype1``, see :mod:`srlearn.worker`.
+        jvm_options : None, "auto", list of str, or ResourceProfile, optional
+            Heap, threads, and CPUs of the JVM started for each call (with
+            ``jvm_workers=0``). ``"auto"`` sizes the heap from the files
+            written for the call, see :class:`srlearn.jvm.ResourceProfile`.
+            It cannot be combined with ``jvm_workers``. When the JVM runs out
+            of memory, ``fit`` and ``predict`` raise
+            :class:`srlearn.jvm.JVMOutOfMemoryError`.
+        timeout : float, optional (default: None)
+            Seconds each call to the jar may run before it is stopped and
+            ``subprocess.TimeoutExpired`` is raised. None waits indefinitely.
 
         Attributes
         ----------
@@ -427,6 +532,11 @@ class BoostedRDNRegressor(BaseBoostedRelationalModel):
             Return the boosted regression trees
         feature_importances_ : array, shape (n_features)
             Return the feature importances (based on how often each feature appears)
+        fit_stats_ : dict
+            Time and resources spent in each stage of the last ``fit``, see
+            :mod:`srlearn.stats`
+        predict_stats_ : dict
+            Time and resources spent in each stage of the last prediction
         """
 
         super().__init__(
@@ -437,9 +547,13 @@ class BoostedRDNRegressor(BaseBoostedRelationalModel):
             max_tree_depth=max_tree_depth,
             neg_pos_ratio=neg_pos_ratio,
             solver=solver,
+            inference=inference,
+            jvm_workers=jvm_workers,
+            jvm_options=jvm_options,
+            timeout=timeout,
         )
 
-    def fit(self, database):
+    def fit(self, database, progress=None):
         """Learn structure and parameters.
 
         Fit the structure and parameters of a Relational Dependency Network using a
@@ -450,6 +564,10 @@ class BoostedRDNRegressor(BaseBoostedRelationalModel):
         ----------
         database : :class:`srlearn.database.Database`
             Database containing examples and facts.
+        progress : callable or bool, optional
+            Called with a :class:`srlearn.progress.TreeProgress` for each tree
+            as soon as it is learned, or True for a tqdm progress bar. See
+            :mod:`srlearn.progress`.
 
         Returns
         -------
@@ -473,23 +591,23 @@ class BoostedRDNRegressor(BaseBoostedRelationalModel):
         .. [3] https://starling.utdallas.edu/software/boostsrl/
         """
 
-        self._check_params()
+        return self._fit(database, progress)
+
+    def _train_call(self, database):
+        """Write the background and data for learning, return the call to the jar."""
 
         # Write the background to file.
         self.background.write(
-            filename="train", location=self.file_system.files.TRAIN_DIR
+            filename="train",
+            location=self.file_system.files.TRAIN_DIR,
+            cache=self.file_system.cache,
         )
 
-        if isinstance(database, tuple):
-            _db = Database()
-            _db.pos = database.pos
-            _db.neg = database.neg
-            _db.facts = database.facts
-            database = _db
-
         # Write the data to files.
-        database.write(
-            filename="train", location=self.file_system.files.TRAIN_DIR
+        _as_database(database).write(
+            filename="train",
+            location=self.file_system.files.TRAIN_DIR,
+            cache=self.file_system.cache,
         )
 
         if self.solver == "BoostSRL":
@@ -497,85 +615,99 @@ class BoostedRDNRegressor(BaseBoostedRelationalModel):
         else:
             _jar = str(self.file_system.files.SRLBOOST_BACKEND)
 
-        _CALL = (
-            "java -jar "
-            + _jar
-            + " -reg -l -train "
-            + str(self.file_system.files.TRAIN_DIR)
-            + " -target "
-            + self.target
-            + " -trees "
-            + str(self.n_estimators)
-            + " -negPosRatio "
-            + str(self.neg_pos_ratio)
-            + " > "
-            + str(self.file_system.files.TRAIN_LOG)
+        _args = [
+            "-reg",
+            "-l",
+            "-train",
+            str(self.file_system.files.TRAIN_DIR),
+            "-target",
+            self.target,
+            "-trees",
+            str(self.n_estimators),
+            "-negPosRatio",
+            str(self.neg_pos_ratio),
+        ]
+
+        return _JarCall(
+            _jar,
+            _args,
+            str(self.file_system.files.TRAIN_LOG),
+            None,
+            [self.file_system.files.TRAIN_DIR],
         )
 
-        # Call the constructed command.
-        self._call_shell_command(_CALL)
-
-        # Read the trees from files.
-        _estimators = []
-        for _tree_number in range(self.n_estimators):
-            with open(
-                self.file_system.files.TREES_DIR.joinpath(
-                    "{0}Tree{1}.tree".format(self.target, _tree_number)
-                )
-            ) as _fh:
-                _estimators.append(_fh.read())
-
-        self._get_dotfiles()
-        self.estimators_ = _estimators
-
-        return self
+    def _run_python_inference(self, database):
+        """Score examples with :mod:`srlearn._inference` instead of the jar."""
+        _examples, _true = parse_examples(database.pos, self.target)
+        _pred = self._python_decision_function(_examples, database)
+        return _pred, np.array(_true, dtype=float)
 
-    def _run_inference(self, database) -> None:
-        """Run inference mode on the BoostSRL Jar files.
-
-        This is a helper method for ``self.predict`` and ``self.predict_proba``
-        """
-
-        self._check_initialized()
+    def _test_call(self, database):
+        """Write the background and data for inference, return the call to the jar."""
 
         # Write the background to file.
         self.background.write(
-            filename="test", location=self.file_system.files.TEST_DIR
+            filename="test",
+            location=self.file_system.files.TEST_DIR,
+            cache=self.file_system.cache,
         )
 
-        if isinstance(database, tuple):
-            _db = Database()
-            _db.pos = database.pos
-            _db.neg = database.neg
-            _db.facts = database.facts
-            database = _db
-
         # Write the data to files.
-        database.write(filename="test", location=self.file_system.files.TEST_DIR)
+        database.write(
+            filename="test",
+            location=self.file_system.files.TEST_DIR,
+            cache=self.file_system.cache,
+        )
 
         if self.solver == "BoostSRL":
             _jar = str(self.file_system.files.BOOSTSRL_BACKEND)
         else:
             _jar = str(self.file_system.files.SRLBOOST_BACKEND)
 
-        _CALL = (
-            "java -jar "
-            + _jar
-            + " -reg -i -test "
-            + str(self.file_system.files.TEST_DIR)
-            + " -model "
-            + str(self.file_system.files.MODELS_DIR)
-            + " -target "
-            + self.target
-            + " -trees "
-            + str(self.n_estimators)
-            + " -aucJarPath "
-            + str(self.file_system.files.AUC_JAR)
-            + " > "
-            + str(self.file_system.files.TEST_LOG)
+        _args = [
+            "-reg",
+            "-i",
+            "-test",
+            str(self.file_system.files.TEST_DIR),
+            "-model",
+            str(self.file_system.files.MODELS_DIR),
+            "-target",
+            self.target,
+            "-trees",
+            str(self.n_estimators),
+            "-aucJarPath",
+            str(self.file_system.files.AUC_JAR),
+        ]
+
+        return _JarCall(
+            _jar,
+            _args,
+            str(self.file_system.files.TEST_LOG),
+            None,
+            [self.file_system.files.TEST_DIR, self.file_system.files.MODELS_DIR],
         )
 
-        self._call_shell_command(_CALL)
+    def _read_results(self, matches):
+        """Read the results of inference with the jar.
+
+        Returns
+        -------
+        pred : ndarray
+            Predicted value for each example.
+        true : ndarray
+            True value for each example.
+        """
+
+        _results_db = self.file_system.files.TEST_DIR.joinpath(
+            "results_" + self.target + ".db"
+        )
+        _pred, _true = np.loadtxt(
+            _results_db,
+            delimiter="\t",
+            usecols=(1, 2),
+            unpack=True,
+        )
+        return _pred, _true
 
     def predict(self, database):
         """Use the learned model to predict values on new data.
@@ -591,20 +723,30 @@ class BoostedRDNRegressor(BaseBoostedRelationalModel):
             regression value predicted for each example.
         """
 
-        self._run_inference(database)
+        return self._predict_values(*self._run_inference(database))
 
-        # Collect the classifications.
-        _results_db = self.file_system.files.TEST_DIR.joinpath(
-            "results_" + self.target + ".db"
-        )
-        _pred, _true = np.loadtxt(
-            _results_db,
-            delimiter="\t",
-            usecols=(1, 2),
-            unpack=True,
-        )
+    async def predict_async(self, database):
+        """Like :meth:`predict`, without blocking the event loop.
+
+        Cancelling the task kills the JVM. Concurrent predictions with the
+        same estimator take turns running the jar, since they share its test
+        directory.
+
+        Parameters
+        ----------
+        database : :class:`srlearn.Database`
+            Database containing examples and facts.
+
+        Returns
+        -------
+        pred : ndarray
+            regression value predicted for each example.
+        """
+
+        return self._predict_values(*await self._run_inference_async(database))
 
-        self.true_ = _true
-        self.pred_ = _pred
+    def _predict_values(self, pred, true):
+        self.true_ = true
+        self.pred_ = pred
 
-        return _pred
+        return pred
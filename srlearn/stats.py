@@ -0,0 +1,156 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Time and resources spent in each stage of ``fit`` and ``predict``.
+
+After ``fit``, an estimator's ``fit_stats_`` is a flat dict, e.g.:
+
+.. code-block:: python
+
+    {
+        "write_seconds": 0.8,           # writing the background and data
+        "bytes_written": 31400000,      # not counting data linked from the cache
+        "jvm_startup_seconds": 0.4,     # until the jar's first output
+        "jar_seconds": 29.1,            # running the jar (including startup)
+        "child_user_seconds": 41.2,     # CPU time of the JVM
+        "child_system_seconds": 1.3,
+        "child_max_rss_bytes": 583000000,
+        "read_trees_seconds": 0.01,
+        "read_dotfiles_seconds": 0.01,
+        "bytes_read": 5800,
+        "total_seconds": 30.0,
+    }
+
+and ``predict_stats_`` is set by ``predict`` and ``predict_proba`` (with
+``read_results_seconds``, or ``inference_seconds`` when the trees are
+evaluated in Python). Keys are left out when they cannot be measured, e.g.
+the JVM's CPU time and memory with ``jvm_workers``.
+
+Hooks receive every dict, e.g. to send them to a metrics system:
+
+>>> from srlearn import stats
+>>> def log_stats(estimator, method, stats):
+...     print(method, stats["total_seconds"])
+>>> stats.add_hook(log_stats)          # doctest: +SKIP
+"""
+
+import contextlib
+import logging
+import os
+import stat
+import time
+
+__all__ = ["add_hook", "remove_hook"]
+
+_hooks = []
+
+
+def add_hook(hook):
+    """Call ``hook(estimator, method, stats)`` after every fit and prediction.
+
+    Parameters
+    ----------
+    hook : callable
+        Called with the estimator, ``"fit"`` or ``"predict"``, and the
+        ``fit_stats_`` or ``predict_stats_`` dict. Exceptions raised by a
+        hook are logged instead of failing the fit or prediction.
+    """
+    if hook not in _hooks:
+        _hooks.append(hook)
+
+
+def remove_hook(hook):
+    """Stop calling a hook added with :func:`add_hook`."""
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+def emit(estimator, method, stats):
+    """Pass stats to every hook."""
+    for _hook in list(_hooks):
+        try:
+            _hook(estimator, method, stats)
+        except Exception:
+            logging.exception("Error in srlearn stats hook %r", _hook)
+
+
+def file_size(*paths):
+    """Total bytes of the files which exist among ``paths``."""
+    _total = 0
+    for _path in paths:
+        try:
+            _total += os.path.getsize(_path)
+        except OSError:
+            pass
+    return _total
+
+
+def written_size(paths, created=()):
+    """Total bytes of the files among ``paths`` which were written for them.
+
+    Files which are hard linked elsewhere, such as data linked from a
+    :class:`srlearn.system_manager.DataCache` or the files of a Database, were
+    not written, unless they are links to one of the ``created`` files (such as
+    the files a cache stored for these ``paths``). Symbolic links are not
+    counted either.
+    """
+    _created = set()
+    for _path in created:
+        try:
+            _stat = os.stat(_path)
+        except OSError:
+            continue
+        _created.add((_stat.st_dev, _stat.st_ino))
+    _total = 0
+    for _path in paths:
+        try:
+            _stat = os.lstat(_path)
+        except OSError:
+            continue
+        if stat.S_ISLNK(_stat.st_mode):
+            continue
+        if _stat.st_nlink == 1 or (_stat.st_dev, _stat.st_ino) in _created:
+            _total += _stat.st_size
+    return _total
+
+
+class StageTimer:
+    """Collect the wall time of stages and other stats in a flat dict."""
+
+    def __init__(self):
+        self.stats = {}
+        self._started = time.perf_counter()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Add the time spent in the block to ``<name>_seconds``."""
+        _start = time.perf_counter()
+        try:
+            yield
+        finally:
+            _key = name + "_seconds"
+            self.stats[_key] = self.stats.get(_key, 0.0) + (
+                time.perf_counter() - _start
+            )
+
+    def add(self, key, value):
+        """Add a value to ``key``, e.g. bytes read in several stages."""
+        self.stats[key] = self.stats.get(key, 0) + value
+
+    def add_command(self, result):
+        """Stats of a :class:`srlearn._runner.CommandResult`."""
+        if result.first_output is not None:
+            self.stats["jvm_startup_seconds"] = result.first_output
+        if result.usage:
+            for _key, _name in (
+                ("user_time", "child_user_seconds"),
+                ("system_time", "child_system_seconds"),
+                ("max_rss", "child_max_rss_bytes"),
+            ):
+                if _key in result.usage:
+                    self.stats[_name] = result.usage[_key]
+
+    def finish(self):
+        """The stats, with the total wall time."""
+        self.stats["total_seconds"] = time.perf_counter() - self._started
+        return self.stats
@@ -2,14 +2,116 @@
 
 """Handler for file system operations on behalf of BoostSRL."""
 
+import atexit
+import bz2
+import collections.abc
+import gzip
+import hashlib
+import itertools
+import lzma
 import pathlib
 import shutil
 import os
+import stat
+import tempfile
+import threading
+
+__all__ = [
+    "reset",
+    "DataCache",
+    "FileSystem",
+    "compression",
+    "copy_file",
+    "get_scratch_root",
+    "link_file",
+    "open_file",
+    "remove_file",
+    "set_scratch_root",
+    "SharedLines",
+    "write_lines",
+]
+
+# Environment variable pointing to a directory for temporary files.
+SCRATCH_ROOT_VARIABLE = "SRLEARN_SCRATCH_ROOT"
+
+_scratch_root = None
+
+
+def set_scratch_root(root):
+    """Set the directory where each :class:`FileSystem` stores its files.
+
+    This takes precedence over the ``SRLEARN_SCRATCH_ROOT`` environment
+    variable. A fast local file system (such as ``/dev/shm`` or a local NVMe
+    drive) helps when many models are learned.
 
-__all__ = ["reset", "FileSystem"]
+    Parameters
+    ----------
+    root : str (or pathlike) or None
+        Directory that the ``bsrl_data`` directory is created in, or None to
+        restore the default.
+    """
+    global _scratch_root
+    _scratch_root = None if root is None else pathlib.Path(root)
+
+
+def get_scratch_root():
+    """Directory that the ``bsrl_data`` directory is created in.
 
+    In order of precedence: the value passed to :func:`set_scratch_root`, the
+    ``SRLEARN_SCRATCH_ROOT`` environment variable, or the directory where
+    srlearn is installed. If the installation directory is not writable, a
+    directory for the current user (``srlearn-<uid>``, only accessible to
+    them) in the temporary directory of the operating system is used instead.
 
-def reset(soft=False):
+    Returns
+    -------
+    root : pathlib.Path
+
+    Raises
+    ------
+    PermissionError
+        If the directory for the current user in the temporary directory
+        exists, but is not a directory owned by them and private to them.
+    """
+    if _scratch_root is not None:
+        return _scratch_root
+    if os.environ.get(SCRATCH_ROOT_VARIABLE):
+        return pathlib.Path(os.environ[SCRATCH_ROOT_VARIABLE])
+    _here = pathlib.Path(__file__).parent
+    if os.access(_here, os.W_OK):
+        return _here
+    return _user_temp_root()
+
+
+def _user_temp_root():
+    # The temporary directory is shared by all users on most systems, so the
+    # directory for this user is created private, and checked if it existed.
+    if not hasattr(os, "getuid"):
+        # The temporary directory is already per user on Windows.
+        _root = pathlib.Path(tempfile.gettempdir()).joinpath("srlearn")
+        _root.mkdir(exist_ok=True)
+        return _root
+    _uid = os.getuid()
+    _root = pathlib.Path(tempfile.gettempdir()).joinpath("srlearn-{0}".format(_uid))
+    try:
+        _root.mkdir(mode=0o700)
+    except FileExistsError:
+        pass
+    _stat = os.lstat(_root)
+    if (
+        not stat.S_ISDIR(_stat.st_mode)
+        or _stat.st_uid != _uid
+        or stat.S_IMODE(_stat.st_mode) & 0o077
+    ):
+        raise PermissionError(
+            "{0} is not a private directory owned by the current user. Remove "
+            "it, or choose another directory with set_scratch_root or the {1} "
+            "environment variable.".format(_root, SCRATCH_ROOT_VARIABLE)
+        )
+    return _root
+
+
+def reset(soft=False, root=None):
     """Reset the FileSystem
 
     In some circumstances, a :class:`FileSystem` object may not properly clean up
@@ -20,6 +122,8 @@ def reset(soft=False):
     ----------
     soft : bool (Default: False)
         A *soft reset* reports the contents without removing.
+    root : str (or pathlike), optional
+        Scratch root to reset, defaults to :func:`get_scratch_root`.
 
     Returns
     -------
@@ -30,8 +134,8 @@ def reset(soft=False):
     Notes
     -----
 
-    Since the FileSystem object reads and writes from a location alongside
-    the package, these files are also removed when the package is uninstalled.
+    By default the FileSystem object reads and writes from a location alongside
+    the package, so these files are also removed when the package is uninstalled.
     But uninstalling and reinstalling is overkill when a solution like this
     is available.
 
@@ -48,7 +152,7 @@ def reset(soft=False):
     .. code-block:: bash
 
         $ python -c "from srlearn import system_manager; print(system_manager.reset(soft=True))"
-        ['data0', 'data1']
+        ['data2v8xk1qd', 'datam0_3jz9f']
 
     2. Trigger conditional behavior. Here we report that the directory is empty.
 
@@ -63,15 +167,21 @@ def reset(soft=False):
     >>> system_manager.reset()   # doctest: +SKIP
     []
     """
-    _here = pathlib.Path(__file__).parent
-    _data = _here.joinpath(FileSystem.boostsrl_data_directory)
+    _root = get_scratch_root() if root is None else pathlib.Path(root)
+    _data = _root.joinpath(FileSystem.boostsrl_data_directory)
 
-    if not _data.exists():
-        return []
     if soft:
-        return os.listdir(_data)
-
-    shutil.rmtree(_data)
+        return os.listdir(_data) if _data.exists() else []
+
+    _directories = (
+        _data,
+        _root.joinpath(DataCache.cache_directory),
+        # Class data sharing archives, see srlearn.jvm
+        _root.joinpath("bsrl_cds"),
+    )
+    for _directory in _directories:
+        if _directory.exists():
+            shutil.rmtree(_directory)
     return []
 
 
@@ -96,6 +206,416 @@ class BoostSRLFiles:
         self.DOT_DIR = directory.joinpath("train/models/bRDNs/dotFiles")
 
 
+def _reflink(source, target):
+    """Copy-on-write clone of a file (Linux, on btrfs, XFS, and similar)."""
+    import fcntl
+
+    _FICLONE = 0x40049409
+    try:
+        with open(source, "rb") as _src, open(target, "wb") as _dst:
+            fcntl.ioctl(_dst.fileno(), _FICLONE, _src.fileno())
+    except OSError:
+        os.unlink(target)
+        raise
+
+
+def link_file(source, target):
+    """Make ``target`` refer to the contents of ``source`` without copying.
+
+    In order, this tries a hard link, a copy-on-write clone (reflink), and a
+    symbolic link; and copies the file if none of these are supported (for
+    example when ``source`` and ``target`` are on different file systems).
+    BoostSRL only reads its input files, so sharing them is safe. An existing
+    ``target`` is replaced.
+
+    Parameters
+    ----------
+    source : str (or pathlike)
+        File to link to.
+    target : str (or pathlike)
+        Location of the new file.
+
+    Returns
+    -------
+    method : str
+        "link", "reflink", "symlink", or "copy"
+    """
+    remove_file(target)
+    try:
+        os.link(source, target)
+        return "link"
+    except OSError:
+        pass
+    if hasattr(os, "uname") and os.uname().sysname == "Linux":
+        try:
+            _reflink(source, target)
+            return "reflink"
+        except OSError:
+            pass
+    try:
+        os.symlink(os.path.abspath(source), target)
+        return "symlink"
+    except OSError:
+        pass
+    shutil.copyfile(source, target)
+    return "copy"
+
+
+# File name extensions of the supported compression formats.
+_COMPRESSION = {".gz": "gzip", ".bz2": "bz2", ".xz": "xz", ".zst": "zstd"}
+
+
+def compression(path):
+    """Compression format of a file, from the extension of its name.
+
+    Returns
+    -------
+    format : str or None
+        "gzip", "bz2", "xz", "zstd", or None for uncompressed files.
+    """
+    return _COMPRESSION.get(os.path.splitext(str(path))[1].lower())
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as excep:
+        raise ImportError(
+            "zstandard needs to be available to read or write .zst files"
+        ) from excep
+    return zstandard
+
+
+def open_file(path, mode="r"):
+    """Open a file, compressing or decompressing it as a stream.
+
+    Files ending with ``.gz``, ``.bz2``, ``.xz``, or ``.zst`` (with the
+    optional ``zstandard`` package) are decompressed while they are read and
+    compressed while they are written. Other files are opened with
+    :func:`open`.
+
+    Parameters
+    ----------
+    path : str (or pathlike)
+        File to open.
+    mode : str (Default: "r")
+        "r", "w", "rb", or "wb". Text modes use UTF-8.
+    """
+    _format = compression(path)
+    _encoding = None if "b" in mode else "utf-8"
+    if _format is None:
+        return open(path, mode, encoding=_encoding)
+    if "b" not in mode:
+        mode += "t"
+    if _format == "gzip":
+        # Level 6 (the default of the gzip command) is several times faster
+        # to write than level 9, and files are barely larger.
+        return gzip.open(path, mode, compresslevel=6, encoding=_encoding)
+    if _format == "bz2":
+        return bz2.open(path, mode, encoding=_encoding)
+    if _format == "xz":
+        return lzma.open(path, mode, encoding=_encoding)
+    return _zstandard().open(path, mode, encoding=_encoding)
+
+
+def copy_file(source, target, size=1 << 20):
+    """Make ``target`` a copy of ``source``, converting its compression.
+
+    Each file is compressed according to its extension (see
+    :func:`open_file`). When both use the same compression, the file is
+    linked with :func:`link_file`. Otherwise it is decompressed and
+    compressed as a stream, ``size`` bytes at a time, so it is never held in
+    memory or written uncompressed first.
+
+    Parameters
+    ----------
+    source : str (or pathlike)
+        File to copy.
+    target : str (or pathlike)
+        Location of the copy. An existing file (or link) is replaced.
+    size : int (Default: 1 MB)
+        Number of bytes copied at a time.
+
+    Returns
+    -------
+    method : str
+        "link", "reflink", "symlink", or "copy" from :func:`link_file`, or
+        "stream" when the file was converted.
+    """
+    if compression(source) == compression(target):
+        if os.path.exists(target) and os.path.samefile(source, target):
+            # Replacing the target would remove the source.
+            return "link"
+        return link_file(source, target)
+    remove_file(target)
+    with open_file(source, "rb") as _src, open_file(target, "wb") as _dst:
+        shutil.copyfileobj(_src, _dst, size)
+    return "stream"
+
+
+def remove_file(target):
+    """Remove a file (or link) if it exists.
+
+    Files may be links to user data or to a :class:`DataCache`, so they are
+    removed before being written instead of being opened for writing.
+    """
+    try:
+        os.unlink(target)
+    except FileNotFoundError:
+        pass
+
+
+def _encoded_chunks(lines, size=16384):
+    """Encoded lines, joined into blocks of ``size`` lines.
+
+    Objects with a ``blocks()`` method, which yields lists of lines, are
+    joined one list at a time instead.
+    """
+    if hasattr(lines, "blocks"):
+        for _block in lines.blocks():
+            if _block:
+                yield ("\n".join(_block) + "\n").encode("utf-8")
+        return
+    _lines = iter(lines)
+    while True:
+        _block = list(itertools.islice(_lines, size))
+        if not _block:
+            return
+        yield ("\n".join(_block) + "\n").encode("utf-8")
+
+
+def write_lines(lines, target, size=16384):
+    """Write one line per string in ``lines`` to ``target``.
+
+    Lines are joined and written in blocks of ``size``, so ``lines`` may be
+    a generator which is consumed once, and at most one block is held in
+    memory at a time. The file is compressed when its name ends with one of
+    the extensions of :func:`open_file`.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        Lines, without line endings.
+    target : str (or pathlike)
+        File to write. An existing file (or link) is replaced.
+    size : int (Default: 16384)
+        Number of lines written at a time.
+    """
+    remove_file(target)
+    with open_file(target, "wb") as _fh:
+        for _chunk in _encoded_chunks(lines, size):
+            _fh.write(_chunk)
+
+
+class SharedLines:
+    """Lines which are written to a file once, and linked after that.
+
+    The first :meth:`write` writes the lines (through a :class:`DataCache`
+    when one is given). Later writes link that file with :func:`link_file`,
+    as long as it exists and has not changed, so any number of directories
+    share one copy. ``lines`` should not be changed after the first write;
+    a change in its length is detected, but not other changes.
+
+    Parameters
+    ----------
+    lines : iterable of str
+        Lines, without line endings.
+    """
+
+    def __init__(self, lines):
+        self.lines = lines
+        self._file = None
+
+    def __iter__(self):
+        return iter(self.lines)
+
+    def __repr__(self):
+        return "SharedLines({0!r})".format(self.lines)
+
+    def _signature(self, path):
+        _stat = os.stat(path)
+        _length = len(self.lines) if hasattr(self.lines, "__len__") else None
+        return (_stat.st_ino, _stat.st_size, _stat.st_mtime_ns, _length)
+
+    def path(self):
+        """The file the lines were last written to, or None if it has changed."""
+        if self._file is None:
+            return None
+        _path, _signature = self._file
+        try:
+            if self._signature(_path) == _signature:
+                return _path
+        except OSError:
+            pass
+        self._file = None
+        return None
+
+    def write(self, target, cache=None):
+        """Make ``target`` a file of the lines, linking an earlier copy if possible.
+
+        Parameters
+        ----------
+        target : str (or pathlike)
+            File to write. An existing file (or link) is replaced.
+        cache : :class:`DataCache`, optional
+            Store the lines in a cache and link them from there.
+        """
+        _source = self.path()
+        if _source is not None:
+            try:
+                link_file(_source, target)
+                return
+            except FileNotFoundError:
+                # Evicted from a cache since it was looked up.
+                pass
+        if cache is not None:
+            _source = cache.link(self.lines, target)
+        else:
+            write_lines(self.lines, target)
+            _source = pathlib.Path(target)
+        self._file = (_source, self._signature(_source))
+
+
+class DataCache:
+    """Content-addressed store for the files written for BoostSRL.
+
+    Each file is stored once under a name derived from a hash of its contents,
+    then hard linked (or copied, where links are not supported) into the
+    train and test directories which need it. Learning many models from the
+    same data, such as in a hyperparameter search, only writes the data once.
+
+    A file is evicted once no directory links to it any more (when its
+    last hard link is replaced, or its :class:`FileSystem` is deleted), so
+    the cache does not grow in long-running processes. Files created by a
+    cache are removed when the interpreter exits, and :func:`reset` removes
+    the whole cache.
+
+    Parameters
+    ----------
+    directory : str (or pathlike)
+        Where cached files are stored.
+    """
+
+    # Directory next to `bsrl_data` for cached files.
+    cache_directory = "bsrl_cache"
+
+    def __init__(self, directory):
+        self.directory = pathlib.Path(directory)
+        self._created = set()
+        # Files which were symbolic linked somewhere, so cannot be evicted.
+        self._pinned = set()
+        self._lock = threading.RLock()
+        atexit.register(self.clear)
+
+    def path(self, lines):
+        """Path to the cached file with one line per string in ``lines``.
+
+        The file is written if it is not already in the cache. A sequence
+        (such as a list) is hashed first, so it is only written when it is
+        missing. Anything else (generators, or objects which read from a
+        database each time they are iterated) is only iterated once, and is
+        hashed while it is written.
+        """
+        if not isinstance(lines, collections.abc.Sequence):
+            return self._store(lines)
+
+        _hash = hashlib.sha1()
+        for _chunk in _encoded_chunks(lines):
+            _hash.update(_chunk)
+        _path = self.directory.joinpath(_hash.hexdigest() + ".txt")
+        if not _path.exists():
+            _path = self._store(lines)
+        return _path
+
+    def _store(self, lines):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write to a unique name first, so a partially written file is
+        # never seen by another estimator or process.
+        _hash = hashlib.sha1()
+        _fd, _partial = tempfile.mkstemp(dir=self.directory, suffix=".part")
+        with os.fdopen(_fd, "wb") as _fh:
+            for _chunk in _encoded_chunks(lines):
+                _hash.update(_chunk)
+                _fh.write(_chunk)
+        _path = self.directory.joinpath(_hash.hexdigest() + ".txt")
+        if _path.exists():
+            # Already stored: keep the file other directories are linked to.
+            os.remove(_partial)
+        else:
+            os.replace(_partial, _path)
+            self._created.add(_path)
+        return _path
+
+    def link(self, lines, target):
+        """Make ``target`` a file with one line per string in ``lines``.
+
+        Returns
+        -------
+        source : pathlib.Path
+            The cached file.
+        """
+        with self._lock:
+            _source = self.path(lines)
+            if not _source.exists() and isinstance(lines, collections.abc.Sequence):
+                # Removed by another process since it was looked up: write it again.
+                _source = self.path(lines)
+            if link_file(_source, target) == "symlink":
+                self._pinned.add(_source)
+            self.evict()
+        return _source
+
+    def evict(self):
+        """Remove the files this cache created which are not linked anywhere.
+
+        A file with no other hard link than the one in the cache is not used
+        by any directory: its links were replaced, or removed with their
+        :class:`FileSystem`.
+
+        Returns
+        -------
+        n_removed : int
+        """
+        _removed = 0
+        with self._lock:
+            for _path in list(self._created - self._pinned):
+                try:
+                    if os.stat(_path).st_nlink > 1:
+                        continue
+                    _path.unlink()
+                    _removed += 1
+                except OSError:
+                    pass
+                self._created.discard(_path)
+        return _removed
+
+    def stored(self):
+        """Set of the files this cache has written, and not removed yet."""
+        with self._lock:
+            return set(self._created)
+
+    def clear(self):
+        """Remove the files this cache created."""
+        with self._lock:
+            for _path in self._created:
+                try:
+                    _path.unlink()
+                except OSError:
+                    pass
+            self._created.clear()
+            self._pinned.clear()
+
+
+_caches = {}
+
+
+def _get_cache(root):
+    """Shared :class:`DataCache` for a scratch root."""
+    _directory = pathlib.Path(root).joinpath(DataCache.cache_directory)
+    if _directory not in _caches:
+        _caches[_directory] = DataCache(_directory)
+    return _caches[_directory]
+
+
 class FileSystem:
     """BoostSRL File System
 
@@ -126,55 +646,65 @@ class FileSystem:
 
     Another option (which may be more suited to parallel tree learning) would be to
     store data in a single location, but write the log files and models to separate
-    locations.
+    locations. The ``cache`` does this for the data: identical files are stored once
+    and linked into each directory.
 
     Attributes
     ----------
     files : :class:`enum.Enum`
         Enum providing key,value pairs for a BoostSRL database
+    cache : :class:`DataCache`
+        Data files shared by every FileSystem with the same scratch root
     """
 
     # Prefix is the main directory that all databases will reside in.
     # In case of failure, this directory should be safe to delete.
     boostsrl_data_directory = "bsrl_data"
 
-    def __init__(self):
+    def __init__(self, root=None):
         """Initialize a BoostSRL File System.
 
         This will create directories that are cleaned up when the instance
         is de-allocated.
+
+        Parameters
+        ----------
+        root : str (or pathlike), optional
+            Directory to create the ``bsrl_data`` directory in. Defaults to
+            :func:`get_scratch_root`.
         """
 
         _here = pathlib.Path(__file__).parent
+        _root = get_scratch_root() if root is None else pathlib.Path(root)
 
         # Allocate a location where data can safely be stored.
-        _data = _here.joinpath(FileSystem.boostsrl_data_directory)
-        _allotment_number = self._allocate_space(_data)
-        _directory = _data.joinpath("data" + str(_allotment_number))
+        _directory = self._allocate_space(
+            _root.joinpath(FileSystem.boostsrl_data_directory)
+        )
 
         self.files = BoostSRLFiles(_directory, _here)
+        self.cache = _get_cache(_root)
         self.files.TRAIN_DIR.mkdir()
         self.files.TEST_DIR.mkdir()
 
     def __del__(self):
         """Clean up the file system on object de-allocation."""
-        shutil.rmtree(self.files.DIRECTORY)
+        shutil.rmtree(self.files.DIRECTORY, ignore_errors=True)
+        # Drop the cached data which only this directory was using.
+        self.cache.evict()
 
     @staticmethod
-    def _allocate_space(current_directory) -> int:
-        """Attempt to allocate directory `data{n}`, increment until success.
+    def _allocate_space(current_directory) -> pathlib.Path:
+        """Create a new uniquely named directory `data{random}`.
+
+        Names are chosen and created atomically by :func:`tempfile.mkdtemp`,
+        so this is safe (and does not slow down) with many estimators in one
+        or more processes.
 
         Returns
         -------
-        _postfix : int
-            The number corresponding to the allocated directory.
+        _directory : pathlib.Path
+            The allocated directory.
         """
-        _postfix = 0
-        while True:
-            _attempt = current_directory.joinpath("data" + str(_postfix))
-            if not _attempt.exists():
-                _attempt.mkdir(parents=True)
-                break
-            else:
-                _postfix += 1
-        return _postfix
+        current_directory.mkdir(parents=True, exist_ok=True)
+        return pathlib.Path(tempfile.mkdtemp(prefix="data", dir=current_directory))
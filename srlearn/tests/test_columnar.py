@@ -0,0 +1,129 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Tests for srlearn.columnar
+"""
+
+import pathlib
+import pytest
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+from srlearn.columnar import ColumnarFacts
+from srlearn.rdn import BoostedRDNClassifier
+from srlearn.background import Background
+from srlearn.database import Database
+from srlearn.datasets import load_toy_cancer
+
+
+def test_columnar_round_trip():
+    _facts = [
+        "friends(alice,bob).",
+        "smokes(alice).",
+        "friends(bob,alice).",
+        "sunny.",
+        'says(alice,"a, b").',
+    ]
+    _columnar = ColumnarFacts(_facts)
+    assert len(_columnar) == 5
+    assert _columnar.tables[("friends", 2)].dtype == np.int32
+    assert list(_columnar) == _facts
+    assert list(ColumnarFacts(list(_columnar))) == _facts
+
+
+def test_columnar_keeps_order_and_text():
+    _lines = ["f(a).", "g(b).", "f(c).", "% note", 'h(x ,  "A b").']
+    _columnar = ColumnarFacts(_lines)
+    assert list(_columnar) == _lines
+    assert _columnar.order[("f", 1)].tolist() == [0, 2]
+    assert _columnar.other == {3: "% note"}
+    assert _columnar.text == {4: 'h(x ,  "A b").'}
+
+
+def test_columnar_keeps_other_lines():
+    _lines = ["// comment", "f(a, b)", "", "not a fact", "f(c, d)."]
+    _columnar = ColumnarFacts(_lines)
+    assert list(_columnar) == _lines
+    assert _columnar.other == {0: "// comment", 2: "", 3: "not a fact"}
+    assert _columnar.separators[("f", 2)] == ", "
+    assert _columnar.text == {1: "f(a, b)"}
+
+
+def test_columnar_deduplicate_keeps_order():
+    _columnar = ColumnarFacts(["f(a).", "% x", "g.", "f(b).", "f(a).", "g.", " % x"])
+    assert _columnar.deduplicate() == 3
+    assert list(_columnar) == ["f(a).", "% x", "g.", "f(b)."]
+
+
+def test_columnar_file_keeps_lines(tmp_path):
+    _file = tmp_path.joinpath("facts.txt")
+    _file.write_text("f(a).\r\n\n% note\nf(b, c).\n")
+    assert list(ColumnarFacts(_file)) == ["f(a).", "", "% note", "f(b, c)."]
+
+
+def test_columnar_database_write(tmp_path):
+    train, _ = load_toy_cancer()
+    _db = Database()
+    _db.pos = train.pos
+    _db.neg = train.neg
+    _db.facts = ColumnarFacts(train.facts)
+    _db.write(filename="train", location=tmp_path)
+    train.write(filename="text", location=tmp_path)
+
+    assert (
+        tmp_path.joinpath("train_facts.txt").read_text()
+        == tmp_path.joinpath("text_facts.txt").read_text()
+    )
+
+
+def test_columnar_facts_for_inference():
+    train, test = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        inference="numpy",
+    )
+    _dn.fit(train)
+    _expected = _dn.predict_proba(test)
+
+    test.facts = ColumnarFacts(test.facts)
+    _symbols = list(test.facts.symbols.symbols)
+    assert_array_almost_equal(_dn.predict_proba(test), _expected)
+
+    # Constants of examples which are not in the facts are not interned.
+    test.pos = test.pos + ["cancer(newperson)."]
+    _dn.predict_proba(test)
+    assert test.facts.symbols.symbols == _symbols
+
+
+def test_columnar_encode_does_not_intern():
+    _columnar = ColumnarFacts(["p(a).", "q(a,b)."])
+    _encoded = _columnar.encode([("a", "c"), ("d", "c")])
+    assert len(_columnar.symbols) == 2
+    assert _encoded[0, 0] == _columnar.symbols.get("a")
+    assert _encoded[0, 1] == _encoded[1, 1]
+    assert len(set(_encoded.ravel())) == 3
+    assert _encoded.min() >= 0
+
+
+def test_columnar_from_file(tmp_path):
+    _path = pathlib.Path(tmp_path).joinpath("facts.txt")
+    _path.write_text("p(a).\np(b).\nq(a,b).\n")
+    _columnar = ColumnarFacts(_path)
+    assert _columnar.table("p", 1).shape == (2, 1)
+    assert _columnar.table("r", 3).shape == (0, 3)
+    with pytest.raises(ValueError):
+        _columnar.encode([("a",), ("a", "b")])
+
+
+def test_columnar_save_and_load(tmp_path):
+    _lines = ["friends(alice,bob).", "x y", "sunny.", "smokes( alice )."]
+    _columnar = ColumnarFacts(_lines)
+    _columnar.save(tmp_path)
+    _loaded = ColumnarFacts.load(tmp_path)
+    assert isinstance(_loaded.tables[("friends", 2)], np.memmap)
+    assert isinstance(_loaded.order[("friends", 2)], np.memmap)
+    assert len(_loaded.symbols) == 2
+    assert list(_loaded) == _lines
+    assert _loaded.symbols.intern("carol") == 2
+    _loaded = ColumnarFacts.load(tmp_path, mmap_mode=None)
+    assert not isinstance(_loaded.tables[("friends", 2)], np.memmap)
@@ -5,6 +5,7 @@ Tests for srlearn.database.Database
 """
 
 import pathlib
+import pytest
 from srlearn.database import Database
 
 
@@ -153,3 +154,609 @@ def test_write_to_location_2(tmpdir):
     assert tmpdir.join("train_pos.txt").read() == "a(b).\n"
     assert tmpdir.join("train_neg.txt").read() == "a(c).\n"
     assert tmpdir.join("train_facts.txt").read() == "d(b,c).\n"
+
+
+def test_lazy_write_links_files(tmpdir):
+    """Lazy-loaded files are linked, and later writes leave the sources alone."""
+    _source = tmpdir.mkdir("source")
+    _source.join("pos.pl").write("a(b).\n")
+    _source.join("neg.pl").write("a(c).\n")
+    _source.join("facts.pl").write("d(b,c).\n")
+    _out = pathlib.Path(tmpdir.mkdir("out"))
+
+    _db = Database.from_files(
+        pos=str(_source.join("pos.pl")),
+        neg=str(_source.join("neg.pl")),
+        facts=str(_source.join("facts.pl")),
+    )
+    _db.write(filename="train", location=_out)
+    assert _out.joinpath("train_facts.txt").samefile(str(_source.join("facts.pl")))
+
+    _db.facts = ["d(c,b)."]
+    _db.write(filename="train", location=_out)
+    assert _out.joinpath("train_facts.txt").read_text() == "d(c,b).\n"
+    assert _source.join("facts.pl").read() == "d(b,c).\n"
+
+
+def test_write_generators(tmpdir):
+    """Generators and open files are streamed to disk, with or without a cache."""
+    _source = tmpdir.join("facts.pl")
+    _source.write("d(b,c).\nd(c,b).\n")
+    _out = pathlib.Path(tmpdir.mkdir("out"))
+
+    _db = Database()
+    _db.pos = ("a({0}).".format(i) for i in range(50000))
+    _db.neg = iter(["a(x)."])
+    with open(str(_source)) as _fh:
+        _db.facts = _fh
+        _db.write(filename="train", location=_out)
+
+    _pos = _out.joinpath("train_pos.txt").read_text().splitlines()
+    assert len(_pos) == 50000
+    assert _pos[-1] == "a(49999)."
+    assert _out.joinpath("train_neg.txt").read_text() == "a(x).\n"
+    assert _out.joinpath("train_facts.txt").read_text() == "d(b,c).\nd(c,b).\n"
+
+
+def test_write_generators_with_cache(tmpdir):
+    from srlearn.system_manager import DataCache
+
+    _cache = DataCache(pathlib.Path(tmpdir.mkdir("cache")))
+    _out = pathlib.Path(tmpdir.mkdir("out"))
+    _db = Database()
+    _db.pos = ["a(1).", "a(2)."]
+    _db.neg = (_line for _line in ["a(1).", "a(2)."])
+    _db.facts = iter([])
+    _db.write(filename="train", location=_out, cache=_cache)
+
+    assert _out.joinpath("train_pos.txt").samefile(_out.joinpath("train_neg.txt"))
+    assert _out.joinpath("train_facts.txt").read_text() == ""
+    _cache.clear()
+
+
+def _toy_cancer_sqlite(path):
+    import sqlite3
+    from srlearn.datasets import load_toy_cancer
+    from srlearn.parser import parse_terms
+
+    train, _ = load_toy_cancer()
+    _conn = sqlite3.connect(str(path))
+    for _table, _lines in (("pos", train.pos), ("neg", train.neg)):
+        _conn.execute("CREATE TABLE {0} (person TEXT)".format(_table))
+        _conn.executemany(
+            "INSERT INTO {0} VALUES (?)".format(_table),
+            [parse_terms(_line)[1] for _line in _lines],
+        )
+    _conn.execute("CREATE TABLE friends (a TEXT, b TEXT)")
+    _conn.execute("CREATE TABLE smokes (a TEXT)")
+    for _line in train.facts:
+        _pred, _args = parse_terms(_line)
+        _conn.execute(
+            "INSERT INTO {0} VALUES ({1})".format(_pred, ",".join("?" * len(_args))),
+            _args,
+        )
+    _conn.execute("INSERT INTO smokes VALUES (NULL)")
+    _conn.commit()
+    _conn.close()
+    return train
+
+
+def test_from_sqlite(tmpdir):
+    _path = tmpdir.join("toy_cancer.db")
+    train = _toy_cancer_sqlite(_path)
+
+    _db = Database.from_sqlite(
+        str(_path),
+        facts={
+            "friends": "friends",
+            "smokes": "smokes",
+            "unused": "SELECT a, b FROM friends",
+        },
+        pos={"cancer": "pos"},
+        neg={"cancer": "SELECT person FROM neg"},
+        modes=train.modes,
+        batch_size=2,
+    )
+    assert sorted(_db.pos) == sorted(train.pos)
+    assert sorted(_db.neg) == sorted(train.neg)
+    assert sorted(_db.facts) == sorted(_f.replace(" ", "") for _f in train.facts)
+    assert _db.modes == train.modes
+
+    _out = pathlib.Path(tmpdir.mkdir("out"))
+    _db.write(filename="train", location=_out)
+    assert len(_out.joinpath("train_facts.txt").read_text().splitlines()) == len(
+        train.facts
+    )
+
+
+def test_from_sqlite_bad_batch_size(tmpdir):
+    with pytest.raises(ValueError):
+        Database.from_sqlite(str(tmpdir.join("x.db")), batch_size=0)
+
+
+def test_from_sqlite_normalizes_values(tmpdir):
+    import sqlite3
+
+    _path = str(tmpdir.join("cities.db"))
+    _conn = sqlite3.connect(_path)
+    _conn.execute("CREATE TABLE lives (person TEXT, city TEXT, years REAL)")
+    _conn.executemany(
+        "INSERT INTO lives VALUES (?, ?, ?)",
+        [("Alice", "New York, NY", 2.5), ("bob", "o'hare (ord)", -1)],
+    )
+    _conn.commit()
+    _conn.close()
+    _db = Database.from_sqlite(_path, facts={"lives": "lives"})
+    assert list(_db.facts) == [
+        "lives(c_Alice,c_New_York_NY,2.5).",
+        "lives(bob,o_hare_ord,-1.0).",
+    ]
+
+
+def test_from_sqlite_missing_file(tmpdir):
+    _path = tmpdir.join("mistyped.db")
+    _db = Database.from_sqlite(str(_path), facts={"friends": "friends"})
+    with pytest.raises(FileNotFoundError):
+        list(_db.facts)
+    assert not _path.exists()
+
+
+def test_from_sqlite_is_read_only(tmpdir):
+    import sqlite3
+
+    _path = tmpdir.join("toy_cancer.db")
+    _toy_cancer_sqlite(_path)
+    _db = Database.from_sqlite(
+        str(_path), facts={"friends": "DELETE FROM friends RETURNING a, b"}
+    )
+    with pytest.raises(sqlite3.OperationalError):
+        list(_db.facts)
+
+
+def test_fit_from_sqlite(tmpdir):
+    from srlearn.rdn import BoostedRDNClassifier
+    from srlearn.background import Background
+
+    _path = tmpdir.join("toy_cancer.db")
+    train = _toy_cancer_sqlite(_path)
+    _db = Database.from_sqlite(
+        str(_path),
+        facts={"friends": "friends", "smokes": "smokes"},
+        pos={"cancer": "pos"},
+        neg={"cancer": "neg"},
+    )
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        n_estimators=2,
+    )
+    _dn.fit(_db)
+    assert len(_dn.estimators_) == 2
+
+
+def test_fit_async_from_sqlite(tmpdir):
+    import asyncio
+    from srlearn.rdn import BoostedRDNClassifier
+    from srlearn.background import Background
+
+    _path = tmpdir.join("toy_cancer.db")
+    train = _toy_cancer_sqlite(_path)
+    _tables = {"facts": {"friends": "friends", "smokes": "smokes"}}
+    _train = Database.from_sqlite(
+        str(_path), pos={"cancer": "pos"}, neg={"cancer": "neg"}, **_tables
+    )
+    _test = Database.from_sqlite(str(_path), pos={"cancer": "pos"}, **_tables)
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        n_estimators=2,
+    )
+
+    async def _fit_predict():
+        await _dn.fit_async(_train)
+        return await _dn.predict_proba_async(_test)
+
+    assert len(asyncio.run(_fit_predict())) == len(train.pos)
+
+
+def test_from_arrays():
+    import numpy as np
+    _db = Database.from_arrays(
+        facts={
+            "friends": (np.array(["a", "b"]), np.array(["b", "c"])),
+            "age": np.array([[1, 30], [2, 40]]),
+        },
+        pos={"smokes": np.array(["a"])},
+        regression={"medv": (np.array([100, 101]), np.array([33.2, 27.5]))},
+    )
+    assert list(_db.facts) == [
+        "friends(a,b).",
+        "friends(b,c).",
+        "age(1,30).",
+        "age(2,40).",
+    ]
+    assert list(_db.pos) == [
+        "smokes(a).",
+        "regressionExample(medv(100),33.2).",
+        "regressionExample(medv(101),27.5).",
+    ]
+    assert list(_db.neg) == []
+
+    with pytest.raises(ValueError):
+        Database.from_arrays(facts={"f": (np.arange(2), np.arange(3))})
+    with pytest.raises(ValueError):
+        Database.from_arrays(regression={"medv": np.arange(3)})
+
+
+def test_from_frame(tmpdir):
+    pd = pytest.importorskip("pandas")
+    _frame = pd.DataFrame(
+        {"age": [1, 2, 2], "tax": [3, 4, 5], "medv": [33.2, 27.5, 18.9]},
+        index=[100, 101, 10],
+    )
+    _db = Database.from_frame(_frame, "medv", facts={"age": "age"}, regression=True)
+    _out = pathlib.Path(tmpdir)
+    _db.write(filename="train", location=_out)
+    assert _out.joinpath("train_facts.txt").read_text().splitlines() == [
+        "age(id100,1).",
+        "age(id101,2).",
+        "age(id10,2).",
+    ]
+    assert _out.joinpath("train_pos.txt").read_text().splitlines()[0] == (
+        "regressionExample(medv(id100),33.2)."
+    )
+    assert _out.joinpath("train_neg.txt").read_text() == ""
+
+    _frame = pd.DataFrame(
+        {"person": ["a", "b"], "smokes": [1, 0], "cancer": [True, False]}
+    )
+    _db = Database.from_frame(_frame, "cancer", id_column="person", id_prefix="")
+    assert list(_db.pos) == ["cancer(a)."]
+    assert list(_db.neg) == ["cancer(b)."]
+    assert list(_db.facts) == ["smokes(a,1).", "smokes(b,0)."]
+
+
+def test_from_arrays_and_frame_normalize_values():
+    import numpy as np
+
+    _db = Database.from_arrays(
+        facts={"lives": (np.array(["Alice", "bob"]), np.array(["New York, NY", "x"]))},
+        pos={"rich": np.array([True])},
+    )
+    assert list(_db.facts) == ["lives(c_Alice,c_New_York_NY).", "lives(bob,x)."]
+    assert list(_db.pos) == ["rich(true)."]
+
+    pd = pytest.importorskip("pandas")
+    _frame = pd.DataFrame(
+        {"city": ["New York, NY", "boston"], "rich": [True, False]},
+        index=["Alice", "O'Hara"],
+    )
+    _db = Database.from_frame(_frame, "rich", id_prefix="")
+    assert list(_db.facts) == ["city(c_Alice,c_New_York_NY).", "city(c_O_Hara,boston)."]
+    assert list(_db.pos) == ["rich(c_Alice)."]
+    _db = Database.from_frame(_frame, "rich", facts=[])
+    assert list(_db.neg) == ["rich(idO_Hara)."]
+
+
+_EDGES = "src,dst,w\na,b,1.50\nb,,2\nc,d,007\n"
+
+
+@pytest.mark.parametrize("engine", ["csv", "pyarrow"])
+def test_from_table_files_csv(tmpdir, engine):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    _path = tmpdir.join("edges.csv")
+    _path.write(_EDGES)
+
+    _db = Database.from_table_files(
+        facts={"f": str(_path), "g": (str(_path), ["dst", "src"])},
+        pos={"p": (str(_path), ["src"])},
+        engine=engine,
+        batch_size=1,
+    )
+    assert list(_db.facts) == ["f(a,b,1.50).", "f(c,d,007).", "g(b,a).", "g(d,c)."]
+    assert list(_db.pos) == ["p(a).", "p(b).", "p(c)."]
+    assert list(_db.neg) == []
+
+    _db = Database.from_table_files(facts={"f": (str(_path), ["x"])}, engine=engine)
+    with pytest.raises(ValueError):
+        list(_db.facts)
+
+
+@pytest.mark.parametrize("engine", ["csv", "pyarrow"])
+def test_from_table_files_normalizes_values(tmpdir, engine):
+    if engine == "pyarrow":
+        pytest.importorskip("pyarrow")
+    _path = tmpdir.join("lives.csv")
+    _path.write('person,city,years\nAlice,"New York, NY",-2.5\nbob,boston,3\n')
+    _db = Database.from_table_files(facts={"lives": str(_path)}, engine=engine)
+    assert list(_db.facts) == [
+        "lives(c_Alice,c_New_York_NY,-2.5).",
+        "lives(bob,boston,3).",
+    ]
+
+
+def test_from_table_files_parquet(tmpdir):
+    pa = pytest.importorskip("pyarrow")
+    import pyarrow.feather
+    import pyarrow.parquet
+
+    _table = pa.table({"src": ["a", "b", None], "dst": ["b", "c", "d"]})
+    pyarrow.parquet.write_table(_table, str(tmpdir.join("edges.parquet")))
+    pyarrow.feather.write_feather(_table, str(tmpdir.join("edges.feather")))
+
+    _db = Database.from_table_files(
+        facts={
+            "f": str(tmpdir.join("edges.parquet")),
+            "g": (str(tmpdir.join("edges.feather")), ["dst"]),
+        }
+    )
+    assert list(_db.facts) == ["f(a,b).", "f(b,c).", "g(b).", "g(c).", "g(d)."]
+
+    _table = pa.table({"src": ["Alice", None], "n": [1.5, 2.0]})
+    pyarrow.feather.write_feather(_table, str(tmpdir.join("people.feather")))
+    _db = Database.from_table_files(facts={"f": str(tmpdir.join("people.feather"))})
+    assert list(_db.facts) == ["f(c_Alice,1.5)."]
+
+
+def test_from_table_files_bad_parameters():
+    with pytest.raises(ValueError):
+        Database.from_table_files(engine="pandas")
+    with pytest.raises(ValueError):
+        Database.from_table_files(batch_size=0)
+
+
+_NTRIPLES = """\
+# comment
+<http://ex.org/Alice> <http://ex.org/knows> <http://ex.org/bob> .
+<http://ex.org/bob> <http://ex.org/Knows> <http://ex.org/carol-1> .
+<http://ex.org/bob> <http://ex.org/age> "42"^^<http://www.w3.org/2001/XMLSchema#int> .
+<http://ex.org/bob> <http://ex.org/name> "Bob Smith"@en .
+_:b0 <http://ex.org/knows> <http://ex.org/bob> .
+"""
+
+
+def test_from_triples_ntriples(tmpdir):
+    _path = tmpdir.join("graph.nt")
+    _path.write(_NTRIPLES)
+
+    _db = Database.from_triples(str(_path), modes=["knows(+person,-person)."])
+    assert list(_db.facts) == [
+        "knows(c_Alice,bob).",
+        "knows(bob,carol_1).",
+        "knows(b0,bob).",
+    ]
+    assert _db.modes == ["knows(+person,-person)."]
+
+    _all = list(Database.from_triples(str(_path)).facts)
+    assert "age(bob,42)." in _all
+    assert "name(bob,c_Bob_Smith)." in _all
+
+
+def test_from_triples_tsv(tmpdir):
+    _path = tmpdir.join("graph.tsv")
+    _path.write("alice\tfriends\tbob\nbad line\nbob\tsmokes\tyes\n")
+    _db = Database.from_triples(str(_path), modes=["mode: friends(+p,-p)."])
+    assert list(_db.facts) == ["friends(alice,bob)."]
+
+    with pytest.raises(ValueError):
+        Database.from_triples(str(_path), file_format="rdf")
+
+
+def test_deduplicate(tmpdir):
+    from srlearn.columnar import ColumnarFacts
+
+    _db = Database()
+    _db.pos = ["a(1).", "a(1)."]
+    _db.facts = ["f(a,b).", "f(a,c).", "f(a,b).", "g."]
+    _db.deduplicate()
+    assert _db.facts == ["f(a,b).", "f(a,c).", "g."]
+    assert _db.pos == ["a(1).", "a(1)."]
+    _db.deduplicate(examples=True)
+    assert _db.pos == ["a(1)."]
+
+    _db.facts = ColumnarFacts(["f(a,b).", "g.", "f(a,c).", "f(a,b).", "g."])
+    _db.deduplicate()
+    assert list(_db.facts) == ["f(a,b).", "g.", "f(a,c)."]
+
+    _path = tmpdir.join("facts.pl")
+    _path.write("f(a,b).\nf(a,c).\nf(a,b).\n")
+    _db.facts = str(_path)
+    _db.deduplicate()
+    _out = pathlib.Path(tmpdir.mkdir("out"))
+    _db.write(filename="train", location=_out)
+    assert _out.joinpath("train_facts.txt").read_text() == "f(a,b).\nf(a,c).\n"
+
+    _path = tmpdir.join("padded.pl")
+    _path.write("f(a,b).\n  f(a,b).  \r\n\tf(a,c).\nf(a,c).\t\n")
+    _db.facts = str(_path)
+    _db.deduplicate()
+    _db.write(filename="padded", location=_out)
+    assert _out.joinpath("padded_facts.txt").read_text() == "f(a,b).\nf(a,c).\n"
+
+
+def test_describe():
+    from srlearn.columnar import ColumnarFacts
+    from srlearn.datasets import load_toy_cancer
+
+    train, _ = load_toy_cancer()
+    _stats = train.describe()
+    assert set(_stats) == {"friends/2", "smokes/1"}
+    assert _stats["friends/2"]["facts"] == sum(
+        _f.startswith("friends") for _f in train.facts
+    )
+    assert _stats["smokes/1"]["fan_out"] == 1.0
+
+    _db = Database()
+    _db.facts = ColumnarFacts(train.facts)
+    assert _db.describe() == _stats
+
+
+def test_prune():
+    from srlearn.background import Background
+
+    _db = Database()
+    _db.pos = ["cancer(a)."]
+    _db.neg = ["cancer(z)."]
+    _db.facts = [
+        "friends(a,b).",
+        "friends(b,c).",
+        "friends(c,d).",
+        "friends(x,y).",
+        "smokes(c).",
+        "smokes(y).",
+        "owns(a,car).",
+    ]
+    _modes = ["cancer(+P).", "friends(+P,-P).", "smokes(+P)."]
+
+    assert list(_db.prune(_modes, "cancer", max_length=1).facts) == ["friends(a,b)."]
+    assert list(_db.prune(_modes, "cancer", max_length=3).facts) == [
+        "friends(a,b).",
+        "friends(b,c).",
+        "friends(c,d).",
+        "smokes(c).",
+    ]
+    _pruned = _db.prune(Background(modes=_modes), "cancer")
+    assert len(_pruned.facts) == 4
+    assert _pruned.pos == _db.pos
+
+    with pytest.raises(ValueError):
+        _db.prune(_modes, "cancer")
+
+
+def test_prune_learns_the_same_trees():
+    from srlearn.background import Background
+    from srlearn.datasets import load_toy_cancer
+    from srlearn.rdn import BoostedRDNClassifier
+
+    train, _ = load_toy_cancer()
+    _noise = Database()
+    _noise.pos = train.pos
+    _noise.neg = train.neg
+    _noise.facts = train.facts + [
+        "friends(p{0},p{1}).".format(i, i + 1) for i in range(200)
+    ] + ["smokes(p{0}).".format(i) for i in range(0, 200, 3)]
+    _bk = Background(modes=train.modes)
+
+    _pruned = _noise.prune(_bk, "cancer")
+    assert len(_pruned.facts) == len(train.facts)
+
+    _estimators = []
+    for _db in (train, _pruned):
+        _dn = BoostedRDNClassifier(
+            background=_bk, target="cancer", solver="SRLBoost", n_estimators=5
+        )
+        _dn.fit(_db)
+        _estimators.append(_dn.estimators_)
+    assert _estimators[0] == _estimators[1]
+
+
+def test_sample_negatives():
+    _db = Database()
+    _db.pos = ["advisedby(a,b).", "advisedby(b,c)."]
+    _db.facts = ["publication(t1,a).", "publication(t1,b).", "publication(t2,c)."]
+    _modes = ["advisedby(+P,+P).", "publication(+T,-P)."]
+
+    _stats = _db.sample_negatives(_modes, "advisedby", ratio=2, random_state=1)
+    _neg = list(_db.neg)
+    assert len(_neg) == 4
+    assert len(set(_neg)) == 4
+    assert not set(_neg) & set(_db.pos)
+    assert _stats["closed_world"] == 3 * 3 - 2
+    assert _stats["bytes_written"] == sum(len(_line) + 1 for _line in _neg)
+    assert _stats["bytes_saved"] > 0
+
+    _db.sample_negatives(_modes, "advisedby", ratio=2, random_state=1)
+    assert list(_db.neg) == _neg
+
+    _stats = _db.sample_negatives(_modes, "advisedby", ratio=10)
+    assert _stats["negatives"] == 7
+    assert _stats["bytes_saved"] == 0
+
+    with pytest.raises(ValueError):
+        _db.sample_negatives(_modes, "advisedby", ratio=0)
+    with pytest.raises(ValueError):
+        _db.sample_negatives(_modes[1:], "advisedby")
+
+    # Constants which only appear in the examples are used too.
+    _db.pos = ["advisedby(a,d)."]
+    _db.sample_negatives(_modes, "advisedby", ratio=20)
+    assert "advisedby(d,a)." in list(_db.neg)
+
+
+def test_compressed_files(tmp_path):
+    from srlearn.datasets import load_toy_cancer
+
+    train, _ = load_toy_cancer()
+    _paths = [
+        tmp_path.joinpath(_name) for _name in ("pos.pl", "neg.pl.bz2", "facts.pl.gz")
+    ]
+    train.to_files(*_paths)
+
+    _db = Database.from_files(*_paths)
+    assert _db.facts == _paths[2]
+    _db.write(filename="train", location=tmp_path)
+    assert tmp_path.joinpath("train_facts.txt").read_text().splitlines() == train.facts
+    assert tmp_path.joinpath("train_neg.txt").read_text().splitlines() == train.neg
+
+    _db = Database.from_files(*_paths, lazy_load=False)
+    assert _db.neg == train.neg
+    assert Database.from_files(*_paths).describe() == train.describe()
+
+
+def test_save_and_load_binary(tmp_path):
+    from srlearn.datasets import load_toy_cancer
+
+    train, _ = load_toy_cancer()
+    train.facts = (
+        train.facts[:3]
+        + ["% note", "friends(alice, carol).", 'says(x ,  "A b").']
+        + train.facts[3:]
+    )
+    train.save_binary(tmp_path.joinpath("snapshot"))
+    _db = Database.load_binary(tmp_path.joinpath("snapshot"))
+    assert _db.modes == train.modes
+
+    _expected = tmp_path.joinpath("expected")
+    _expected.mkdir()
+    train.write(filename="train", location=_expected)
+    _db.write(filename="train", location=tmp_path)
+    for _type in ("pos", "neg", "facts"):
+        _name = "train_{0}.txt".format(_type)
+        assert (
+            tmp_path.joinpath(_name).read_bytes()
+            == _expected.joinpath(_name).read_bytes()
+        )
+
+
+def test_subset_and_folds(tmp_path):
+    from srlearn.datasets import load_toy_cancer
+    from srlearn.system_manager import DataCache
+
+    train, _ = load_toy_cancer()
+    _folds = train.folds(n_splits=2, shuffle=True, random_state=0)
+    assert len(_folds) == 2
+    _tests = [_test for _, _test in _folds]
+    assert sorted(list(_tests[0].pos) + list(_tests[1].pos)) == sorted(train.pos)
+    for _train, _test in _folds:
+        assert not set(_train.pos) & set(_test.pos)
+        assert not set(_train.neg) & set(_test.neg)
+        assert _train.facts is _test.facts
+        assert _train.pos.lines is train.pos
+
+    _view = _folds[0][0].subset(pos_index=[0])
+    assert list(_view.pos) == [_folds[0][0].pos[0]]
+
+    _cache = DataCache(tmp_path.joinpath("cache"))
+    _inodes = set()
+    for i, (_train, _test) in enumerate(_folds):
+        for _name, _db in (("train", _train), ("test", _test)):
+            _location = tmp_path.joinpath("{0}{1}".format(_name, i))
+            _location.mkdir()
+            _db.write(filename=_name, location=_location, cache=_cache)
+            _facts = _location.joinpath("{0}_facts.txt".format(_name))
+            assert _facts.read_text().splitlines() == train.facts
+            _inodes.add(_facts.stat().st_ino)
+    assert len(_inodes) == 1
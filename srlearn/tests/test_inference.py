@@ -0,0 +1,228 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Tests for srlearn._inference and the jar-free inference backends
+"""
+
+import pytest
+import numpy as np
+from numpy.testing import assert_array_almost_equal
+from numpy.testing import assert_array_equal
+from srlearn.columnar import ColumnarFacts
+from srlearn._inference import FactIndex
+from srlearn._inference import TreeEnsemble
+from srlearn._inference import VectorizedTreeEnsemble
+from srlearn._inference import best_f1_threshold
+from srlearn._inference import parse_examples
+from srlearn._inference import parse_tree_clauses
+from srlearn._inference import sigmoid
+from srlearn.rdn import BoostedRDNClassifier
+from srlearn.rdn import BoostedRDNRegressor
+from srlearn.background import Background
+from srlearn.database import Database
+from srlearn.datasets import load_toy_cancer
+from srlearn.datasets import load_toy_father
+
+
+_TREE = (
+    "setParam: stringsAreCaseSensitive = true.\n"
+    "\n"
+    "usePrologVariables: true.\n"
+    "\n"
+    "\n"
+    "(father(A, B, 0.75) :-  /* #pos=5 */ childof(B, UniqueVar1), male(B), !).\n"
+    "(father(A, _, 0.25) :-  /* #pos=2 */ male(A), !).\n"
+    "(father(_, _, -0.125) :-  /* #neg=10 */ !).\n"
+)
+
+_WEBKB_MODES = [
+    "courseprof(-Course, +Person).",
+    "courseprof(+Course, -Person).",
+    "courseta(+Course, -Person).",
+    "courseta(-Course, +Person).",
+    "faculty(+Person).",
+    "project(-Proj, +Person).",
+    "project(+Proj, -Person).",
+    "sameperson(-Person, +Person).",
+    "student(+Person).",
+]
+
+_BOSTON_MODES = [
+    "crim(+id,#varsrim).",
+    "zn(+id,#varzn).",
+    "indus(+id,#varindus).",
+    "chas(+id,#varchas).",
+    "nox(+id,#varnox).",
+    "rm(+id,#varrm).",
+    "age(+id,#varage).",
+    "dis(+id,#vardis).",
+    "rad(+id,#varrad).",
+    "tax(+id,#vartax).",
+    "ptratio(+id,#varptrat).",
+    "b(+id,#varb).",
+    "lstat(+id,#varlstat).",
+    "medv(+id).",
+]
+
+
+def _load_webkb(fold):
+    _path = "datasets/webkb/{0}/{0}_{1}.txt"
+    return Database.from_files(
+        pos=_path.format(fold, "pos"),
+        neg=_path.format(fold, "neg"),
+        facts=_path.format(fold, "facts"),
+    )
+
+
+def _load_boston(split):
+    _path = "datasets/Boston/{0}/{1}.pl"
+    return Database.from_files(
+        pos=_path.format(split, "pos"),
+        neg=_path.format(split, "neg"),
+        facts=_path.format(split, "facts"),
+        lazy_load=False,
+    )
+
+
+def test_parse_tree_clauses():
+    """Clause heads, values, and bodies are recovered in order."""
+    _clauses = parse_tree_clauses(_TREE, "father")
+    assert len(_clauses) == 3
+    assert _clauses[0].head == ("A", "B")
+    assert _clauses[0].value == 0.75
+    assert _clauses[0].body == (("childof", ("B", "UniqueVar1")), ("male", ("B",)))
+    assert _clauses[2].head == ("_", "_")
+    assert _clauses[2].body == ()
+
+
+def test_parse_tree_clauses_wrong_target():
+    with pytest.raises(ValueError):
+        parse_tree_clauses(_TREE, "mother")
+
+
+def test_parse_examples_regression():
+    _examples, _values = parse_examples(
+        ["regressionExample(medv(id1),33.2).", "// comment", ""], "medv"
+    )
+    assert _examples == [("id1",)]
+    assert _values == [33.2]
+
+
+def test_tree_ensemble_decision_list():
+    """The first clause which proves an example gives the value of a tree."""
+    _facts = FactIndex(
+        ["childof(harry, james).", "male(harry).", "male(james)."]
+    )
+    _ensemble = TreeEnsemble([_TREE, _TREE], "father", prior=1.0, weights=[1.0, 2.0])
+    assert_array_almost_equal(
+        _ensemble.decision_function(
+            [("james", "harry"), ("james", "lily"), ("lily", "lily")], _facts
+        ),
+        np.array([1.0 + 3 * 0.75, 1.0 + 3 * 0.25, 1.0 - 3 * 0.125]),
+    )
+
+
+def test_vectorized_matches_prover():
+    """Join plans agree with the backtracking prover, including repeated
+    variables, constants, and existential variables shared between literals."""
+    _tree = (
+        "(t(A, B, 0.5) :-  /* #pos=1 */ p(A, UniqueVar1), p(UniqueVar1, B), q(B)).\n"
+        "(t(A, A, 0.25) :-  /* #pos=1 */ p(A, _)).\n"
+        "(t(A, _, 0.125) :-  /* #pos=1 */ p(A, A)).\n"
+        "(t(A, _, 0.0625) :-  /* #pos=1 */ r(A, c, UniqueVar2), q(UniqueVar2)).\n"
+        "t(_, _, -1.0) /* #neg=1 */ .\n"
+    )
+    _facts = [
+        "p(a, b).",
+        "p(b, c).",
+        "p(c, c).",
+        "q(c).",
+        "r(b, c, d).",
+        "r(d, c, c).",
+    ]
+    _examples = [(_x, _y) for _x in "abcdz" for _y in "abcdz"]
+
+    _expected = TreeEnsemble([_tree], "t").decision_function(
+        _examples, FactIndex(_facts)
+    )
+    _vectorized = VectorizedTreeEnsemble([_tree], "t").decision_function(
+        _examples, ColumnarFacts(_facts)
+    )
+    assert_array_equal(_vectorized, _expected)
+    assert set(_expected) == {0.5, 0.25, 0.125, 0.0625, -1.0}
+
+
+def test_best_f1_threshold():
+    _probs = np.array([0.9, 0.9, 0.1, 0.2])
+    _labels = np.array([1, 1, 0, 0])
+    assert best_f1_threshold(_probs, _labels) == 0.5
+
+
+def test_bad_inference_parameter():
+    train, _ = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        inference="prolog",
+    )
+    with pytest.raises(ValueError):
+        _dn.fit(train)
+
+
+@pytest.mark.parametrize("solver", ["BoostSRL", "SRLBoost"])
+@pytest.mark.parametrize(
+    "loader,target",
+    [
+        (load_toy_cancer, "cancer"),
+        (load_toy_father, "father"),
+        (lambda: (_load_webkb("train1"), _load_webkb("test1")), "faculty"),
+    ],
+)
+def test_classifier_parity_with_jar(solver, loader, target):
+    """Python inference reproduces the probabilities and classes from the jar."""
+    train, test = loader()
+    _modes = train.modes if isinstance(train.pos, list) else _WEBKB_MODES
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=_modes),
+        target=target,
+        n_estimators=5,
+        solver=solver,
+    )
+    _dn.fit(train)
+
+    _jar_proba = _dn.predict_proba(test)
+    _jar_predict = _dn.predict(test)
+    _jar_threshold = _dn.threshold_
+
+    for _inference in ("python", "numpy"):
+        _dn.inference = _inference
+        assert_array_almost_equal(_dn.predict_proba(test), _jar_proba, decimal=10)
+        assert_array_equal(_dn.predict(test), _jar_predict)
+        assert _dn.threshold_ == pytest.approx(_jar_threshold)
+
+
+@pytest.mark.parametrize("solver", ["BoostSRL", "SRLBoost"])
+def test_regressor_parity_with_jar(solver):
+    """Python inference reproduces the regression values from the jar."""
+    train, test = _load_boston("train"), _load_boston("test")
+    _reg = BoostedRDNRegressor(
+        background=Background(modes=_BOSTON_MODES),
+        target="medv",
+        n_estimators=5,
+        solver=solver,
+    )
+    _reg.fit(train)
+
+    _jar_predict = _reg.predict(test)
+    _jar_true = _reg.true_
+
+    for _inference in ("python", "numpy"):
+        _reg.inference = _inference
+        assert_array_almost_equal(_reg.predict(test), _jar_predict, decimal=10)
+        assert_array_almost_equal(_reg.true_, _jar_true)
+
+
+def test_sigmoid_extreme_sums():
+    _probs = sigmoid([-1000.0, -710.0, 0.0, 710.0, 1000.0])
+    assert_array_equal(_probs, [0.0, 0.0, 0.5, 1.0, 1.0])
+    assert sigmoid([]).shape == (0,)
@@ -0,0 +1,182 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Tests for srlearn.jvm
+"""
+
+import pytest
+from srlearn import jvm
+from srlearn.background import Background
+from srlearn.datasets import load_toy_cancer
+from srlearn.jvm import JVMOutOfMemoryError
+from srlearn.jvm import ResourceProfile
+from srlearn.jvm import java_command
+from srlearn.jvm import java_version
+from srlearn.jvm import resource_profile
+from srlearn.rdn import BoostedRDNClassifier
+
+
+@pytest.fixture
+def sharing(tmp_path):
+    jvm.set_class_data_sharing(True, tmp_path)
+    yield tmp_path
+    jvm.set_class_data_sharing(None)
+
+
+def test_java_command_default(monkeypatch):
+    monkeypatch.delenv(jvm.CLASS_DATA_SHARING_VARIABLE, raising=False)
+    with java_command("SRLBoost.jar") as _argv:
+        assert _argv == ["java", "-jar", "SRLBoost.jar"]
+
+
+def test_java_command_options(monkeypatch):
+    monkeypatch.delenv(jvm.CLASS_DATA_SHARING_VARIABLE, raising=False)
+    with java_command("SRLBoost.jar", ["-Xmx1g"]) as _argv:
+        assert _argv == ["java", "-Xmx1g", "-jar", "SRLBoost.jar"]
+
+
+def test_resource_profile_heap():
+    _profile = ResourceProfile(min_heap="100m", heap_factor=10, max_heap="1g")
+    assert _profile.heap_size(0) == 100 << 20
+    assert _profile.heap_size(10 << 20) == 200 << 20
+    assert _profile.heap_size(1 << 30) == 1 << 30
+    assert ResourceProfile(heap="512m").heap_size(1 << 30) == 512 << 20
+    assert ResourceProfile(heap=None).java_options() == ["-XX:+ExitOnOutOfMemoryError"]
+
+
+def test_resource_profile_threads():
+    _options = ResourceProfile(
+        heap=None, processors=4, compiler_threads=1, options=["-Xss4m"]
+    ).java_options()
+    assert _options == [
+        "-XX:ActiveProcessorCount=4",
+        "-XX:ParallelGCThreads=4",
+        "-XX:ConcGCThreads=4",
+        "-XX:CICompilerCount=2",
+        "-XX:+ExitOnOutOfMemoryError",
+        "-Xss4m",
+    ]
+
+
+def test_resource_profile_from_jvm_options():
+    assert resource_profile(None) is None
+    assert resource_profile("auto") == ResourceProfile()
+    assert resource_profile({"heap": "2g"}) == ResourceProfile(heap="2g")
+    assert resource_profile(["-Xmx2g"]).java_options() == [
+        "-XX:+ExitOnOutOfMemoryError",
+        "-Xmx2g",
+    ]
+    assert repr(ResourceProfile(heap="2g", gc="serial")) == (
+        "ResourceProfile(heap='2g', gc='serial')"
+    )
+
+
+@pytest.mark.parametrize(
+    "jvm_options",
+    [
+        "big",
+        "-Xmx1g",
+        ["-Xmx1g", 2],
+        {"heap": "lots"},
+        {"processors": 0},
+        {"gc": "zgc"},
+        {"cpus": []},
+    ],
+)
+def test_bad_jvm_options(jvm_options):
+    train, _ = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        jvm_options=jvm_options,
+    )
+    with pytest.raises(ValueError):
+        _dn.fit(train)
+
+
+def test_jvm_options_with_workers():
+    train, _ = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        jvm_workers=1,
+        jvm_options="auto",
+    )
+    with pytest.raises(ValueError):
+        _dn.fit(train)
+
+
+def test_fit_out_of_memory():
+    from srlearn import Database
+
+    train, _ = load_toy_cancer()
+    _db = Database()
+    _db.pos = ["cancer(p{0}).".format(i) for i in range(0, 20000, 7)]
+    _db.neg = ["cancer(p{0}).".format(i) for i in range(3, 20000, 7)]
+    _db.facts = [
+        "friends(p{0},p{1}).".format(i, (i * 31 + 7) % 20000) for i in range(20000)
+    ] + ["smokes(p{0}).".format(i) for i in range(0, 20000, 3)]
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        n_estimators=1,
+        jvm_options=ResourceProfile(heap="16m"),
+    )
+    with pytest.raises(JVMOutOfMemoryError):
+        _dn.fit(_db)
+
+
+def test_fit_auto_heap():
+    train, test = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        n_estimators=2,
+        jvm_options="auto",
+    )
+    _dn.fit(train)
+    assert len(_dn.predict_proba(test)) == 5
+
+
+def test_class_data_sharing(sharing):
+    if java_version()[0] < 10:
+        pytest.skip("Class data sharing needs Java 10")
+    train, test = load_toy_cancer()
+    _bk = Background(modes=train.modes)
+
+    _probabilities = []
+    for _ in range(2):
+        _dn = BoostedRDNClassifier(
+            background=_bk, target="cancer", solver="SRLBoost", n_estimators=2
+        )
+        _dn.fit(train)
+        _probabilities.append(list(_dn.predict_proba(test)))
+        assert len(list(sharing.glob("SRLBoost-*.jsa"))) == 1
+        assert not list(sharing.glob("*.classlist"))
+
+    with java_command(_dn.file_system.files.SRLBOOST_BACKEND) as _argv:
+        assert _argv[1].startswith("-XX:SharedArchiveFile=")
+    assert _probabilities[0] == _probabilities[1]
+
+
+def test_shareable_jar(tmp_path):
+    import zipfile
+    from srlearn.jvm import _shareable_jar
+
+    _jar = tmp_path.joinpath("app.jar")
+    with zipfile.ZipFile(_jar, "w") as _zip:
+        _zip.writestr(
+            "META-INF/MANIFEST.MF",
+            "Manifest-Version: 1.0\r\nClass-Path: . lib.jar\r\nMain-Class: Main\r\n",
+        )
+        _zip.writestr("Main.class", b"\xca\xfe\xba\xbe")
+    _copy = _shareable_jar(_jar, tmp_path.joinpath("app-1-2.jsa"))
+    assert _copy == str(tmp_path.joinpath("app-1-2.jar"))
+    with zipfile.ZipFile(_copy) as _zip:
+        _manifest = _zip.read("META-INF/MANIFEST.MF").decode("utf-8")
+        assert _zip.read("Main.class") == b"\xca\xfe\xba\xbe"
+    assert "Class-Path: lib.jar\r\n" in _manifest
+    assert "Main-Class: Main" in _manifest
@@ -0,0 +1,86 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Tests for srlearn.parser
+"""
+
+import pytest
+from srlearn.parser import Literal
+from srlearn.parser import Mode
+from srlearn.parser import parse_file
+from srlearn.parser import parse_lines
+from srlearn.parser import parse_literal
+from srlearn.parser import parse_mode
+from srlearn.parser import parse_regression_example
+from srlearn.parser import split_arguments
+from srlearn.datasets import load_toy_father
+
+
+@pytest.mark.parametrize(
+    "string,expected",
+    [
+        ("a,b", ["a", "b"]),
+        ("a, b ", ["a", "b"]),
+        ("", []),
+        ("  ", []),
+        ("a,", ["a", ""]),
+        ("f(a, b), c", ["f(a, b)", "c"]),
+        ('"x, y", \'z\'', ['"x, y"', "'z'"]),
+    ],
+)
+def test_split_arguments(string, expected):
+    assert split_arguments(string) == expected
+
+
+@pytest.mark.parametrize(
+    "string,expected",
+    [
+        ("pred(a, b).", Literal("pred", ("a", "b"))),
+        ("pred(a,b)", Literal("pred", ("a", "b"))),
+        ("sunny.", Literal("sunny")),
+        (
+            "regressionExample(medv(id1),33.2).",
+            Literal("regressionExample", ("medv(id1)", "33.2")),
+        ),
+    ],
+)
+def test_parse_literal(string, expected):
+    _literal = parse_literal(string)
+    assert _literal == expected
+    assert parse_literal(str(_literal)) == _literal
+
+
+def test_parse_literal_error():
+    with pytest.raises(ValueError):
+        parse_literal("pred(a, b")
+
+
+def test_parse_mode():
+    _mode = parse_mode("mode: friends(+Person,-Person).")
+    assert _mode == Mode("friends", ("+", "-"), ("Person", "Person"))
+    assert _mode.arity == 2
+    assert str(_mode) == "friends(+Person,-Person)."
+    assert parse_mode("age(+id,#age).").markers == ("+", "#")
+    with pytest.raises(ValueError):
+        parse_mode("friends(Person,-Person).")
+
+
+def test_parse_regression_example():
+    assert parse_regression_example("regressionExample(medv(id1),33.2).") == (
+        Literal("medv", ("id1",)),
+        33.2,
+    )
+    with pytest.raises(ValueError):
+        parse_regression_example("medv(id1).")
+
+
+def test_parse_lines_and_file(tmp_path):
+    train, _ = load_toy_father()
+    _literals = list(parse_lines(train.facts))
+    assert len(_literals) == len(train.facts)
+
+    _path = tmp_path.joinpath("facts.txt")
+    _path.write_text("// comment\n\n" + "\n".join(train.facts) + "\n")
+    assert list(parse_file(_path)) == _literals
+    with pytest.raises(TypeError):
+        parse_file(train.facts)
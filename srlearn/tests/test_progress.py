@@ -0,0 +1,118 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Tests for srlearn.progress
+"""
+
+import asyncio
+import os
+import pathlib
+import threading
+import pytest
+from srlearn.background import Background
+from srlearn.datasets import load_toy_cancer
+from srlearn.progress import TrainingLog, follow
+from srlearn.rdn import BoostedRDNClassifier
+
+_LINES = [
+    "% Learning 2 trees.",
+    "%%%%%  WILL-Produced Tree #1 @ 3:47:43 10/18/26.  [Using 1 cpus]  %%%%%",
+    "cancer(A, 0.858) :- smokes(A), !. // Clause #1.",
+    "cancer(A, -0.142) :- !. // Clause #2.",
+    "The flattened versions of these clauses",
+    "cancer(A, 0.858) :- smokes(A). // Clause #1.",
+    "% Saving model in: /tmp/models/bRDNs/cancer.model.ckpt",
+    "% Time taken to learn 1 trees is 265 milliseconds.",
+    "%%%%%  WILL-Produced Tree #2 @ 3:47:43 10/18/26.  [Using 1 cpus]  %%%%%",
+    "cancer(A, 0.1) :- !. // Clause #1.",
+    "The flattened versions of these clauses",
+    "% Saving model in: /tmp/models/bRDNs/cancer.model.ckpt",
+]
+
+
+def _toy_classifier(train, **kwargs):
+    return BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        n_estimators=2,
+        **kwargs
+    )
+
+
+def test_training_log_reports_each_tree():
+    _trees = []
+    _log = TrainingLog(_trees.append, 2, pathlib.Path("trees"), "cancer")
+    for _line in _LINES:
+        _log(_line)
+    assert [(t.tree, t.clauses) for t in _trees] == [(1, 2)]
+    _log.finish()
+    assert [(t.tree, t.n_trees, t.clauses) for t in _trees] == [(1, 2, 2), (2, 2, 1)]
+    assert _trees[0].path == pathlib.Path("trees", "cancerTree0.tree")
+    assert _trees[1].path == pathlib.Path("trees", "cancerTree1.tree")
+    assert _trees[0].elapsed <= _trees[1].elapsed
+
+
+def test_training_log_callback_errors_are_logged(caplog):
+    def _broken(progress):
+        raise ValueError("A callback which fails")
+
+    _log = TrainingLog(_broken, 2, pathlib.Path("trees"), "cancer")
+    for _line in _LINES:
+        _log(_line)
+    _log.finish()
+    assert "Error in progress callback" in caplog.text
+
+
+def test_follow_reads_appended_lines(tmp_path):
+    _path = tmp_path.joinpath("log.txt")
+    _lines = []
+    _stop = threading.Event()
+    _thread = threading.Thread(
+        target=follow, args=(str(_path), _lines.append, _stop, 0.01)
+    )
+    _thread.start()
+    with open(_path, "w") as _fh:
+        _fh.write("first\nsec")
+        _fh.flush()
+        _fh.write("ond\nlast")
+    _stop.set()
+    _thread.join()
+    assert _lines == ["first", "second", "last"]
+
+
+def test_fit_progress_callback():
+    train, _ = load_toy_cancer()
+    _trees = []
+
+    def _record(progress):
+        _trees.append((progress, os.path.exists(progress.path)))
+
+    _dn = _toy_classifier(train)
+    _dn.fit(train, progress=_record)
+    assert [t.tree for t, _ in _trees] == [1, 2]
+    assert all(t.n_trees == 2 and t.clauses > 0 for t, _ in _trees)
+    assert all(_exists for _, _exists in _trees)
+
+
+def test_fit_async_progress_callback():
+    train, _ = load_toy_cancer()
+    _trees = []
+    _dn = _toy_classifier(train)
+    asyncio.run(_dn.fit_async(train, progress=_trees.append))
+    assert [t.tree for t in _trees] == [1, 2]
+
+
+@pytest.mark.parametrize("progress", ["yes", 1])
+def test_fit_bad_progress(progress):
+    train, _ = load_toy_cancer()
+    with pytest.raises(ValueError):
+        _toy_classifier(train).fit(train, progress=progress)
+
+
+def test_fit_progress_bar():
+    pytest.importorskip("tqdm")
+    train, _ = load_toy_cancer()
+    _dn = _toy_classifier(train)
+    _dn.fit(train, progress=True)
+    assert len(_dn.estimators_) == 2
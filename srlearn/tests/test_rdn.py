@@ -4,12 +4,14 @@
 Tests for srlearn.rdn.BoostedRDNClassifier
 """
 
+import asyncio
 import pytest
 import numpy as np
 from numpy.testing import assert_array_almost_equal
 from numpy.testing import assert_array_equal
 from srlearn.rdn import BoostedRDNClassifier
 from srlearn.background import Background
+from srlearn.database import Database
 from srlearn.datasets import load_toy_cancer
 
 
@@ -122,3 +124,120 @@ def test_classification_srlboost_backend():
     assert_array_equal(
         _dn.predict(test), np.array([1.0, 1.0, 1.0, 0.0, 0.0])
     )
+
+
+def test_fit_predict_async():
+    """Learn and predict with the coroutines, concurrently."""
+    train, test = load_toy_cancer()
+    _bk = Background(modes=train.modes)
+
+    async def _fit_predict():
+        _models = await asyncio.gather(
+            *[
+                BoostedRDNClassifier(
+                    background=_bk, target="cancer", solver="SRLBoost", n_estimators=2
+                ).fit_async(train)
+                for _ in range(2)
+            ]
+        )
+        _probabilities = await asyncio.gather(
+            *[_dn.predict_proba_async(test) for _dn in _models]
+        )
+        return _models, _probabilities, await _models[0].predict_async(test)
+
+    _models, _probabilities, _classes = asyncio.run(_fit_predict())
+    for _dn, _proba in zip(_models, _probabilities):
+        assert len(_dn.estimators_) == 2
+        assert_array_equal(_proba, _dn.predict_proba(test))
+    assert_array_equal(_classes, _models[0].predict(test))
+
+
+def test_fit_async_cancel():
+    """Cancelling the task stops learning with a CancelledError."""
+    train, _ = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+    )
+
+    async def _cancel():
+        _task = asyncio.ensure_future(_dn.fit_async(train))
+        await asyncio.sleep(0.2)
+        _task.cancel()
+        await _task
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(_cancel())
+    assert not hasattr(_dn, "estimators_")
+
+
+def test_concurrent_predictions():
+    """Concurrent predictions with one estimator each get their own results."""
+    train, test = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        n_estimators=2,
+    )
+    _dn.fit(train)
+    _tests = []
+    for i in range(3):
+        _db = Database()
+        _db.pos = test.pos[i:]
+        _db.neg = test.neg
+        _db.facts = test.facts
+        _tests.append(_db)
+    _expected = [_dn.predict_proba(_db) for _db in _tests]
+
+    async def _predict():
+        return await asyncio.gather(*[_dn.predict_proba_async(_db) for _db in _tests])
+
+    for _e, _r in zip(_expected, asyncio.run(_predict())):
+        assert_array_almost_equal(_r, _e)
+
+
+def test_cancel_while_writing():
+    """cancel() before the jar starts stops the call."""
+    train, _ = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+    )
+    _train_call = _dn._train_call
+
+    def _write_then_cancel(database):
+        _call = _train_call(database)
+        _dn.cancel()
+        return _call
+
+    _dn._train_call = _write_then_cancel
+    with pytest.raises(RuntimeError):
+        _dn.fit(train)
+    assert not hasattr(_dn, "estimators_")
+
+
+def test_cancel_concurrent_predictions():
+    """cancel() stops every prediction running for the estimator."""
+    train, test = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        n_estimators=2,
+    )
+    _dn.fit(train)
+
+    async def _predict_and_cancel():
+        _tasks = [
+            asyncio.ensure_future(_dn.predict_proba_async(test)) for _ in range(2)
+        ]
+        await asyncio.sleep(0.3)
+        _dn.cancel()
+        return await asyncio.gather(*_tasks, return_exceptions=True)
+
+    _results = asyncio.run(_predict_and_cancel())
+    assert all(isinstance(_r, RuntimeError) for _r in _results)
+    assert not _dn._cancel_events
@@ -0,0 +1,168 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Tests for srlearn._runner
+"""
+
+import asyncio
+import re
+import subprocess
+import sys
+import threading
+import os
+import time
+import pytest
+from srlearn._runner import JVMOutOfMemoryError
+from srlearn._runner import run_command
+from srlearn._runner import run_command_async
+from srlearn.rdn import BoostedRDNClassifier
+from srlearn.background import Background
+from srlearn.datasets import load_toy_cancer
+
+
+_PRINT = "for i in range(100): print('line', i)\nprint('% Threshold = 0.25')"
+_SLEEP = "import time; time.sleep(60)"
+_OUT_OF_MEMORY = (
+    "import sys\n"
+    "print('Exception in thread \"main\" java.lang.OutOfMemoryError: "
+    "Java heap space', file=sys.stderr)\n"
+    "sys.exit(1)"
+)
+
+
+def test_run_command_streams_output(tmp_path):
+    _log = tmp_path.joinpath("log.txt")
+    _result = run_command(
+        [sys.executable, "-c", _PRINT],
+        log=_log,
+        patterns={"threshold": re.compile("Threshold = (\\d*.\\d*)")},
+        buffer_lines=10,
+    )
+    assert _result.returncode == 0
+    assert _result.matches == {"threshold": "0.25"}
+    assert len(_result.lines) == 10
+    assert _result.lines[-1] == "% Threshold = 0.25"
+    assert len(_log.read_text().splitlines()) == 101
+
+
+@pytest.mark.skipif(not hasattr(os, "wait4"), reason="Needs os.wait4")
+def test_run_command_usage():
+    _allocate = "x = b\"x\" * (300 << 20)\nprint('done')"
+    for _run in (run_command, lambda argv: asyncio.run(run_command_async(argv))):
+        _result = _run([sys.executable, "-c", _allocate])
+        assert _result.usage["max_rss"] > 300 << 20
+        assert _result.usage["user_time"] + _result.usage["system_time"] > 0
+        assert 0 < _result.first_output <= _result.wall_time
+
+
+def test_run_command_error():
+    with pytest.raises(RuntimeError):
+        run_command([sys.executable, "-c", "import sys; sys.exit(3)"])
+
+
+def test_run_command_out_of_memory(tmp_path):
+    _log = tmp_path.joinpath("log.txt")
+    with pytest.raises(JVMOutOfMemoryError) as _error:
+        run_command([sys.executable, "-c", _OUT_OF_MEMORY], log=_log)
+    assert isinstance(_error.value, RuntimeError)
+    assert "Java heap space" in str(_error.value)
+    assert "OutOfMemoryError" in _log.read_text()
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "sched_getaffinity"), reason="CPU affinity is Linux only"
+)
+def test_run_command_cpus():
+    _cpu = min(os.sched_getaffinity(0))
+    _result = run_command(
+        [sys.executable, "-c", "import os; print(sorted(os.sched_getaffinity(0)))"],
+        cpus=[_cpu],
+    )
+    assert _result.lines[-1] == str([_cpu])
+
+
+def test_run_command_timeout():
+    _start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_command([sys.executable, "-c", _SLEEP], timeout=0.5)
+    assert time.monotonic() - _start < 30
+
+
+def test_run_command_cancel():
+    _cancel = threading.Event()
+    threading.Timer(0.5, _cancel.set).start()
+    _start = time.monotonic()
+    with pytest.raises(RuntimeError):
+        run_command([sys.executable, "-c", _SLEEP], cancel=_cancel)
+    assert time.monotonic() - _start < 30
+
+
+def test_run_command_async_streams_output(tmp_path):
+    _log = tmp_path.joinpath("log.txt")
+    _result = asyncio.run(
+        run_command_async(
+            [sys.executable, "-c", _PRINT],
+            log=_log,
+            patterns={"threshold": re.compile("Threshold = (\\d*.\\d*)")},
+            buffer_lines=10,
+        )
+    )
+    assert _result.returncode == 0
+    assert _result.matches == {"threshold": "0.25"}
+    assert list(_result.lines)[-2:] == ["line 99", "% Threshold = 0.25"]
+    assert len(_log.read_text().splitlines()) == 101
+
+
+def test_run_command_async_errors():
+    with pytest.raises(JVMOutOfMemoryError):
+        asyncio.run(run_command_async([sys.executable, "-c", _OUT_OF_MEMORY]))
+    with pytest.raises(subprocess.TimeoutExpired):
+        asyncio.run(run_command_async([sys.executable, "-c", _SLEEP], timeout=0.5))
+
+
+def test_run_command_async_cancel(tmp_path):
+    _pid = tmp_path.joinpath("pid")
+    _script = "import os, time\nopen({0!r}, 'w').write(str(os.getpid()))\n".format(
+        str(_pid)
+    ) + "time.sleep(60)"
+
+    async def _cancel():
+        _task = asyncio.ensure_future(
+            run_command_async([sys.executable, "-c", _script])
+        )
+        while not _pid.exists() or not _pid.read_text():
+            await asyncio.sleep(0.05)
+        _task.cancel()
+        await _task
+
+    _start = time.monotonic()
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(_cancel())
+    assert time.monotonic() - _start < 30
+    with pytest.raises(ProcessLookupError):
+        os.kill(int(_pid.read_text()), 0)
+
+
+@pytest.mark.parametrize("timeout", [0, -1.0, True, "10"])
+def test_bad_timeout_parameter(timeout):
+    train, _ = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        timeout=timeout,
+    )
+    with pytest.raises(ValueError):
+        _dn.fit(train)
+
+
+def test_fit_timeout():
+    train, _ = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        timeout=0.01,
+    )
+    with pytest.raises(subprocess.TimeoutExpired):
+        _dn.fit(train)
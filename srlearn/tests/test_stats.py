@@ -0,0 +1,117 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Tests for srlearn.stats
+"""
+
+import asyncio
+import pytest
+from srlearn import stats
+from srlearn.background import Background
+from srlearn.datasets import load_toy_cancer
+from srlearn.rdn import BoostedRDNClassifier
+
+
+@pytest.fixture
+def calls():
+    _calls = []
+
+    def _record(estimator, method, stats):
+        _calls.append((estimator, method, stats))
+
+    def _broken(estimator, method, stats):
+        raise ValueError("A hook which fails")
+
+    stats.add_hook(_record)
+    stats.add_hook(_broken)
+    yield _calls
+    stats.remove_hook(_record)
+    stats.remove_hook(_broken)
+
+
+def test_fit_predict_stats(calls):
+    train, test = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        n_estimators=2,
+    )
+    _dn.fit(train)
+    for _key in (
+        "write_seconds",
+        "jvm_startup_seconds",
+        "jar_seconds",
+        "read_trees_seconds",
+        "read_dotfiles_seconds",
+        "total_seconds",
+    ):
+        assert 0 <= _dn.fit_stats_[_key] <= _dn.fit_stats_["total_seconds"]
+    assert _dn.fit_stats_["bytes_written"] > 0
+    assert _dn.fit_stats_["bytes_read"] > 0
+    assert _dn.fit_stats_["child_user_seconds"] > 0
+    assert _dn.fit_stats_["child_max_rss_bytes"] > 1 << 20
+
+    _dn.predict_proba(test)
+    assert _dn.predict_stats_["read_results_seconds"] >= 0
+    assert _dn.predict_stats_["bytes_read"] > 0
+
+    _dn.inference = "python"
+    _dn.predict(test)
+    assert set(_dn.predict_stats_) == {"inference_seconds", "total_seconds"}
+
+    assert [(_e, _m) for _e, _m, _ in calls] == [
+        (_dn, "fit"),
+        (_dn, "predict"),
+        (_dn, "predict"),
+    ]
+    assert calls[-1][2] is _dn.predict_stats_
+
+
+def test_bytes_written_counts_cache_misses(tmp_path, monkeypatch):
+    """Data linked from the cache was not written again."""
+    monkeypatch.setenv("SRLEARN_SCRATCH_ROOT", str(tmp_path))
+    train, test = load_toy_cancer()
+    _estimators = [
+        BoostedRDNClassifier(
+            background=Background(modes=train.modes),
+            target="cancer",
+            solver="SRLBoost",
+            n_estimators=2,
+        )
+        for _ in range(2)
+    ]
+    for _dn in _estimators:
+        _dn.fit(train)
+    _cold, _cached = [_dn.fit_stats_["bytes_written"] for _dn in _estimators]
+    assert _cold > sum(len(_f) for _f in train.facts)
+    assert _cached == 0
+
+    _dn.predict_proba(test)
+    assert _dn.predict_stats_["bytes_written"] > 0
+    _dn.predict_proba(test)
+    assert _dn.predict_stats_["bytes_written"] == 0
+
+
+def test_fit_async_stats(calls):
+    train, _ = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        n_estimators=2,
+    )
+    asyncio.run(_dn.fit_async(train))
+    assert _dn.fit_stats_["jar_seconds"] > 0
+    assert _dn.fit_stats_["child_max_rss_bytes"] > 1 << 20
+    assert calls == [(_dn, "fit", _dn.fit_stats_)]
+
+
+def test_stage_timer():
+    _timer = stats.StageTimer()
+    for _ in range(2):
+        with _timer.stage("write"):
+            _timer.add("bytes_written", 10)
+    _stats = _timer.finish()
+    assert _stats["bytes_written"] == 20
+    assert 0 <= _stats["write_seconds"] <= _stats["total_seconds"]
@@ -4,8 +4,20 @@
 Tests for srlearn.system_manager.FileSystem
 """
 
-
+import os
+import pytest
+from srlearn.datasets import load_toy_cancer
+from srlearn.system_manager import DataCache
 from srlearn.system_manager import FileSystem
+from srlearn.system_manager import compression
+from srlearn.system_manager import copy_file
+from srlearn.system_manager import get_scratch_root
+from srlearn.system_manager import link_file
+from srlearn.system_manager import open_file
+from srlearn.system_manager import reset
+from srlearn.system_manager import set_scratch_root
+from srlearn.system_manager import SharedLines
+from srlearn.system_manager import write_lines
 
 
 def test_initialize_file_system():
@@ -50,3 +62,172 @@ def test_system_train_test_dirs():
     del system0
 
     assert not _location.exists()
+
+
+def test_file_system_root(tmp_path):
+    """A FileSystem can be allocated under another scratch root."""
+    system0 = FileSystem(root=tmp_path)
+    _location = system0.files.DIRECTORY
+
+    assert _location.parent == tmp_path.joinpath("bsrl_data")
+    assert system0.files.TRAIN_DIR.exists()
+    del system0
+    assert not _location.exists()
+
+
+def test_scratch_root_settings(tmp_path, monkeypatch):
+    """set_scratch_root takes precedence over the environment variable."""
+    monkeypatch.setenv("SRLEARN_SCRATCH_ROOT", str(tmp_path.joinpath("env")))
+    assert get_scratch_root() == tmp_path.joinpath("env")
+
+    set_scratch_root(tmp_path.joinpath("global"))
+    try:
+        system0 = FileSystem()
+        assert system0.files.DIRECTORY.parent == tmp_path.joinpath(
+            "global", "bsrl_data"
+        )
+        assert reset(soft=True) == [system0.files.DIRECTORY.name]
+    finally:
+        set_scratch_root(None)
+    assert get_scratch_root() == tmp_path.joinpath("env")
+
+
+@pytest.mark.skipif(not hasattr(os, "getuid"), reason="POSIX permissions")
+def test_scratch_root_in_temporary_directory(tmp_path, monkeypatch):
+    """Without a writable installation, a private per-user directory is used."""
+    monkeypatch.delenv("SRLEARN_SCRATCH_ROOT", raising=False)
+    monkeypatch.setattr("tempfile.tempdir", str(tmp_path))
+    monkeypatch.setattr("os.access", lambda path, mode: False)
+    _root = get_scratch_root()
+    assert _root == tmp_path.joinpath("srlearn-{0}".format(os.getuid()))
+    assert _root.stat().st_mode & 0o777 == 0o700
+    assert get_scratch_root() == _root
+
+    _root.chmod(0o777)
+    with pytest.raises(PermissionError):
+        get_scratch_root()
+    _root.rmdir()
+    _root.symlink_to(tmp_path)
+    with pytest.raises(PermissionError):
+        get_scratch_root()
+
+
+def test_many_file_systems(tmp_path):
+    """Directories are unique, even when many are allocated at once."""
+    systems = [FileSystem(root=tmp_path) for _ in range(500)]
+    assert len({_system.files.DIRECTORY for _system in systems}) == 500
+    assert len(reset(soft=True, root=tmp_path)) == 500
+    del systems
+    assert reset(soft=True, root=tmp_path) == []
+
+
+def test_data_cache(tmp_path):
+    """Identical data is written once and linked into each location."""
+    cache = DataCache(tmp_path.joinpath("cache"))
+    lines = ["a(x).", "b(y)."]
+
+    for name in ("one.txt", "two.txt"):
+        cache.link(lines, tmp_path.joinpath(name))
+        assert tmp_path.joinpath(name).read_text() == "a(x).\nb(y).\n"
+    cache.link(["c(z)."], tmp_path.joinpath("two.txt"))
+
+    assert len(list(tmp_path.joinpath("cache").iterdir())) == 2
+    assert tmp_path.joinpath("one.txt").read_text() == "a(x).\nb(y).\n"
+    assert tmp_path.joinpath("two.txt").read_text() == "c(z).\n"
+
+    cache.clear()
+    assert list(tmp_path.joinpath("cache").iterdir()) == []
+    assert tmp_path.joinpath("one.txt").read_text() == "a(x).\nb(y).\n"
+
+
+def test_file_systems_share_cache(tmp_path):
+    """Databases written by different FileSystems share one cached copy."""
+    train, _ = load_toy_cancer()
+    systems = [FileSystem(root=tmp_path) for _ in range(3)]
+    for system in systems:
+        train.write("train", system.files.TRAIN_DIR, cache=system.cache)
+    assert len(list(tmp_path.joinpath("bsrl_cache").iterdir())) == 3
+    assert (
+        systems[0].files.TRAIN_DIR.joinpath("train_facts.txt").read_text()
+        == "\n".join(train.facts) + "\n"
+    )
+
+    reset(root=tmp_path)
+    assert not tmp_path.joinpath("bsrl_cache").exists()
+
+
+def test_data_cache_evicts_unlinked_files(tmp_path):
+    """Cached files are removed once nothing links to them."""
+    cache = DataCache(tmp_path.joinpath("cache"))
+    for i in range(5):
+        cache.link(["a(x{0}).".format(i)], tmp_path.joinpath("test.txt"))
+    assert len(list(tmp_path.joinpath("cache").iterdir())) == 1
+    assert tmp_path.joinpath("test.txt").read_text() == "a(x4).\n"
+
+
+def test_file_system_evicts_its_data(tmp_path):
+    """Data only used by a deleted FileSystem is removed from the cache."""
+    train, test = load_toy_cancer()
+    kept, deleted = FileSystem(root=tmp_path), FileSystem(root=tmp_path)
+    train.write("train", kept.files.TRAIN_DIR, cache=kept.cache)
+    train.write("train", deleted.files.TRAIN_DIR, cache=deleted.cache)
+    test.write("test", deleted.files.TEST_DIR, cache=deleted.cache)
+    assert len(list(tmp_path.joinpath("bsrl_cache").iterdir())) == 6
+    del deleted
+    assert len(list(tmp_path.joinpath("bsrl_cache").iterdir())) == 3
+    del kept
+    assert list(tmp_path.joinpath("bsrl_cache").iterdir()) == []
+
+
+def test_link_file_falls_back(tmp_path, monkeypatch):
+    """link_file copies when files cannot be linked."""
+    fcntl = pytest.importorskip("fcntl")
+    _source = tmp_path.joinpath("source.txt")
+    _source.write_text("a(b).\n")
+
+    assert link_file(_source, tmp_path.joinpath("link.txt")) == "link"
+
+    def _unsupported(*args):
+        raise OSError("not supported")
+
+    monkeypatch.setattr(os, "link", _unsupported)
+    monkeypatch.setattr(os, "symlink", _unsupported)
+    monkeypatch.setattr(fcntl, "ioctl", _unsupported, raising=False)
+    assert link_file(_source, tmp_path.joinpath("link.txt")) == "copy"
+    assert not tmp_path.joinpath("link.txt").samefile(_source)
+    assert tmp_path.joinpath("link.txt").read_text() == "a(b).\n"
+
+
+@pytest.mark.parametrize("extension", [".gz", ".bz2", ".xz"])
+def test_compressed_files(tmp_path, extension):
+    _lines = ["friends(p{0},p{1}).".format(i, i + 1) for i in range(1000)]
+    _compressed = tmp_path.joinpath("facts.pl" + extension)
+    write_lines(_lines, _compressed)
+    assert compression(_compressed) is not None
+    assert os.path.getsize(_compressed) < sum(len(_line) for _line in _lines) / 4
+    with open_file(_compressed) as _fh:
+        assert _fh.read().splitlines() == _lines
+
+    _plain = tmp_path.joinpath("facts.txt")
+    assert copy_file(_compressed, _plain) == "stream"
+    assert _plain.read_text().splitlines() == _lines
+    assert copy_file(_compressed, tmp_path.joinpath("copy.pl" + extension)) == "link"
+    assert copy_file(_compressed, _compressed) == "link"
+    assert _compressed.exists()
+
+
+def test_shared_lines(tmp_path):
+    _lines = ["a.", "b."]
+    _shared = SharedLines(_lines)
+    assert _shared.path() is None
+    _shared.write(tmp_path.joinpath("first.txt"))
+    _shared.write(tmp_path.joinpath("second.txt"))
+    assert _shared.path() == tmp_path.joinpath("first.txt")
+    assert os.path.samefile(
+        tmp_path.joinpath("first.txt"), tmp_path.joinpath("second.txt")
+    )
+
+    _lines.append("c.")
+    _shared.write(tmp_path.joinpath("third.txt"))
+    assert tmp_path.joinpath("third.txt").read_text() == "a.\nb.\nc.\n"
+    assert tmp_path.joinpath("second.txt").read_text() == "a.\nb.\n"
@@ -0,0 +1,96 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Tests for srlearn.worker
+"""
+
+import subprocess
+import pytest
+from numpy.testing import assert_array_almost_equal
+from srlearn.rdn import BoostedRDNClassifier
+from srlearn.background import Background
+from srlearn.datasets import load_toy_cancer
+from srlearn.system_manager import FileSystem
+
+
+def test_bad_jvm_workers_parameter():
+    train, _ = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        jvm_workers=-1,
+    )
+    with pytest.raises(ValueError):
+        _dn.fit(train)
+
+
+@pytest.mark.parametrize("solver", ["BoostSRL", "SRLBoost"])
+def test_worker_matches_new_jvm(solver):
+    """Repeated jobs in a long-lived JVM give the same models and predictions."""
+    pytest.importorskip("jpype")
+    train, test = load_toy_cancer()
+
+    _results = []
+    for _workers in (0, 1, 1):
+        _dn = BoostedRDNClassifier(
+            background=Background(modes=train.modes),
+            target="cancer",
+            solver=solver,
+            jvm_workers=_workers,
+        )
+        _dn.fit(train)
+        _results.append((_dn.estimators_, _dn.predict_proba(test), _dn.threshold_))
+
+    for _estimators, _proba, _threshold in _results[1:]:
+        assert _estimators == _results[0][0]
+        assert_array_almost_equal(_proba, _results[0][1])
+        assert _threshold == _results[0][2]
+
+
+def test_worker_restarts(tmp_path):
+    """Crashed workers are restarted by health checks and before jobs."""
+    pytest.importorskip("jpype")
+    from srlearn.worker import WorkerPool
+
+    _pool = WorkerPool(FileSystem().files.SRLBOOST_BACKEND)
+    _worker = _pool._workers[0]
+
+    try:
+        assert _pool.health_check() == 0
+
+        _worker._process.kill()
+        _worker._process.wait()
+        assert _pool.health_check() == 1
+        assert _worker.restarts == 1
+
+        _worker._process.kill()
+        _worker._process.wait()
+        with pytest.raises(RuntimeError):
+            _pool.run(
+                ["-l", "-train", "does/not/exist", "-target", "x"],
+                tmp_path.joinpath("log.txt"),
+            )
+        assert _worker.restarts == 2
+        assert _worker.alive()
+    finally:
+        _pool.close()
+
+
+def test_worker_timeout():
+    """A job which runs too long kills its worker, which is then restarted."""
+    pytest.importorskip("jpype")
+    from srlearn.worker import get_worker_pool
+
+    train, _ = load_toy_cancer()
+    _dn = BoostedRDNClassifier(
+        background=Background(modes=train.modes),
+        target="cancer",
+        solver="SRLBoost",
+        jvm_workers=1,
+        timeout=0.01,
+    )
+    with pytest.raises(subprocess.TimeoutExpired):
+        _dn.fit(train)
+    _worker = get_worker_pool(_dn.file_system.files.SRLBOOST_BACKEND, 1)._workers[0]
+    assert _worker.alive()
@@ -0,0 +1,392 @@
+# Copyright © 2017-2021 Alexander L. Hayes
+
+"""
+Long-lived JVM workers for running the BoostSRL jar files.
+
+Each call to ``java -jar`` boots a new JVM and loads (and JIT compiles) the
+classes in ``BoostSRL.jar`` or ``SRLBoost.jar`` from scratch, which dominates
+the time needed to learn or infer on small and medium data sets. A
+:class:`WorkerPool` keeps one or more worker processes alive instead. Each
+worker is a small Python driver (this module, run as a script) which starts
+a JVM in-process with `JPype <https://jpype.readthedocs.io/>`_ and calls the
+jar's ``main`` method for each job it receives on stdin.
+
+Workers are opt-in through the ``jvm_workers`` parameter of the estimators:
+
+>>> from srlearn.rdn import BoostedRDNClassifier
+>>> from srlearn import Background
+>>> from srlearn.datasets import load_toy_cancer
+>>> train, test = load_toy_cancer()
+>>> bk = Background(modes=train.modes)
+>>> dn = BoostedRDNClassifier(
+...     background=bk, target="cancer", solver="SRLBoost", jvm_workers=1
+... )
+>>> dn.fit(train)        # doctest: +SKIP
+"""
+
+import atexit
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+
+__all__ = ["JarWorker", "WorkerPool", "get_worker_pool", "shutdown"]
+
+
+def _check_jpype():
+    """Raise an ImportError if JPype is not available."""
+    try:
+        import jpype  # noqa: F401
+    except ImportError as excep:
+        raise ImportError("JPype1 needs to be available to use jvm_workers") from excep
+
+
+class JarWorker:
+    """One worker process running a JVM with a jar file on its classpath.
+
+    Parameters
+    ----------
+    jar : str
+        Path to a jar file with a ``Main-Class`` in its manifest.
+    start_timeout : float (Default: 120.0)
+        Seconds to wait for the JVM to start.
+    """
+
+    def __init__(self, jar, start_timeout=120.0):
+        self.jar = str(jar)
+        self.start_timeout = start_timeout
+        self.restarts = -1
+        self._process = None
+        self._replies = None
+        self.start()
+
+    def start(self):
+        """Start (or restart) the worker process and wait until it is ready."""
+        self.close()
+        self.restarts += 1
+        self._process = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), self.jar],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            bufsize=1,
+        )
+        self._replies = queue.Queue()
+        threading.Thread(
+            target=self._read_replies,
+            args=(self._process.stdout, self._replies),
+            daemon=True,
+        ).start()
+        _reply = self._receive(self.start_timeout)
+        if not _reply["ok"]:
+            self.close()
+            raise RuntimeError(
+                "Could not start a JVM worker for {0}: {1}".format(
+                    self.jar, _reply["error"]
+                )
+            )
+
+    @staticmethod
+    def _read_replies(stream, replies):
+        for _line in stream:
+            replies.put(json.loads(_line))
+        # End of file: the worker exited.
+        replies.put({"ok": False, "error": "JVM worker exited", "exited": True})
+
+    def _receive(self, timeout):
+        try:
+            return self._replies.get(timeout=timeout)
+        except queue.Empty:
+            return {"ok": False, "error": "JVM worker did not respond"}
+
+    def _send(self, message):
+        try:
+            self._process.stdin.write(json.dumps(message) + "\n")
+            self._process.stdin.flush()
+        except (OSError, ValueError):
+            return False
+        return True
+
+    def alive(self):
+        """True if the worker process is still running."""
+        return self._process is not None and self._process.poll() is None
+
+    def ping(self, timeout=10.0):
+        """Health check: True if the worker answers within ``timeout`` seconds."""
+        return (
+            self.alive()
+            and self._send({"op": "ping"})
+            and self._receive(timeout).get("ok", False)
+        )
+
+    def run(self, args, log, timeout=None, cancel=None):
+        """Run the jar's main method with ``args``, writing its output to ``log``.
+
+        Parameters
+        ----------
+        args : list of str
+            Arguments for the jar.
+        log : str (or pathlike)
+            File the jar's stdout is written to.
+        timeout : float, optional
+            Wall-clock seconds before the worker is killed and restarted.
+        cancel : threading.Event, optional
+            Setting this event from another thread kills and restarts the
+            worker.
+
+        Raises
+        ------
+        RuntimeError
+            If the jar raised an exception, the worker crashed, or the job
+            was cancelled. A crashed worker is restarted before the error is
+            raised.
+        subprocess.TimeoutExpired
+            If the job ran longer than ``timeout``.
+        """
+        _deadline = None if timeout is None else time.monotonic() + timeout
+        if not self._send({"op": "run", "args": list(args), "log": str(log)}):
+            _reply = {"ok": False, "error": "JVM worker exited", "exited": True}
+        else:
+            while True:
+                try:
+                    _reply = self._replies.get(timeout=0.05)
+                    break
+                except queue.Empty:
+                    pass
+                if cancel is not None and cancel.is_set():
+                    self.kill()
+                    self.start()
+                    raise RuntimeError(
+                        "Cancelled when running {0} {1}".format(
+                            self.jar, " ".join(args)
+                        )
+                    )
+                if _deadline is not None and time.monotonic() > _deadline:
+                    self.kill()
+                    self.start()
+                    raise subprocess.TimeoutExpired([self.jar] + list(args), timeout)
+        if _reply.get("exited"):
+            self.start()
+        if not _reply["ok"]:
+            raise RuntimeError(
+                "Error when running {0} {1}: {2}".format(
+                    self.jar, " ".join(args), _reply["error"]
+                )
+            )
+
+    def kill(self):
+        """Stop the worker process immediately, even in the middle of a job."""
+        if self._process is not None and self.alive():
+            self._process.kill()
+            self._process.wait()
+        self.close()
+
+    def close(self):
+        """Stop the worker process."""
+        if self._process is None:
+            return
+        if self.alive():
+            self._send({"op": "exit"})
+            try:
+                self._process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._process.kill()
+                self._process.wait()
+        self._process.stdin.close()
+        self._process.stdout.close()
+        self._process = None
+
+
+class WorkerPool:
+    """A fixed number of :class:`JarWorker` processes for one jar file.
+
+    Jobs are handed to the next idle worker, so up to ``size`` jobs may run
+    at the same time from different threads. Before each job the worker is
+    health checked, and it is restarted if it crashed or stopped responding.
+
+    Parameters
+    ----------
+    jar : str
+        Path to the jar file.
+    size : int (Default: 1)
+        Number of worker processes.
+    ping_timeout : float (Default: 10.0)
+        Seconds an idle worker may take to answer a health check.
+    """
+
+    def __init__(self, jar, size=1, ping_timeout=10.0):
+        _check_jpype()
+        if size < 1:
+            raise ValueError("'size' must be an 'int' >= 1")
+        self.jar = str(jar)
+        self.size = size
+        self.ping_timeout = ping_timeout
+        self._idle = queue.Queue()
+        self._workers = []
+        for _ in range(size):
+            _worker = JarWorker(self.jar)
+            self._workers.append(_worker)
+            self._idle.put(_worker)
+
+    def health_check(self):
+        """Ping every idle worker, restarting any which do not answer.
+
+        Returns
+        -------
+        restarted : int
+            Number of workers which were restarted.
+        """
+        _restarted = 0
+        for _ in range(self._idle.qsize()):
+            _worker = self._idle.get()
+            try:
+                if not _worker.ping(self.ping_timeout):
+                    _worker.start()
+                    _restarted += 1
+            finally:
+                self._idle.put(_worker)
+        return _restarted
+
+    def run(self, args, log, timeout=None, cancel=None):
+        """Run one job on the next idle worker. See :meth:`JarWorker.run`"""
+        _worker = self._idle.get()
+        try:
+            if not _worker.ping(self.ping_timeout):
+                _worker.start()
+            _worker.run(args, log, timeout=timeout, cancel=cancel)
+        finally:
+            self._idle.put(_worker)
+
+    def close(self):
+        """Stop all workers."""
+        for _worker in self._workers:
+            _worker.close()
+
+
+_POOLS = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_worker_pool(jar, size=1):
+    """Return the shared :class:`WorkerPool` with ``size`` workers for ``jar``.
+
+    Pools are started on first use and stopped when the interpreter exits.
+    """
+    with _POOLS_LOCK:
+        _key = (str(jar), size)
+        if _key not in _POOLS:
+            _POOLS[_key] = WorkerPool(jar, size)
+        return _POOLS[_key]
+
+
+@atexit.register
+def shutdown():
+    """Stop all shared worker pools."""
+    with _POOLS_LOCK:
+        for _pool in _POOLS.values():
+            _pool.close()
+        _POOLS.clear()
+
+
+def _main_class(jar):
+    with zipfile.ZipFile(jar) as _zf:
+        _manifest = _zf.read("META-INF/MANIFEST.MF").decode("utf-8")
+    for _line in _manifest.splitlines():
+        if _line.startswith("Main-Class:"):
+            return _line.split(":", 1)[1].strip()
+    raise ValueError("No Main-Class in the manifest of " + jar)
+
+
+def _jvm_path():
+    """Find the JVM library, falling back to the ``java`` found on the PATH."""
+    import jpype
+    import shutil
+
+    try:
+        return jpype.getDefaultJVMPath()
+    except jpype.JVMNotFoundException:
+        _java = shutil.which("java")
+        if _java is None:
+            raise
+        _home = os.path.dirname(os.path.dirname(os.path.realpath(_java)))
+        for _library in (
+            "lib/server/libjvm.so",
+            "lib/server/libjvm.dylib",
+            "bin/server/jvm.dll",
+        ):
+            if os.path.exists(os.path.join(_home, _library)):
+                return os.path.join(_home, _library)
+        raise
+
+
+def _reset_static_state(jpype):
+    """Forget directories the jar remembers creating in an earlier job.
+
+    ``Utils.ensureDirExists`` caches every directory it made in a static set,
+    but directories may be removed between jobs (for example by
+    :func:`srlearn.system_manager.reset`) and then be needed again.
+    """
+    try:
+        _field = jpype.JClass("edu.wisc.cs.will.Utils.Utils").class_.getDeclaredField(
+            "ensured"
+        )
+    except Exception:
+        return
+    _field.setAccessible(True)
+    _field.get(None).clear()
+
+
+def _serve(jar):
+    """Worker side: answer json requests from stdin, one per line."""
+    # Replies use a private copy of stdout. Anything else which writes to
+    # file descriptor 1 (including the JVM) is sent to stderr instead.
+    _replies = os.fdopen(os.dup(1), "w")
+    os.dup2(2, 1)
+    sys.stdout = sys.stderr
+
+    def _reply(**message):
+        _replies.write(json.dumps(message) + "\n")
+        _replies.flush()
+
+    try:
+        import jpype
+
+        jpype.startJVM(_jvm_path(), classpath=[jar], convertStrings=True)
+        _main = jpype.JClass(_main_class(jar)).main
+        _System = jpype.JClass("java.lang.System")
+        _PrintStream = jpype.JClass("java.io.PrintStream")
+        _FileOutputStream = jpype.JClass("java.io.FileOutputStream")
+    except Exception as excep:
+        _reply(ok=False, error=repr(excep))
+        return
+    _reply(ok=True)
+
+    for _line in sys.stdin:
+        _request = json.loads(_line)
+        if _request["op"] == "exit":
+            break
+        if _request["op"] == "ping":
+            _reply(ok=True)
+            continue
+
+        _reset_static_state(jpype)
+        _stdout = _System.out
+        _log = _PrintStream(_FileOutputStream(_request["log"]), True)
+        _System.setOut(_log)
+        try:
+            _main(_request["args"])
+        except Exception as excep:
+            _reply(ok=False, error=str(excep))
+        else:
+            _reply(ok=True)
+        finally:
+            _System.setOut(_stdout)
+            _log.close()
+
+
+if __name__ == "__main__":
+    _serve(sys.argv[1])